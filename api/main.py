@@ -2,9 +2,11 @@
 """
 FastAPI backend для Telegram WebApp CartingBot
 """
+import asyncio
 import sys
 import os
-from typing import Any, Awaitable, Callable, Dict
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
 from urllib.parse import parse_qsl
 
 # api/main.py → api → project root
@@ -13,10 +15,21 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from pathlib import Path
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
-from core.config.config import AUTH_SECRET
-from core.database.db import init_db
-from api.routes import archive, auth, races, stats, leaderboard
+from fastapi.responses import FileResponse, Response
+from core.config.config import (
+    AUTH_SECRET,
+    TRACE_EXPORTER,
+    TRACE_FILE,
+    TRACE_OTLP_ENDPOINT,
+    TRACE_SAMPLE_RATE,
+)
+from core.database.db import init_db, write_queue
+from core.database.janitor import auth_janitor
+from core.metrics import CONTENT_TYPE, LoopLagMonitor, blocking_watchdog, registry
+from core.metrics.workers import worker_metrics
+from core.parsers.executor import parse_executor
+from core.tracing import Tracer, create_tracer
+from api.routes import admin, archive, auth, races, stats, leaderboard
 
 _TELEGRAM_LOGIN_PATH = "/api/mobile/auth/telegram/login"
 _TELEGRAM_LOGIN_PATHS = (_TELEGRAM_LOGIN_PATH, f"{_TELEGRAM_LOGIN_PATH}/")
@@ -56,6 +69,136 @@ class RedactTelegramLoginStateMiddleware:
                 scope[_TELEGRAM_LOGIN_STATE_SCOPE_KEY] = states[0]
         await self.app(scope, receive, send)
 
+
+HTTP_REQUEST_SECONDS = registry.histogram(
+    "carting_http_request_seconds",
+    "Длительность запросов к API по маршруту, методу и статусу",
+    ["route", "method", "status"],
+)
+
+
+class RequestMetricsMiddleware:
+    """Record request latency per route template, not per concrete path."""
+
+    def __init__(self, app: Callable[..., Awaitable[None]]):
+        self.app = app
+
+    async def __call__(
+        self,
+        scope: Dict[str, Any],
+        receive: Callable[[], Awaitable[Dict[str, Any]]],
+        send: Callable[[Dict[str, Any]], Awaitable[None]],
+    ) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message: Dict[str, Any]) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # The router stores the matched route in the shared scope
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.labels(
+                getattr(route, "path", "unmatched"), scope["method"], str(status)
+            ).observe(time.perf_counter() - started)
+
+
+_TRACE_HEADER = b"x-trace"
+_TRACEPARENT_HEADER = b"traceparent"
+_TRACE_ID_HEADER = b"x-trace-id"
+
+
+def _parse_traceparent(value: bytes) -> Optional[Tuple[str, str, bool]]:
+    """Return (trace id, parent span id, sampled) from a W3C traceparent header."""
+    parts = value.decode("latin-1").strip().lower().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16 or len(parts[3]) != 2:
+        return None
+    try:
+        int(parts[1], 16), int(parts[2], 16)
+        flags = int(parts[3], 16)
+    except ValueError:
+        return None
+    if set(parts[1]) == {"0"} or set(parts[2]) == {"0"}:
+        return None
+    return parts[1], parts[2], bool(flags & 1)
+
+
+class TracingMiddleware:
+    """Trace requests that opt in via X-Trace or a sampled traceparent.
+
+    Unsampled requests pass straight through; sampled ones get a root span
+    named after the route template and an X-Trace-Id response header.
+    """
+
+    def __init__(self, app: Callable[..., Awaitable[None]], tracer: Tracer):
+        self.app = app
+        self.tracer = tracer
+
+    async def __call__(
+        self,
+        scope: Dict[str, Any],
+        receive: Callable[[], Awaitable[Dict[str, Any]]],
+        send: Callable[[Dict[str, Any]], Awaitable[None]],
+    ) -> None:
+        if scope["type"] != "http" or not self.tracer.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        forced = False
+        trace_id = parent_id = None
+        for name, value in scope["headers"]:
+            if name == _TRACE_HEADER:
+                forced = value.strip().lower() in (b"1", b"true", b"yes")
+            elif name == _TRACEPARENT_HEADER:
+                parent = _parse_traceparent(value)
+                if parent is not None:
+                    trace_id, parent_id, sampled = parent
+                    forced = forced or sampled
+        if not self.tracer.should_sample(forced):
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        with self.tracer.trace(
+            f"{method} {scope['path']}", trace_id, parent_id,
+            **{"http.method": method, "http.target": scope["path"]},
+        ) as root:
+
+            async def send_wrapper(message: Dict[str, Any]) -> None:
+                if message["type"] == "http.response.start":
+                    root.set("http.status_code", message["status"])
+                    headers = list(message.get("headers", []))
+                    headers.append((_TRACE_ID_HEADER, root.trace_id.encode()))
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                route = scope.get("route")
+                if route is not None:
+                    root.name = f"{method} {route.path}"
+                    root.set("http.route", route.path)
+
+
+loop_lag_monitor = LoopLagMonitor()
+tracer = create_tracer(
+    TRACE_EXPORTER,
+    "carting-api",
+    path=TRACE_FILE,
+    endpoint=TRACE_OTLP_ENDPOINT,
+    sample_rate=TRACE_SAMPLE_RATE,
+)
+
 app = FastAPI(
     title="CartingBot API",
     description="REST API для Telegram WebApp — результаты картинга",
@@ -70,6 +213,8 @@ app.add_middleware(
     allow_headers=["*"],
 )
 app.add_middleware(RedactTelegramLoginStateMiddleware)
+app.add_middleware(RequestMetricsMiddleware)
+app.add_middleware(TracingMiddleware, tracer=tracer)
 
 
 @app.on_event("startup")
@@ -77,6 +222,21 @@ async def startup():
     if not AUTH_SECRET and "PYTEST_CURRENT_TEST" not in os.environ:
         raise RuntimeError("AUTH_SECRET must be configured")
     init_db()
+    loop_lag_monitor.start()
+    blocking_watchdog.start()
+    auth_janitor.start()
+    worker_metrics.start()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await loop_lag_monitor.stop()
+    await blocking_watchdog.stop()
+    await auth_janitor.stop()
+    await worker_metrics.stop()
+    await asyncio.to_thread(tracer.shutdown)
+    await asyncio.to_thread(parse_executor.shutdown)
+    await asyncio.to_thread(write_queue.close)
 
 
 app.include_router(archive.router, prefix="/api", tags=["archive"])
@@ -84,6 +244,7 @@ app.include_router(auth.router, prefix="/api", tags=["mobile-auth"])
 app.include_router(races.router, prefix="/api", tags=["races"])
 app.include_router(stats.router, prefix="/api", tags=["stats"])
 app.include_router(leaderboard.router, prefix="/api", tags=["leaderboard"])
+app.include_router(admin.router, prefix="/api", tags=["admin"])
 
 
 @app.get("/api/photo/{user_id}")
@@ -112,7 +273,7 @@ async def get_photo(user_id: int):
                     file_path = fdata["result"]["file_path"]
                     async with session.get(f"https://api.telegram.org/file/bot{BOT_TOKEN}/{file_path}") as r:
                         if r.status == 200:
-                            photo_path.write_bytes(await r.read())
+                            await asyncio.to_thread(photo_path.write_bytes, await r.read())
         except Exception:
             pass
 
@@ -126,7 +287,25 @@ async def health():
     return {"status": "ok"}
 
 
+@app.get("/api/metrics", include_in_schema=False)
+async def metrics():
+    """Метрики всех воркеров API в формате Prometheus, серии с меткой worker."""
+    return Response(await asyncio.to_thread(worker_metrics.render), headers={"Content-Type": CONTENT_TYPE})
+
+
+@app.get("/api/health/upstream")
+async def upstream_health():
+    """Метрики загрузок с kartchrono: попытки, задержки, состояние предохранителя.
+
+    Счётчики — по всем загрузкам процесса, предохранитель и очередь —
+    общего загрузчика upstream_fetcher, через который ходят парсеры.
+    """
+    from core.parsers.fetch import upstream_fetcher, upstream_snapshot
+    return {**upstream_snapshot(), **upstream_fetcher.state()}
+
+
 if __name__ == "__main__":
     import uvicorn
-    from core.config.config import API_HOST, API_PORT
-    uvicorn.run("api.main:app", host=API_HOST, port=API_PORT, reload=False)
+    from core.config.config import API_HOST, API_PORT, API_WORKERS
+    # В контейнере воркеры задаёт CMD образа (deployment/api/Dockerfile)
+    uvicorn.run("api.main:app", host=API_HOST, port=API_PORT, workers=API_WORKERS, reload=False)
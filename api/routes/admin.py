@@ -0,0 +1,66 @@
+"""
+Служебные эндпоинты для диагностики; доступны только с ADMIN_TOKEN.
+
+Журналы медленных вызовов и блокировок цикла ведёт каждый воркер API свой:
+ответ описывает воркер, принявший запрос, его номер указан в поле worker
+(тот же, что в метке worker у /api/metrics). Чтобы увидеть все воркеры,
+смотрите метрики /api/metrics.
+"""
+
+from __future__ import annotations
+
+import hmac
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+
+import core.config.config as config
+from core.database.db import profiler
+from core.metrics import blocking_watchdog
+from core.metrics.workers import worker_metrics
+
+router = APIRouter()
+
+_bearer = HTTPBearer(auto_error=False)
+
+
+def require_admin(
+    credentials: HTTPAuthorizationCredentials | None = Depends(_bearer),
+) -> None:
+    if not config.ADMIN_TOKEN:
+        # Без токена эндпоинтов как будто нет
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    if (
+        credentials is None
+        or credentials.scheme.lower() != "bearer"
+        or not hmac.compare_digest(credentials.credentials, config.ADMIN_TOKEN)
+    ):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
+
+
+@router.get("/admin/db/slow", dependencies=[Depends(require_admin)])
+async def slow_queries(limit: int = Query(20, ge=1, le=500)):
+    """Самые медленные вызовы базы из журнала воркера и сводка по функциям."""
+    return {
+        "worker": worker_metrics.worker,
+        "threshold_ms": profiler.threshold * 1000,
+        "slowest": profiler.top(limit),
+        "functions": profiler.summary(),
+    }
+
+
+@router.delete("/admin/db/slow", dependencies=[Depends(require_admin)])
+async def reset_slow_queries():
+    """Очищает журнал медленных вызовов и сводку воркера."""
+    profiler.reset()
+    return {"worker": worker_metrics.worker, "reset": True}
+
+
+@router.get("/admin/loop/blocked", dependencies=[Depends(require_admin)])
+async def blocked_loop(limit: int = Query(20, ge=1, le=200)):
+    """Последние блокировки цикла событий воркера API со стеками."""
+    return {
+        "worker": worker_metrics.worker,
+        "threshold_ms": blocking_watchdog.threshold * 1000,
+        "recent": blocking_watchdog.recent(limit),
+    }
@@ -232,7 +232,8 @@ async def start_telegram_login(request: TelegramStartRequest) -> TelegramStartRe
     for _ in range(3):
         state_value = secrets.token_urlsafe(32)
         try:
-            created = create_telegram_login_transaction(
+            created = await asyncio.to_thread(
+                create_telegram_login_transaction,
                 state_value,
                 request.code_challenge,
                 request.code_challenge_method,
@@ -262,7 +263,7 @@ async def telegram_login_page(request: Request) -> HTMLResponse:
     state_value = request.scope.get("carting.telegram_login_state")
     if not isinstance(state_value, str):
         return _login_error_response(status.HTTP_401_UNAUTHORIZED)
-    if find_telegram_login_transaction(state_value) is None:
+    if await asyncio.to_thread(find_telegram_login_transaction, state_value) is None:
         return _login_error_response(status.HTTP_401_UNAUTHORIZED)
     bot_username = TELEGRAM_LOGIN_BOT_USERNAME.strip().lstrip("@")
     if not _BOT_USERNAME_RE.fullmatch(bot_username):
@@ -278,7 +279,7 @@ async def telegram_login_callback(request: Request) -> RedirectResponse:
     except (KeyError, UnicodeDecodeError, ValueError):
         raise _callback_rejected()
 
-    if find_telegram_login_transaction(state_value) is None:
+    if await asyncio.to_thread(find_telegram_login_transaction, state_value) is None:
         raise _callback_rejected()
     if not BOT_TOKEN:
         raise HTTPException(
@@ -297,7 +298,8 @@ async def telegram_login_callback(request: Request) -> RedirectResponse:
         raise _callback_rejected()
     telegram_name = " ".join(part for part in (first_name, last_name) if part)
     try:
-        code = complete_telegram_login_and_issue_authorization_code(
+        code = await asyncio.to_thread(
+            complete_telegram_login_and_issue_authorization_code,
             state_value,
             user_id,
             telegram_name,
@@ -329,8 +331,9 @@ async def exchange_telegram_code(request: TelegramExchangeRequest) -> TokenRespo
             detail="Недействительный или истёкший вход",
         )
     try:
-        exchanged = consume_telegram_authorization_code_and_create_refresh_session(
-            request.code, request.state, request.code_verifier
+        exchanged = await asyncio.to_thread(
+            consume_telegram_authorization_code_and_create_refresh_session,
+            request.code, request.state, request.code_verifier,
         )
     except sqlite3.Error:
         raise HTTPException(
@@ -355,7 +358,8 @@ async def exchange_telegram_native_id_token(
     except ValueError:
         raise _callback_rejected()
     try:
-        refresh_token = provision_telegram_identity_and_create_refresh_session(
+        refresh_token = await asyncio.to_thread(
+            provision_telegram_identity_and_create_refresh_session,
             identity.user_id,
             identity.telegram_name,
             identity.username,
@@ -371,7 +375,7 @@ async def exchange_telegram_native_id_token(
 
 @router.post("/refresh", response_model=TokenResponse)
 async def refresh_access_token(request: RefreshTokenRequest) -> TokenResponse:
-    rotated = rotate_refresh_session(request.refresh_token)
+    rotated = await asyncio.to_thread(rotate_refresh_session, request.refresh_token)
     if rotated is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -383,7 +387,7 @@ async def refresh_access_token(request: RefreshTokenRequest) -> TokenResponse:
 
 @router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
 async def logout(request: RefreshTokenRequest) -> Response:
-    if not revoke_refresh_session(request.refresh_token):
+    if not await asyncio.to_thread(revoke_refresh_session, request.refresh_token):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Недействительная сессия",
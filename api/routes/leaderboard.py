@@ -1,9 +1,10 @@
 import asyncio
 from fastapi import APIRouter, Query, HTTPException
 from datetime import date as date_module
-from core.database.db import get_best_competitors, get_best_competitors_today
+from core.cache.leaderboard import best_competitors, best_competitors_today
 from core.parsers.parsers import ArchiveParser, RaceParser
 from core.models.models import ParsingError
+from core.timing import NO_TIME_MS, parse_time_ms
 
 router = APIRouter()
 
@@ -20,24 +21,10 @@ def _row_to_dict(row: tuple) -> dict:
     return dict(zip(keys, row))
 
 
-def _time_to_ms(t: str) -> int:
-    if not t or t.strip() in ('-', ''):
-        return 999_999_999
-    try:
-        t = t.strip()
-        if ':' in t and '.' in t:
-            m, rest = t.split(':', 1)
-            s, ms = rest.split('.', 1)
-            return int(m) * 60_000 + int(s) * 1_000 + int(ms)
-    except Exception:
-        pass
-    return 999_999_999
-
-
 @router.get("/leaderboard")
 async def get_leaderboard(limit: int = 20):
     """Топ гонщиков всех времён по лучшему кругу."""
-    rows = get_best_competitors(limit)
+    rows = await asyncio.to_thread(best_competitors, limit)
     return [_row_to_dict(r) for r in rows]
 
 
@@ -49,7 +36,7 @@ async def get_leaderboard_today(
     """Топ гонщиков за конкретный день."""
     if not date:
         date = date_module.today().strftime("%d.%m.%Y")
-    rows = get_best_competitors_today(date, limit)
+    rows = await asyncio.to_thread(best_competitors_today, date, limit)
     return [_row_to_dict(r) for r in rows]
 
 
@@ -78,6 +65,7 @@ async def get_karts_today(
         return []
 
     # 2. Параллельно загружаем результаты всех заездов
+    #    (сколько запросов реально уходит на сайт, решает UpstreamGovernor)
     async def fetch_race(race):
         try:
             return await _race_parser.parse(race.href)
@@ -96,8 +84,8 @@ async def get_karts_today(
             if not num:
                 continue
             races_count[num] = races_count.get(num, 0) + 1
-            ms = _time_to_ms(cart.best_lap)
-            if ms >= 999_999_999:
+            ms = parse_time_ms(cart.best_lap)
+            if ms >= NO_TIME_MS:
                 continue
             if num not in best_per_kart or ms < best_per_kart[num]['ms']:
                 best_per_kart[num] = {
@@ -1,6 +1,8 @@
 from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import JSONResponse
 from core.parsers.parsers import RaceParser, FullRaceInfoParser
 from core.models.models import ParsingError
+from core.tracing import span
 
 router = APIRouter()
 _race_parser = RaceParser()
@@ -11,7 +13,7 @@ _full_parser = FullRaceInfoParser()
 async def get_race_carts(href: str = Query(..., description="Ссылка на заезд")):
     """Возвращает список картов для заезда."""
     try:
-        carts, _ = await _race_parser.parse_with_html(href)
+        carts = await _race_parser.parse(href)
         return [
             {"id": c.id, "number": c.number, "best_lap": c.best_lap, "position": c.position}
             for c in carts
@@ -24,9 +26,14 @@ async def get_race_carts(href: str = Query(..., description="Ссылка на 
 async def get_race_full(href: str = Query(..., description="Ссылка на заезд")):
     """Возвращает полную информацию о заезде с данными по кругам."""
     try:
-        carts, html = await _race_parser.parse_with_html(href)
-        competitors = await _full_parser.parse(href, race_carts=carts, html=html)
-        return [
+        page = await _race_parser.parse_page(href)
+        competitors = await _full_parser.parse(href, page=page)
+    except ParsingError as e:
+        raise HTTPException(status_code=502, detail=f"Ошибка парсинга: {e}")
+
+    # Сериализуем здесь, а не в FastAPI, чтобы это время попало в отдельный спан
+    with span("serialize", competitors=len(competitors)) as serialize:
+        payload = [
             {
                 "id": c.id,
                 "num": c.num,
@@ -52,5 +59,6 @@ async def get_race_full(href: str = Query(..., description="Ссылка на з
             }
             for c in competitors
         ]
-    except ParsingError as e:
-        raise HTTPException(status_code=502, detail=f"Ошибка парсинга: {e}")
+        response = JSONResponse(payload)
+        serialize.set("bytes", len(response.body))
+    return response
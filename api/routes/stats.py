@@ -1,11 +1,13 @@
+import asyncio
 import json
 from fastapi import APIRouter, Depends, Header, HTTPException
 from fastapi.security import HTTPAuthorizationCredentials
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, List
+from core.config.config import STATS_BATCH_MAX_ITEMS
 from core.database.db import (
     get_user_competitors, get_competitor_by_key,
-    save_competitor, delete_competitor, get_all_users, upsert_user_profile,
+    save_competitor, save_competitors_bulk, delete_competitor, get_all_users, upsert_user_profile,
 )
 from core.models.models import LapData
 from api.dependencies import require_mobile_user
@@ -52,6 +54,10 @@ class MobileSaveStatsRequest(BaseModel):
     competitor: CompetitorModel
 
 
+class MobileSaveStatsBatchRequest(BaseModel):
+    items: List[MobileSaveStatsRequest] = Field(min_length=1, max_length=STATS_BATCH_MAX_ITEMS)
+
+
 def _row_to_dict(row: tuple) -> dict:
     """Преобразует кортеж из БД в словарь."""
     keys = [
@@ -94,7 +100,7 @@ def _mobile_user(authorization: Optional[str] = Header(default=None)) -> int:
 @router.get("/users")
 async def get_users():
     """Возвращает всех пользователей с сохранёнными заездами."""
-    return get_all_users()
+    return await asyncio.to_thread(get_all_users)
 
 
 class RegisterUserRequest(BaseModel):
@@ -107,21 +113,22 @@ class RegisterUserRequest(BaseModel):
 @router.post("/users/me")
 async def register_user(body: RegisterUserRequest):
     """Сохраняет Telegram-имя, username и аватар пользователя."""
-    upsert_user_profile(body.user_id, body.name, body.username, body.photo_url)
+    await asyncio.to_thread(upsert_user_profile, body.user_id, body.name, body.username, body.photo_url)
     return {"ok": True}
 
 
 @router.get("/stats/{user_id}")
 async def get_user_stats(user_id: int):
     """Возвращает все заезды пользователя."""
-    rows = get_user_competitors(user_id)
+    rows = await asyncio.to_thread(get_user_competitors, user_id)
     return [_row_to_dict(r) for r in rows]
 
 
 @router.post("/stats")
 async def save_stats(body: SaveStatsRequest):
     """Сохраняет результат заезда пользователя."""
-    saved = save_competitor(
+    saved = await asyncio.to_thread(
+        save_competitor,
         user_id=body.user_id,
         date=body.date,
         race_number=body.race_number,
@@ -134,7 +141,7 @@ async def save_stats(body: SaveStatsRequest):
 @router.delete("/stats/{user_id}/{date}/{race_number}/{num}")
 async def delete_stats(user_id: int, date: str, race_number: str, num: str):
     """Удаляет запись заезда пользователя."""
-    deleted = delete_competitor(user_id, date, race_number, num)
+    deleted = await asyncio.to_thread(delete_competitor, user_id, date, race_number, num)
     if not deleted:
         raise HTTPException(status_code=404, detail="Запись не найдена")
     return {"deleted": True}
@@ -142,7 +149,8 @@ async def delete_stats(user_id: int, date: str, race_number: str, num: str):
 
 @router.get("/mobile/stats")
 async def get_mobile_stats(user_id: int = Depends(_mobile_user)):
-    return [_row_to_dict(row) for row in get_user_competitors(user_id)]
+    rows = await asyncio.to_thread(get_user_competitors, user_id)
+    return [_row_to_dict(row) for row in rows]
 
 
 @router.post("/mobile/stats")
@@ -150,7 +158,8 @@ async def save_mobile_stats(
     body: MobileSaveStatsRequest,
     user_id: int = Depends(_mobile_user),
 ):
-    saved = save_competitor(
+    saved = await asyncio.to_thread(
+        save_competitor,
         user_id=user_id,
         date=body.date,
         race_number=body.race_number,
@@ -160,6 +169,36 @@ async def save_mobile_stats(
     return {"saved": saved}
 
 
+@router.post("/mobile/stats/batch")
+async def save_mobile_stats_batch(
+    body: MobileSaveStatsBatchRequest,
+    user_id: int = Depends(_mobile_user),
+):
+    """Сохраняет пачку заездов одной транзакцией; результат — по каждому заезду."""
+    results = await asyncio.to_thread(save_competitors_bulk, user_id, [
+        {
+            "date": item.date,
+            "race_number": item.race_number,
+            "race_href": item.race_href,
+            "competitor_data": _competitor_data(item.competitor),
+        }
+        for item in body.items
+    ])
+    return {
+        "results": [
+            {
+                "date": item.date,
+                "race_number": item.race_number,
+                "num": item.competitor.num,
+                "saved": saved,
+            }
+            for item, saved in zip(body.items, results)
+        ],
+        "saved": sum(results),
+        "duplicates": len(results) - sum(results),
+    }
+
+
 @router.delete("/mobile/stats/{date}/{race_number}/{num}")
 async def delete_mobile_stats(
     date: str,
@@ -167,7 +206,7 @@ async def delete_mobile_stats(
     num: str,
     user_id: int = Depends(_mobile_user),
 ):
-    deleted = delete_competitor(user_id, date, race_number, num)
+    deleted = await asyncio.to_thread(delete_competitor, user_id, date, race_number, num)
     if not deleted:
         raise HTTPException(status_code=404, detail="Запись не найдена")
     return {"deleted": True}
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Стоимость проверки access-токена на один запрос /api/mobile/*: полный
+разбор HS256 JWT против кэша проверенных токенов.
+
+Запуск: python benchmarks/bench_access_token.py
+"""
+import os
+import sys
+import time
+
+# benchmarks/bench_access_token.py → benchmarks → project root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("AUTH_SECRET", "benchmark-secret-" + "x" * 32)
+
+from fastapi.security import HTTPAuthorizationCredentials
+
+import core.auth.tokens as tokens
+from api.dependencies import require_mobile_user
+
+ROUNDS = 50_000
+
+
+def _report(name: str, seconds: float) -> None:
+    print(f"{name:<44} {seconds / ROUNDS * 1e6:>8.2f} мкс/запрос")
+
+
+def _measure(func, *args) -> float:
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        func(*args)
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    token = tokens.issue_access_token(42)
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+    cache_size = tokens.ACCESS_TOKEN_CACHE_SIZE
+    tokens.ACCESS_TOKEN_CACHE_SIZE = 0
+    _report("decode_access_token без кэша", _measure(tokens.decode_access_token, token))
+    _report("require_mobile_user без кэша", _measure(require_mobile_user, credentials))
+
+    tokens.ACCESS_TOKEN_CACHE_SIZE = cache_size or 4096
+    tokens.clear_access_token_cache()
+    _report("decode_access_token из кэша", _measure(tokens.decode_access_token, token))
+    _report("require_mobile_user из кэша", _measure(require_mobile_user, credentials))
+
+    # Худший случай для кэша: каждый запрос с новым токеном
+    fresh = [
+        tokens.jwt.encode({"sub": str(i), "type": "access", "exp": int(time.time()) + 900},
+                          tokens.AUTH_SECRET, algorithm="HS256")
+        for i in range(ROUNDS)
+    ]
+    tokens.clear_access_token_cache()
+    started = time.perf_counter()
+    for value in fresh:
+        tokens.decode_access_token(value)
+    _report("decode_access_token, все токены разные", time.perf_counter() - started)
+
+
+if __name__ == "__main__":
+    main()
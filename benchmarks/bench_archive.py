@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Обновление архива заездов: прежний разбор BeautifulSoup, потоковый разбор
+всей страницы и инкрементальный разбор до первого известного заезда.
+
+Запуск: python benchmarks/bench_archive.py
+"""
+import os
+import sys
+import time
+from pathlib import Path
+
+# benchmarks/bench_archive.py → benchmarks → project root
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bs4 import BeautifulSoup
+
+from core.parsers.parsers import ArchiveParser
+
+ARCHIVE = Path(ROOT) / "tests" / "fixtures" / "kartchrono" / "archive.html"
+ROUNDS = 50
+
+
+def _legacy(html: str) -> int:
+    archive_data = BeautifulSoup(html, "html.parser").find(class_="archiveData")
+    return sum(1 for element in archive_data.children if hasattr(element, "get"))
+
+
+def _measure(func) -> float:
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        func()
+    return (time.perf_counter() - started) / ROUNDS
+
+
+def main() -> None:
+    html = ARCHIVE.read_text()
+    parser = ArchiveParser(feed=None)
+    previous = parser._parse_html(html)
+    # Новый заезд сверху: остальная страница уже известна
+    fresh = html.replace(
+        '<div class="archiveDataRow">',
+        '<div class="archiveDataRow"><a href="race.php?id=99999"><div><span>new</span></div></a></div>'
+        '\n    <div class="archiveDataRow">',
+        1,
+    )
+    assert parser._parse_incremental(fresh, previous)[1][0].races[0].href == "race.php?id=99999"
+
+    legacy = _measure(lambda: _legacy(fresh))
+    full = _measure(lambda: parser._parse_html(fresh))
+    incremental = _measure(lambda: parser._parse_incremental(fresh, previous))
+    print(f"archive.html ({len(html) // 1024} КБ, {sum(len(d.races) for d in previous)} заездов)")
+    print(f"  {'BeautifulSoup':<30} {legacy * 1000:>8.2f} мс")
+    print(f"  {'потоковый, вся страница':<30} {full * 1000:>8.2f} мс")
+    print(f"  {'инкрементальный':<30} {incremental * 1000:>8.2f} мс")
+
+
+if __name__ == "__main__":
+    main()
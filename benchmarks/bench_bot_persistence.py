@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Накладные расходы SQLitePersistence на одно обновление диалога /add.
+
+Запуск: python benchmarks/bench_bot_persistence.py
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+# benchmarks/bench_bot_persistence.py → benchmarks → project root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from telegram import User
+
+from bot.persistence import SQLitePersistence, decode_user_data, encode_user_data
+from core.models.models import Cart, DayRaces, Race
+
+ROUNDS = 2000
+
+
+def _user_data() -> dict:
+    races = [Race(number=str(i), href=f"race/{i}") for i in range(40)]
+    return {
+        "user_options": [
+            User(id=i, first_name=f"User {i}", is_bot=False, username=f"user{i}")
+            for i in range(5)
+        ],
+        "selected_user": 1,
+        "selected_user_name": "User 1",
+        "today_dr": DayRaces(date=datetime(2026, 8, 10), races=races),
+        "today_exists": True,
+        "other_dates": [
+            DayRaces(date=datetime(2026, 7, day), races=races) for day in range(1, 31)
+        ],
+        "current_races": races,
+        "current_carts": [
+            Cart(id="", number=str(n), best_lap="0:45.500", position=str(n))
+            for n in range(12)
+        ],
+        "current_race_html": "x" * 150_000,
+    }
+
+
+def _report(name: str, seconds: float) -> None:
+    print(f"{name:<40} {seconds / ROUNDS * 1e6:>10.1f} мкс/обновление")
+
+
+async def _run() -> None:
+    user_data = _user_data()
+    payload = encode_user_data(user_data)
+    print(f"Размер записи user_data: {len(payload)} байт")
+
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        encode_user_data(user_data)
+    _report("encode_user_data", time.perf_counter() - started)
+
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        decode_user_data(payload)
+    _report("decode_user_data", time.perf_counter() - started)
+
+    with tempfile.TemporaryDirectory() as directory:
+        persistence = SQLitePersistence(Path(directory) / "bot_state.db")
+        started = time.perf_counter()
+        for i in range(ROUNDS):
+            user_data["races_page"] = i
+            await persistence.update_user_data(42, user_data)
+            await persistence.update_conversation("add_race", (-100, 42), i % 4)
+        _report("update_user_data + update_conversation", time.perf_counter() - started)
+
+        started = time.perf_counter()
+        for _ in range(ROUNDS):
+            await persistence.update_user_data(42, user_data)
+        _report("update_user_data (без изменений)", time.perf_counter() - started)
+        await persistence.flush()
+
+
+if __name__ == "__main__":
+    asyncio.run(_run())
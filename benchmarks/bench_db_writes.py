@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Пропускная способность записей в базу: COMMIT на каждую запись против
+группового COMMIT (core.database.writer) при параллельных писателях.
+
+Писатели — потоки (как asyncio.to_thread в API и боте) и, с --processes,
+несколько процессов на одном файле (как API и бот): каждый сохраняет
+заезды через save_competitor. Групповой COMMIT с max_batch=1 — это
+фиксация каждой записи отдельно.
+
+Запуск: python benchmarks/bench_db_writes.py [--writes 200] [--processes 2]
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# benchmarks/bench_db_writes.py → benchmarks → project root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import core.database.db as db
+from core.database.writer import WRITE_GROUP_SIZE, WRITE_LOCK_WAIT_SECONDS
+
+# Журнал медленных вызовов здесь только мешает: под нагрузкой медленные все
+db.profiler.threshold = float("inf")
+
+THREADS = (1, 8, 32)
+MODES = (("COMMIT на запись", 1), ("групповой COMMIT", 64))
+
+
+def _competitor(n: int) -> dict:
+    return {
+        "id": f"c{n}", "num": str(n), "name": f"Driver {n}", "pos": 1, "laps": 12,
+        "theor_lap": 45000, "best_lap": "0:45.100", "binary_laps": "",
+        "theor_lap_formatted": "0:45.000", "display_name": f"Driver {n}",
+        "gap_to_leader": "", "lap_times": [],
+    }
+
+
+def _write_many(user_id: int, threads: int, writes: int) -> None:
+    def worker(t: int) -> None:
+        for i in range(writes):
+            db.save_competitor(
+                user_id, "10.08.2026", f"{t}-{i}", "race.php?id=1", _competitor(i)
+            )
+
+    pool = [threading.Thread(target=worker, args=(t,)) for t in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+
+
+def _process(path: str, max_batch: int, user_id: int, threads: int, writes: int, start) -> None:
+    db.DB_FILE = Path(path)
+    db.write_queue.max_batch = max_batch
+    start.wait()
+    _write_many(user_id, threads, writes)
+    db.write_queue.close()
+
+
+def _run(path: Path, max_batch: int, threads: int, writes: int, processes: int) -> float:
+    if processes <= 1:
+        db.write_queue.max_batch = max_batch
+        started = time.perf_counter()
+        _write_many(1, threads, writes)
+        elapsed = time.perf_counter() - started
+        db.write_queue.close()
+        return elapsed
+
+    context = multiprocessing.get_context("spawn")
+    start = context.Event()
+    workers = [
+        context.Process(target=_process, args=(str(path), max_batch, p + 1, threads, writes, start))
+        for p in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+    # Процессы импортируют проект до старта замера
+    time.sleep(2)
+    started = time.perf_counter()
+    start.set()
+    for worker in workers:
+        worker.join()
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--writes", type=int, default=200, help="записей на поток")
+    parser.add_argument("--processes", type=int, default=1, help="процессов-писателей на одном файле")
+    args = parser.parse_args()
+
+    print(f"{'писателей':<14} {'режим':<20} {'записей/с':>10} {'средняя пачка':>14} {'ожидание блокировки':>20}")
+    for threads in THREADS:
+        for label, max_batch in MODES:
+            with tempfile.TemporaryDirectory() as directory:
+                path = Path(directory) / "races.db"
+                db.DB_FILE = path
+                db.init_db()
+                sizes = WRITE_GROUP_SIZE._default
+                locks = WRITE_LOCK_WAIT_SECONDS._default
+                groups, jobs, lock_total = sizes.count, sizes.sum, locks.sum
+                elapsed = _run(path, max_batch, threads, args.writes, args.processes)
+                total = threads * args.writes * max(1, args.processes)
+                batch = (sizes.sum - jobs) / (sizes.count - groups) if sizes.count > groups else 0
+                lock_ms = (locks.sum - lock_total) * 1000
+                writers = f"{max(1, args.processes)}×{threads}"
+                # В режиме процессов метрики остаются в дочерних процессах
+                batch_text = f"{batch:.1f}" if args.processes <= 1 else "—"
+                lock_text = f"{lock_ms:.0f} мс" if args.processes <= 1 else "—"
+                print(f"{writers:<14} {label:<20} {total / elapsed:>10.0f} {batch_text:>14} {lock_text:>20}")
+
+
+if __name__ == "__main__":
+    main()
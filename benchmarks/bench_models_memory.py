@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Память на одну закэшированную страницу заезда: прежние dataclass-модели
+со списком LapData из строк против slots-моделей и колоночной LapTable.
+
+Запуск: python benchmarks/bench_models_memory.py
+"""
+import gc
+import os
+import sys
+import tracemalloc
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional
+
+# benchmarks/bench_models_memory.py → benchmarks → project root
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from core.parsers.parsers import build_race_page
+
+FIXTURES = Path(ROOT) / "tests" / "fixtures" / "kartchrono"
+PAGES = 20
+
+
+@dataclass
+class _OldCart:
+    id: str
+    number: str
+    best_lap: str
+    position: str
+
+
+@dataclass
+class _OldLapData:
+    lap_number: int
+    lap_time: str
+    sector1: Optional[str] = None
+    sector2: Optional[str] = None
+    sector3: Optional[str] = None
+    sector4: Optional[str] = None
+
+
+@dataclass
+class _OldCompetitor:
+    id: str
+    num: str
+    name: str
+    pos: int
+    laps: int
+    theor_lap: int
+    best_lap: str
+    binary_laps: str
+    theor_lap_formatted: Optional[str] = None
+    display_name: Optional[str] = None
+    gap_to_leader: Optional[str] = None
+    lap_times: Optional[List[_OldLapData]] = None
+
+
+def _copy(value: str) -> str:
+    # Отдельная строка, как если бы её заново отформатировал прежний парсер
+    return "".join(list(value)) if value else value
+
+
+def _old_page(page):
+    carts = [_OldCart(c.id, _copy(c.number), _copy(c.best_lap), _copy(c.position)) for c in page.carts]
+    competitors = [
+        _OldCompetitor(
+            c.id, c.num, c.name, c.pos, c.laps, c.theor_lap, c.best_lap, c.binary_laps,
+            _copy(c.theor_lap_formatted), _copy(c.display_name), _copy(c.gap_to_leader),
+            [
+                _OldLapData(
+                    lap.lap_number, _copy(lap.lap_time), _copy(lap.sector1),
+                    _copy(lap.sector2), _copy(lap.sector3), _copy(lap.sector4),
+                )
+                for lap in c.lap_times
+            ],
+        )
+        for c in page.competitors
+    ]
+    return carts, competitors
+
+
+def _retained(build) -> int:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    kept = [build() for _ in range(PAGES)]
+    gc.collect()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    del kept
+    return size // PAGES
+
+
+def main() -> None:
+    for name in ("race.html", "race_large.html"):
+        html = (FIXTURES / name).read_text()
+        page = build_race_page(html)
+        # binary_laps одинаков в обоих вариантах и хранится как есть
+        shared = sum(sys.getsizeof(c.binary_laps) for c in page.competitors)
+        old = _retained(lambda: _old_page(build_race_page(html))) - shared
+        new = _retained(lambda: build_race_page(html)) - shared
+        laps = sum(len(c.lap_times) for c in page.competitors)
+        print(f"{name}: {len(page.competitors)} пилотов, {laps} кругов (без binary_laps)")
+        print(f"  {'dataclass + LapData':<24} {old / 1024:>8.1f} КБ на страницу")
+        print(f"  {'slots + LapTable':<24} {new / 1024:>8.1f} КБ на страницу  (x{old / new:.1f})")
+
+
+if __name__ == "__main__":
+    main()
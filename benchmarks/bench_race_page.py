@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Разбор страницы заезда: прежний путь (BeautifulSoup + регулярка по всему
+документу, отдельно для каждого парсера) против однопроходного build_race_page,
+а также извлечение jsCompetitors: ленивые регулярки против raw_decode.
+
+Запуск: python benchmarks/bench_race_page.py
+"""
+import json
+import os
+import re
+import sys
+import time
+from pathlib import Path
+
+# benchmarks/bench_race_page.py → benchmarks → project root
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bs4 import BeautifulSoup
+
+from core.models.models import Cart
+from core.parsers.parsers import FullRaceInfoParser, build_race_page
+from core.parsers.race_page import extract_js_competitors
+
+FIXTURES = Path(ROOT) / "tests" / "fixtures" / "kartchrono"
+ROUNDS = 50
+_parser = FullRaceInfoParser(cache=None)
+
+
+def _legacy(html: str):
+    """Как было: RaceParser и FullRaceInfoParser разбирали страницу каждый сам."""
+    results_table = BeautifulSoup(html, "html.parser").find(id="resultsTable")
+    carts = []
+    for row in results_table.find_all(class_="dataRow"):
+        fields = [row.find(id=name) for name in ("num", "best_lap_time", "pos")]
+        number, best_lap, position = (
+            element.get_text().strip() if element else "" for element in fields
+        )
+        carts.append(Cart(id="", number=number, best_lap=best_lap, position=position))
+
+    return carts, _parser._parse_competitors_json(json.loads(_legacy_extract(html)), carts)
+
+
+def _legacy_extract(html: str):
+    """Прежний _extract_js_competitors: два ленивых DOTALL-шаблона по всей странице."""
+    for pattern in (r'var\s+jsCompetitors\s*=\s*(\{.*?\});', r'jsCompetitors\s*=\s*(\{.*?\});'):
+        match = re.search(pattern, html, re.DOTALL)
+        if match:
+            return match.group(1)
+    return None
+
+
+def _measure(func, html: str) -> float:
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        func(html)
+    return (time.perf_counter() - started) / ROUNDS
+
+
+def main() -> None:
+    for name in ("race.html", "race_large.html"):
+        html = (FIXTURES / name).read_text()
+        legacy = _measure(_legacy, html)
+        single = _measure(build_race_page, html)
+        print(f"{name} ({len(html) // 1024} КБ)")
+        print(f"  {'bs4 + regex, два прохода':<30} {legacy * 1000:>8.2f} мс")
+        print(f"  {'build_race_page':<30} {single * 1000:>8.2f} мс  (x{legacy / single:.1f})")
+
+        legacy = _measure(lambda text: json.loads(_legacy_extract(text)), html)
+        anchored = _measure(extract_js_competitors, html)
+        print(f"  {'jsCompetitors: regex + loads':<30} {legacy * 1000:>8.2f} мс")
+        print(f"  {'jsCompetitors: raw_decode':<30} {anchored * 1000:>8.2f} мс  (x{legacy / anchored:.1f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Цена одного /api/mobile/auth/refresh в базе: прежняя ротация (отзыв строки
+и вставка новой) против обновления строки семейства сессий на месте.
+
+Считаются обновления в секунду, страницы, записанные в WAL на одно
+обновление (автоматический checkpoint выключен, чтобы журнал только рос),
+и строки, оставшиеся в mobile_refresh_sessions.
+
+Запуск: python benchmarks/bench_refresh_rotation.py [--devices 200] [--refreshes 20]
+"""
+import argparse
+import os
+import secrets
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+# benchmarks/bench_refresh_rotation.py → benchmarks → project root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import core.database.db as db
+
+db.profiler.threshold = float("inf")
+
+
+def _legacy_create(user_id: int) -> str:
+    """Сессия до семейств сессий: ключ строки — хэш самого токена."""
+    token = secrets.token_urlsafe(48)
+    expires_at = (datetime.now(timezone.utc) + timedelta(seconds=db.REFRESH_TOKEN_TTL_SECONDS)).isoformat()
+    with db._write() as conn:
+        conn.execute(
+            "INSERT INTO mobile_refresh_sessions (token_hash, user_id, expires_at, revoked_at) "
+            "VALUES (?, ?, ?, NULL)",
+            (db._token_hash(token), user_id, expires_at),
+        )
+    return token
+
+
+def _legacy_rotate(token: str):
+    """Ротация до семейств сессий: отозвать строку и вставить новую."""
+    now = db._utc_now_iso()
+    token_hash = db._token_hash(token)
+    replacement = secrets.token_urlsafe(48)
+    expires_at = (datetime.now(timezone.utc) + timedelta(seconds=db.REFRESH_TOKEN_TTL_SECONDS)).isoformat()
+    with db._write() as conn:
+        row = conn.execute(
+            "SELECT user_id FROM mobile_refresh_sessions "
+            "WHERE token_hash = ? AND revoked_at IS NULL AND expires_at > ?",
+            (token_hash, now),
+        ).fetchone()
+        if row is None:
+            return None
+        conn.execute(
+            "UPDATE mobile_refresh_sessions SET revoked_at = ? WHERE token_hash = ? AND revoked_at IS NULL",
+            (now, token_hash),
+        )
+        conn.execute(
+            "INSERT INTO mobile_refresh_sessions (token_hash, user_id, expires_at, revoked_at) "
+            "VALUES (?, ?, ?, NULL)",
+            (db._token_hash(replacement), row[0], expires_at),
+        )
+    return row[0], replacement
+
+
+def _wal_frames(path: Path, page_size: int) -> int:
+    wal = Path(f"{path}-wal")
+    return max(0, wal.stat().st_size - 32) // (page_size + 24) if wal.exists() else 0
+
+
+def _run(create, rotate, devices: int, refreshes: int) -> tuple:
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "races.db"
+        db.DB_FILE = path
+        db.init_db()
+        connect = db.write_queue.connect
+
+        def connect_without_checkpoint():
+            conn = connect()
+            conn.execute("PRAGMA wal_autocheckpoint=0")
+            return conn
+
+        db.write_queue.connect = connect_without_checkpoint
+        try:
+            tokens = [create(user_id) for user_id in range(devices)]
+            with db._get_conn() as conn:
+                page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+            frames = _wal_frames(path, page_size)
+            started = time.perf_counter()
+            for _ in range(refreshes):
+                tokens = [rotate(token)[1] for token in tokens]
+            elapsed = time.perf_counter() - started
+            frames = _wal_frames(path, page_size) - frames
+            with db._get_conn() as conn:
+                rows = conn.execute("SELECT COUNT(*) FROM mobile_refresh_sessions").fetchone()[0]
+        finally:
+            db.write_queue.close()
+            db.write_queue.connect = connect
+    total = devices * refreshes
+    return total / elapsed, frames / total, rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--devices", type=int, default=200, help="устройств (сессий)")
+    parser.add_argument("--refreshes", type=int, default=20, help="обновлений токена на устройство")
+    args = parser.parse_args()
+
+    print(f"{'ротация':<26} {'обновлений/с':>13} {'страниц WAL/обновление':>23} {'строк в таблице':>16}")
+    modes = (
+        ("отзыв + вставка", _legacy_create, _legacy_rotate),
+        ("семейство на месте", db.create_refresh_session, db.rotate_refresh_session),
+    )
+    for label, create, rotate in modes:
+        per_second, frames, rows = _run(create, rotate, args.devices, args.refreshes)
+        print(f"{label:<26} {per_second:>13.0f} {frames:>23.2f} {rows:>16}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Преобразования времени: прежние функции (f-строки и split) против
+core.timing (таблицы строк, канонический разбор, пакетные варианты).
+
+Запуск: python benchmarks/bench_timing.py
+"""
+import os
+import random
+import sys
+import time
+from array import array
+from pathlib import Path
+
+# benchmarks/bench_timing.py → benchmarks → project root
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from core.parsers.parsers import build_race_page
+from core.timing import format_ms_many, format_ms_or_none, parse_time_ms, parse_time_ms_many
+
+FIXTURES = Path(ROOT) / "tests" / "fixtures" / "kartchrono"
+ROUNDS = 5
+
+
+def _legacy_format(time_ms):
+    if time_ms <= 0:
+        return "00:00.000"
+    minutes = time_ms // 60000
+    seconds = (time_ms % 60000) // 1000
+    milliseconds = time_ms % 1000
+    return f"{minutes}:{seconds:02d}.{milliseconds:03d}"
+
+
+def _legacy_parse(time_str):
+    if not time_str or time_str == "-":
+        return 999999999
+    try:
+        time_str = time_str.strip()
+        if ':' in time_str and '.' in time_str:
+            minutes, rest = time_str.split(':', 1)
+            seconds, ms = rest.split('.', 1)
+            return int(minutes) * 60000 + int(seconds) * 1000 + int(ms)
+        return 999999999
+    except Exception:
+        return 999999999
+
+
+def _measure(func) -> float:
+    func()
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        func()
+    return (time.perf_counter() - started) / ROUNDS
+
+
+def _report(name: str, legacy: float, new: float, count: int) -> None:
+    print(f"{name:<34} {legacy / count * 1e9:>7.0f} нс → {new / count * 1e9:>5.0f} нс  (x{legacy / new:.1f})")
+
+
+def main() -> None:
+    rng = random.Random(1)
+    values = array("q", (rng.randint(40_000, 70_000) for _ in range(200_000)))
+    strings = [_legacy_format(v) for v in values]
+    count = len(values)
+
+    _report(
+        "форматирование, по одному",
+        _measure(lambda: [_legacy_format(v) if v > 0 else None for v in values]),
+        _measure(lambda: [format_ms_or_none(v) for v in values]),
+        count,
+    )
+    _report(
+        "форматирование, колонкой",
+        _measure(lambda: [_legacy_format(v) if v > 0 else None for v in values]),
+        _measure(lambda: format_ms_many(values)),
+        count,
+    )
+    _report(
+        "разбор строки",
+        _measure(lambda: [_legacy_parse(s) for s in strings]),
+        _measure(lambda: [parse_time_ms(s) for s in strings]),
+        count,
+    )
+    _report(
+        "разбор строк, колонкой",
+        _measure(lambda: [_legacy_parse(s) for s in strings]),
+        _measure(lambda: parse_time_ms_many(strings)),
+        count,
+    )
+
+    page = build_race_page((FIXTURES / "race_large.html").read_text())
+    tables = [c.lap_times for c in page.competitors]
+    laps = sum(len(t) for t in tables)
+    by_index = _measure(lambda: [t[i] for t in tables for i in range(len(t))])
+    batched = _measure(lambda: [lap for t in tables for lap in t])
+    _report(f"LapTable, {laps} кругов", by_index, batched, laps)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Общие данные для набора бенчмарков pytest-benchmark.
+
+Запуск (из корня проекта):
+    python -m pytest benchmarks/suite
+Каждый прогон сохраняется в JSON в .benchmarks/; сравнение с прошлым:
+    python -m pytest benchmarks/suite --benchmark-compare --benchmark-compare-fail=mean:10%
+"""
+import asyncio
+import os
+import sys
+from datetime import date
+from pathlib import Path
+
+import pytest
+
+# benchmarks/suite/conftest.py → benchmarks/suite → benchmarks → project root
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, ROOT)
+# Страницы-фикстуры не должны попасть в общий кэш рабочих процессов
+os.environ.setdefault("SHARED_CACHE_PATH", "none")
+
+import core.database.db as db
+from core.parsers.fetch import FetchResult, Validators
+from scripts.generate_load_data import fill_database
+
+FIXTURES = Path(ROOT) / "tests" / "fixtures" / "kartchrono"
+
+USERS = 2000
+RACES_PER_USER = 50
+LAPS = 3
+DAYS = 365
+TODAY = date(2026, 8, 10)
+
+
+def read_fixture(name: str) -> str:
+    return (FIXTURES / name).read_text()
+
+
+class FixtureFetcher:
+    """Отдаёт сохранённые страницы kartchrono вместо запросов к сайту."""
+
+    def __init__(self, pages: dict, default: str):
+        self.pages = pages
+        self.default = default
+
+    async def fetch_text(self, url: str) -> str:
+        return self.pages.get(url, self.default)
+
+    async def fetch(self, url: str, validators=None) -> FetchResult:
+        text = await self.fetch_text(url)
+        return FetchResult(text=text, validators=Validators(), size=len(text))
+
+
+@pytest.fixture(scope="session")
+def competitors_db(tmp_path_factory):
+    """База с ~100 тыс. строк user_competitors (USERS × RACES_PER_USER)."""
+    path = tmp_path_factory.mktemp("db") / "races.db"
+    fill_database(
+        path, USERS, RACES_PER_USER, LAPS,
+        seed=7, days=DAYS, end_date=TODAY, verbose=False,
+    )
+    original_db_file = db.DB_FILE
+    db.DB_FILE = path
+    try:
+        yield path
+    finally:
+        db.DB_FILE = original_db_file
+
+
+@pytest.fixture(scope="session")
+def event_loop_runner():
+    """Один цикл событий на все ASGI-бенчмарки."""
+    loop = asyncio.new_event_loop()
+    try:
+        yield loop.run_until_complete
+    finally:
+        loop.close()
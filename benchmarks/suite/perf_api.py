@@ -0,0 +1,66 @@
+"""Нагрузка на API в процессе: пачки параллельных запросов через ASGI без сети."""
+import asyncio
+
+import httpx
+import pytest
+
+from api.main import app
+from api.routes import races
+from core.parsers.cache import race_cache
+
+from conftest import FixtureFetcher, read_fixture
+
+CONCURRENCY = 16
+ROUNDS = 5
+
+
+@pytest.fixture
+def api_client(competitors_db, event_loop_runner):
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench")
+    yield client
+    event_loop_runner(client.aclose())
+
+
+async def _burst(client: httpx.AsyncClient, urls):
+    responses = await asyncio.gather(*(client.get(url) for url in urls))
+    for response in responses:
+        assert response.status_code == 200, response.text
+    return responses
+
+
+@pytest.mark.parametrize("fixture", ["race.html", "race_large.html"])
+def bench_races_full_cold(benchmark, monkeypatch, api_client, event_loop_runner, fixture):
+    """Каждый запрос — свой заезд, кэш пуст: загрузка заглушкой и разбор."""
+    monkeypatch.setattr(races._race_parser, "fetcher", FixtureFetcher({}, read_fixture(fixture)))
+    urls = [f"/api/races/full?href=race.php%3Fid%3D{i}" for i in range(CONCURRENCY)]
+
+    def setup():
+        race_cache.clear()
+        return (_burst(api_client, urls),), {}
+
+    benchmark.pedantic(event_loop_runner, setup=setup, rounds=ROUNDS)
+    race_cache.clear()
+
+
+def bench_races_full_cached(benchmark, monkeypatch, api_client, event_loop_runner):
+    """Один и тот же заезд из кэша: сериализация ответа и накладные расходы API."""
+    monkeypatch.setattr(races._race_parser, "fetcher", FixtureFetcher({}, read_fixture("race.html")))
+    urls = ["/api/races/full?href=race.php%3Fid%3D1"] * CONCURRENCY
+    event_loop_runner(_burst(api_client, urls[:1]))
+
+    benchmark.pedantic(
+        event_loop_runner,
+        setup=lambda: ((_burst(api_client, urls),), {}),
+        rounds=ROUNDS,
+    )
+    race_cache.clear()
+
+
+def bench_leaderboard(benchmark, api_client, event_loop_runner):
+    urls = ["/api/leaderboard?limit=20"] * CONCURRENCY
+
+    benchmark.pedantic(
+        event_loop_runner,
+        setup=lambda: ((_burst(api_client, urls),), {}),
+        rounds=ROUNDS,
+    )
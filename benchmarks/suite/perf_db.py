@@ -0,0 +1,41 @@
+"""Запросы лидерборда и статистики на ~100 тыс. строк user_competitors."""
+import pytest
+
+import core.database.db as db
+
+from conftest import TODAY, USERS
+
+
+@pytest.fixture(autouse=True)
+def _db(competitors_db):
+    return competitors_db
+
+
+def bench_best_competitors(benchmark):
+    rows = benchmark(db.get_best_competitors, 20)
+
+    assert len(rows) == 20
+
+
+def bench_best_competitors_today(benchmark):
+    rows = benchmark(db.get_best_competitors_today, TODAY.strftime("%d.%m.%Y"), 20)
+
+    assert rows
+
+
+def bench_best_karts_today(benchmark):
+    rows = benchmark(db.get_best_karts_today, TODAY.strftime("%d.%m.%Y"))
+
+    assert rows
+
+
+def bench_user_competitors(benchmark):
+    rows = benchmark(db.get_user_competitors, USERS // 2)
+
+    assert rows
+
+
+def bench_all_users(benchmark):
+    users = benchmark(db.get_all_users)
+
+    assert len(users) == USERS
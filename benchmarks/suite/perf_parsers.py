@@ -0,0 +1,53 @@
+"""Разбор сохранённых страниц kartchrono."""
+import pytest
+
+from core.parsers.parsers import ArchiveParser, FullRaceInfoParser, RaceParser, build_race_page
+
+from conftest import read_fixture
+
+RACE_PAGES = ["race.html", "race_large.html"]
+
+
+@pytest.fixture(scope="module")
+def archive_html():
+    return read_fixture("archive.html")
+
+
+def bench_archive_parse_html(benchmark, archive_html):
+    parser = ArchiveParser(feed=None)
+
+    days = benchmark(parser._parse_html, archive_html)
+
+    assert len(days) == 30
+
+
+@pytest.mark.parametrize("fixture", RACE_PAGES)
+def bench_race_parse_html(benchmark, fixture):
+    html = read_fixture(fixture)
+    parser = RaceParser(cache=None)
+
+    carts = benchmark(parser._parse_html, html)
+
+    assert carts
+
+
+@pytest.mark.parametrize("fixture", RACE_PAGES)
+def bench_full_race_parse_html(benchmark, fixture):
+    html = read_fixture(fixture)
+    parser = FullRaceInfoParser(cache=None)
+    carts = RaceParser(cache=None)._parse_html(html)
+
+    competitors = benchmark(parser._parse_html, html, carts)
+
+    assert len(competitors) == len(carts)
+
+
+@pytest.mark.parametrize("fixture", RACE_PAGES)
+def bench_decode_binary_laps(benchmark, fixture):
+    page = build_race_page(read_fixture(fixture))
+    competitor = max(page.competitors, key=lambda c: len(c.binary_laps))
+    parser = FullRaceInfoParser(cache=None)
+
+    laps = benchmark(parser._decode_binary_laps, competitor.binary_laps)
+
+    assert len(laps) == len(competitor.lap_times)
@@ -11,15 +11,22 @@ from telegram import (
 from telegram.constants import ParseMode
 from telegram.ext import (
     Application, CommandHandler, ContextTypes,
-    ConversationHandler, CallbackQueryHandler, MessageHandler, filters
+    ConversationHandler, CallbackQueryHandler, MessageHandler, TypeHandler, filters
 )
+from bot.persistence import SQLitePersistence
+from bot.update_processor import PerChatUpdateProcessor
 from core.parsers.parsers import ArchiveParser, RaceParser, FullRaceInfoParser
+from core.parsers.governor import Priority, upstream_priority
+from core.parsers.cache import race_cache
+from core.parsers.executor import parse_executor
 from core.models.models import ParsingError
+from core.metrics import LoopLagMonitor, blocking_watchdog
+from core.metrics.server import start_metrics_server
 from core.database.db import (
     init_db, save_competitor, get_user_competitors, get_competitor_by_key,
-    delete_competitor, get_all_competitors, get_best_competitors, get_best_competitors_today,
-    upsert_user_profile,
+    delete_competitor, get_all_competitors, upsert_user_profile, write_queue,
 )
+from core.cache.leaderboard import best_competitors, best_competitors_today
 import json
 
 logging.basicConfig(
@@ -28,7 +35,22 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 try:
-    from core.config.config import BOT_TOKEN
+    from core.config.config import (
+        BOT_TOKEN,
+        BOT_STATE_PATH,
+        BOT_CONVERSATION_TIMEOUT_SECONDS,
+        BOT_PERSISTENCE_INTERVAL_SECONDS,
+        BOT_CONCURRENT_UPDATES,
+        BOT_PREFETCH_CONCURRENCY,
+        BOT_METRICS_HOST,
+        BOT_METRICS_PORT,
+        ENABLE_WEBHOOKS,
+        WEBHOOK_URL,
+        WEBHOOK_PORT,
+        WEBHOOK_LISTEN,
+        WEBHOOK_PATH,
+        WEBHOOK_SECRET_TOKEN,
+    )
     if not BOT_TOKEN or BOT_TOKEN == "YOUR_BOT_TOKEN_HERE":
         print("❌ Не установлен BOT_TOKEN!")
         print("Установи переменную окружения BOT_TOKEN или добавь в файл .env")
@@ -44,6 +66,10 @@ full_race_parser = FullRaceInfoParser()
 SELECT_USER, SELECT_DATE, SHOW_RACES, SHOW_CARTS = range(4)
 PAGE_SIZE = 10
 
+# Фоновая предзагрузка заездов видимой страницы: (chat_id, user_id) → задачи
+_prefetch_tasks: dict = {}
+_prefetch_semaphore = asyncio.Semaphore(BOT_PREFETCH_CONCURRENCY)
+
 
 # ────────────────────────── Formatters ──────────────────────────
 
@@ -196,6 +222,47 @@ async def _edit_message_with_thread(query, text: str, reply_markup=None, parse_m
     )
 
 
+def _prefetch_key(update: Update) -> tuple:
+    return update.effective_chat.id, update.effective_user.id
+
+
+def _cancel_prefetch(key: tuple) -> None:
+    """Отменяет ещё не завершённую предзагрузку — пользователь ушёл со страницы."""
+    for task in _prefetch_tasks.pop(key, []):
+        task.cancel()
+
+
+async def _prefetch_race(href: str) -> None:
+    async with _prefetch_semaphore:
+        try:
+            with upstream_priority(Priority.PREFETCH):
+                await race_parser.parse_page(href)
+        except ParsingError as e:
+            logger.debug(f"Предзагрузка заезда {href} не удалась: {e}")
+
+
+def _schedule_prefetch(key: tuple, races: list) -> None:
+    """Предзагружает заезды страницы в общий кэш, пока пользователь выбирает."""
+    _cancel_prefetch(key)
+    tasks = [
+        asyncio.create_task(_prefetch_race(race.href))
+        for race in races
+        if race_cache.get(race.href) is None
+    ]
+    if tasks:
+        _prefetch_tasks[key] = tasks
+        for task in tasks:
+            task.add_done_callback(lambda t, key=key: _forget_prefetch(key, t))
+
+
+def _forget_prefetch(key: tuple, task: asyncio.Task) -> None:
+    tasks = _prefetch_tasks.get(key)
+    if tasks and task in tasks:
+        tasks.remove(task)
+        if not tasks:
+            del _prefetch_tasks[key]
+
+
 async def _send_user_keyboard(query, context):
     """Отрисовывает клавиатуру выбора пользователя."""
     users_ordered = context.user_data.get("user_options", [])
@@ -249,7 +316,7 @@ async def add_race_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     for u in users_ordered:
         name = u.full_name or u.username
         if name:
-            upsert_user_profile(u.id, name, u.username)
+            await asyncio.to_thread(upsert_user_profile, u.id, name, u.username)
         asyncio.create_task(_cache_user_photo(context.bot, u.id))
 
     keyboard = _build_keyboard(
@@ -322,8 +389,8 @@ async def _send_date_page(query, context, today_exists: bool, page: int):
     await _edit_message_with_thread(query, text, reply_markup=keyboard)
 
 
-async def _send_races_page(query, context, page: int):
-    """Отправляет постраничный список заездов."""
+async def _send_races_page(query, context, page: int, prefetch_key: tuple = None):
+    """Отправляет постраничный список заездов и предзагружает видимые заезды."""
     races = context.user_data.get("current_races", [])
     context.user_data["races_page"] = page
 
@@ -351,6 +418,8 @@ async def _send_races_page(query, context, page: int):
         f"Дата: {context.user_data.get('selected_date_text','')}\n"
         f"Всего заездов: {len(races)}"
     )
+    if prefetch_key is not None:
+        _schedule_prefetch(prefetch_key, slice_races)
     await _edit_message_with_thread(query, f"{header}\nВыберите заезд:", reply_markup=keyboard)
 
 
@@ -367,7 +436,7 @@ async def races_page_callback(update: Update, context: ContextTypes.DEFAULT_TYPE
     query = update.callback_query
     await query.answer()
     page = int(query.data.split("_", 2)[2])
-    await _send_races_page(query, context, page=page)
+    await _send_races_page(query, context, page=page, prefetch_key=_prefetch_key(update))
     return SHOW_RACES
 
 
@@ -402,13 +471,14 @@ async def select_date_callback(update: Update, context: ContextTypes.DEFAULT_TYP
     context.user_data["selected_date_actual"] = actual_date
     context.user_data["current_races"] = day_race.races
 
-    await _send_races_page(query, context, page=0)
+    await _send_races_page(query, context, page=0, prefetch_key=_prefetch_key(update))
     return SHOW_RACES
 
 
 async def back_to_dates_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     await query.answer()
+    _cancel_prefetch(_prefetch_key(update))
     page = context.user_data.get("last_page", 0)
     today_exists = context.user_data.get("today_exists", False)
     await _send_date_page(query, context, today_exists=today_exists, page=page)
@@ -434,13 +504,13 @@ async def race_selected_callback(update: Update, context: ContextTypes.DEFAULT_T
     race = races_list[idx]
 
     try:
-        carts, race_html = await race_parser.parse_with_html(race.href)
+        page = await race_parser.parse_page(race.href)
     except ParsingError as e:
         await _edit_message_with_thread(query, f"❌ Ошибка парсинга: {e}")
         return ConversationHandler.END
 
+    carts = page.carts
     context.user_data["current_carts"] = carts
-    context.user_data["current_race_html"] = race_html
     context.user_data["selected_race_number"] = race.number
     context.user_data["selected_race_href"] = race.href
 
@@ -468,11 +538,10 @@ async def cart_selected_callback(update: Update, context: ContextTypes.DEFAULT_T
 
     cart = carts[idx]
     race_href = context.user_data.get("selected_race_href", "")
-    cached_html = context.user_data.get("current_race_html")
-
     try:
-        await _edit_message_with_thread(query, "🔄 Получаю детальную информацию о заезде...")
-        competitors = await full_race_parser.parse(race_href, carts, html=cached_html)
+        if race_cache.get(race_href) is None:
+            await _edit_message_with_thread(query, "🔄 Получаю детальную информацию о заезде...")
+        competitors = await full_race_parser.parse(race_href, carts)
 
         selected_competitor = next((c for c in competitors if c.num == cart.number), None)
         if not selected_competitor:
@@ -497,7 +566,8 @@ async def cart_selected_callback(update: Update, context: ContextTypes.DEFAULT_T
         }
 
         try:
-            save_result = save_competitor(
+            save_result = await asyncio.to_thread(
+                save_competitor,
                 user_id=context.user_data.get("selected_user"),
                 date=context.user_data.get("selected_date_actual", ""),
                 race_number=context.user_data.get("selected_race_number", ""),
@@ -547,6 +617,7 @@ async def cart_selected_callback(update: Update, context: ContextTypes.DEFAULT_T
         )
         return ConversationHandler.END
 
+    context.user_data.clear()
     return ConversationHandler.END
 
 
@@ -554,17 +625,24 @@ async def back_to_races_callback(update: Update, context: ContextTypes.DEFAULT_T
     query = update.callback_query
     await query.answer()
     page = context.user_data.get("races_page", 0)
-    await _send_races_page(query, context, page=page)
+    await _send_races_page(query, context, page=page, prefetch_key=_prefetch_key(update))
     return SHOW_RACES
 
 
 async def cancel_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Отменяет текущий диалог /add."""
+    _cancel_prefetch(_prefetch_key(update))
     context.user_data.clear()
     await _send_message_with_thread(context, update, "❌ Действие отменено.")
     return ConversationHandler.END
 
 
+async def conversation_timeout_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Освобождает данные брошенного диалога /add по таймауту."""
+    _cancel_prefetch(_prefetch_key(update))
+    context.user_data.clear()
+
+
 # ────────────────────────── /stats ──────────────────────────
 
 async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -730,7 +808,7 @@ async def delete_stats_callback(update: Update, context: ContextTypes.DEFAULT_TY
     user_id = int(user_id_str)
 
     try:
-        ok = delete_competitor(user_id, d, rn, cn)
+        ok = await asyncio.to_thread(delete_competitor, user_id, d, rn, cn)
         if ok:
             await _edit_message_with_thread(
                 query,
@@ -821,7 +899,7 @@ async def best_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     except Exception:
         pass
 
-    competitors = get_best_competitors(20)
+    competitors = best_competitors(20)
     if not competitors:
         await _send_message_with_thread(context, update, "🏆 Пока нет данных для рейтинга.")
         return
@@ -839,7 +917,7 @@ async def best_today_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
         pass
 
     today = date.today().strftime("%d.%m.%Y")
-    competitors = get_best_competitors_today(today, 20)
+    competitors = best_competitors_today(today, 20)
     if not competitors:
         await _send_message_with_thread(context, update, "🏆 Сегодня заездов не было.")
         return
@@ -917,11 +995,50 @@ async def _set_default_commands(app: Application) -> None:
     )
 
 
+_loop_lag_monitor = LoopLagMonitor()
+
+
+async def _post_init(app: Application) -> None:
+    await _set_default_commands(app)
+    _loop_lag_monitor.start()
+    blocking_watchdog.start()
+    if BOT_METRICS_PORT:
+        try:
+            app.bot_data["metrics_runner"] = await start_metrics_server(
+                BOT_METRICS_HOST, BOT_METRICS_PORT
+            )
+            logger.info(f"Метрики бота: http://{BOT_METRICS_HOST}:{BOT_METRICS_PORT}/metrics")
+        except OSError as e:
+            logger.error(f"Не удалось запустить листенер метрик: {e}")
+
+
+async def _post_shutdown(app: Application) -> None:
+    await _loop_lag_monitor.stop()
+    await blocking_watchdog.stop()
+    await asyncio.to_thread(parse_executor.shutdown)
+    await asyncio.to_thread(write_queue.close)
+    runner = app.bot_data.pop("metrics_runner", None)
+    if runner is not None:
+        await runner.cleanup()
+
+
 def main() -> None:
     """Главная функция для запуска бота."""
-    application = Application.builder().token(BOT_TOKEN).build()
+    persistence = SQLitePersistence(
+        BOT_STATE_PATH,
+        conversation_timeout=BOT_CONVERSATION_TIMEOUT_SECONDS,
+        update_interval=BOT_PERSISTENCE_INTERVAL_SECONDS,
+    )
+    application = (
+        Application.builder()
+        .token(BOT_TOKEN)
+        .persistence(persistence)
+        .concurrent_updates(PerChatUpdateProcessor(BOT_CONCURRENT_UPDATES))
+        .build()
+    )
     init_db()
-    application.post_init = _set_default_commands
+    application.post_init = _post_init
+    application.post_shutdown = _post_shutdown
 
     conv = ConversationHandler(
         entry_points=[
@@ -946,10 +1063,16 @@ def main() -> None:
                 CallbackQueryHandler(back_to_races_callback, pattern=r"^back_races$"),
                 CallbackQueryHandler(cart_selected_callback, pattern=r"^cart_\d+$"),
             ],
+            ConversationHandler.TIMEOUT: [
+                TypeHandler(Update, conversation_timeout_callback),
+            ],
         },
         fallbacks=[
             CommandHandler("cancel", cancel_command),
         ],
+        conversation_timeout=BOT_CONVERSATION_TIMEOUT_SECONDS,
+        name="add_race",
+        persistent=True,
     )
     application.add_handler(conv)
 
@@ -973,8 +1096,23 @@ def main() -> None:
 
     application.add_error_handler(error_handler)
 
-    print("🚀 Бот запущен!")
-    application.run_polling(allowed_updates=Update.ALL_TYPES)
+    if ENABLE_WEBHOOKS:
+        if not WEBHOOK_URL:
+            print("❌ ENABLE_WEBHOOKS=true, но WEBHOOK_URL не задан!")
+            exit(1)
+        url_path = WEBHOOK_PATH.strip("/")
+        print(f"🚀 Бот запущен (webhook на порту {WEBHOOK_PORT})!")
+        application.run_webhook(
+            listen=WEBHOOK_LISTEN,
+            port=WEBHOOK_PORT,
+            url_path=url_path,
+            webhook_url=f"{WEBHOOK_URL.rstrip('/')}/{url_path}",
+            secret_token=WEBHOOK_SECRET_TOKEN or None,
+            allowed_updates=Update.ALL_TYPES,
+        )
+    else:
+        print("🚀 Бот запущен!")
+        application.run_polling(allowed_updates=Update.ALL_TYPES)
 
 
 if __name__ == "__main__":
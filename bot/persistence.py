@@ -0,0 +1,335 @@
+"""
+SQLite-хранилище состояния диалогов бота для python-telegram-bot.
+
+Сохраняются только user_data и состояния ConversationHandler, причём
+user_data — в компактном виде: заранее известные ключи сценария /add
+кодируются в короткие JSON-массивы, всё остальное (временные объекты,
+страницы заездов из общего кэша) в базу не попадает и при рестарте
+просто перезапрашивается. Записи старше таймаута диалога отбрасываются
+при загрузке, поэтому брошенные сценарии не переживают перезапуск.
+
+Запросы к файлу идут через asyncio.to_thread, чтобы COMMIT с fsync не
+останавливал цикл событий бота. Они выполняются по одному и в порядке
+вызова, так что более старое состояние не перезапишет новое.
+"""
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from copy import deepcopy
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from telegram import User
+from telegram.ext import BasePersistence, PersistenceInput
+
+from core.models.models import Cart, DayRaces, Race
+
+_DATE_FORMAT = "%d.%m.%Y"
+
+
+def _encode_race(race: Race) -> list:
+    return [race.number, race.href]
+
+
+def _decode_race(value: list) -> Race:
+    return Race(number=value[0], href=value[1])
+
+
+def _encode_day_races(day_races: Optional[DayRaces]) -> Optional[list]:
+    if day_races is None:
+        return None
+    return [
+        day_races.date.strftime(_DATE_FORMAT),
+        [_encode_race(r) for r in day_races.races],
+    ]
+
+
+def _decode_day_races(value: Optional[list]) -> Optional[DayRaces]:
+    if value is None:
+        return None
+    return DayRaces(
+        date=datetime.strptime(value[0], _DATE_FORMAT),
+        races=[_decode_race(r) for r in value[1]],
+    )
+
+
+def _encode_user(user: User) -> list:
+    return [user.id, user.first_name, user.last_name, user.username]
+
+
+def _decode_user(value: list) -> User:
+    return User(
+        id=value[0],
+        first_name=value[1] or "",
+        is_bot=False,
+        last_name=value[2],
+        username=value[3],
+    )
+
+
+def _encode_cart(cart: Cart) -> list:
+    return [cart.id, cart.number, cart.best_lap, cart.position]
+
+
+def _decode_cart(value: list) -> Cart:
+    return Cart(id=value[0], number=value[1], best_lap=value[2], position=value[3])
+
+
+def _identity(value: Any) -> Any:
+    return value
+
+
+def _list_of(
+    encode: Callable[[Any], Any], decode: Callable[[Any], Any]
+) -> Tuple[Callable[[Any], Any], Callable[[Any], Any]]:
+    return (
+        lambda items: [encode(item) for item in items],
+        lambda items: [decode(item) for item in items],
+    )
+
+
+# Ключ user_data → (короткое имя в базе, encode, decode).
+# Ключи, которых здесь нет, не сохраняются.
+_USER_DATA_SCHEMA: Dict[str, Tuple[str, Callable, Callable]] = {
+    "user_options": ("uo", *_list_of(_encode_user, _decode_user)),
+    "selected_user": ("su", _identity, _identity),
+    "selected_user_name": ("sn", _identity, _identity),
+    "today_dr": ("td", _encode_day_races, _decode_day_races),
+    "today_exists": ("te", _identity, _identity),
+    "other_dates": ("od", *_list_of(_encode_day_races, _decode_day_races)),
+    "last_page": ("lp", _identity, _identity),
+    "selected_date_text": ("dt", _identity, _identity),
+    "selected_date_actual": ("da", _identity, _identity),
+    "current_races": ("cr", *_list_of(_encode_race, _decode_race)),
+    "races_page": ("rp", _identity, _identity),
+    "selected_race_number": ("rn", _identity, _identity),
+    "selected_race_href": ("rh", _identity, _identity),
+    "current_carts": ("cc", *_list_of(_encode_cart, _decode_cart)),
+}
+_SHORT_KEYS = {short: key for key, (short, _, _) in _USER_DATA_SCHEMA.items()}
+
+
+def encode_user_data(user_data: Dict[str, Any]) -> str:
+    """Кодирует user_data в компактный JSON, пропуская неизвестные ключи."""
+    compact = {}
+    for key, value in user_data.items():
+        schema = _USER_DATA_SCHEMA.get(key)
+        if schema is None:
+            continue
+        short, encode, _ = schema
+        compact[short] = encode(value)
+    return json.dumps(compact, ensure_ascii=False, separators=(",", ":"))
+
+
+def decode_user_data(payload: str) -> Dict[str, Any]:
+    """Восстанавливает user_data из компактного JSON."""
+    user_data = {}
+    for short, value in json.loads(payload).items():
+        key = _SHORT_KEYS.get(short)
+        if key is None:
+            continue
+        _, _, decode = _USER_DATA_SCHEMA[key]
+        user_data[key] = decode(value)
+    return user_data
+
+
+class SQLitePersistence(BasePersistence):
+    """Хранит user_data и состояния диалогов в отдельном SQLite-файле."""
+
+    def __init__(
+        self,
+        path: Path,
+        conversation_timeout: Optional[float] = None,
+        update_interval: float = 60,
+    ):
+        super().__init__(
+            store_data=PersistenceInput(
+                bot_data=False, chat_data=False, user_data=True, callback_data=False
+            ),
+            update_interval=update_interval,
+        )
+        self.path = Path(path)
+        self.conversation_timeout = conversation_timeout
+        self._conn: Optional[sqlite3.Connection] = None
+        # Соединение делят потоки пула; _io держит порядок вызовов
+        self._lock = threading.Lock()
+        self._io = asyncio.Lock()
+        self._user_data: Optional[Dict[int, Dict[str, Any]]] = None
+        self._user_payloads: Dict[int, str] = {}
+
+    def _get_conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS bot_user_data (
+                    user_id INTEGER PRIMARY KEY,
+                    data TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS bot_conversations (
+                    name TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    state INTEGER NOT NULL,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (name, key)
+                )
+                """
+            )
+            self._conn.commit()
+        return self._conn
+
+    def _reap_expired(self, conn: sqlite3.Connection) -> None:
+        """Удаляет брошенные диалоги старше таймаута."""
+        if not self.conversation_timeout:
+            return
+        cutoff = time.time() - self.conversation_timeout
+        conn.execute("DELETE FROM bot_user_data WHERE updated_at < ?", (cutoff,))
+        conn.execute("DELETE FROM bot_conversations WHERE updated_at < ?", (cutoff,))
+        conn.commit()
+
+    def _load_user_data(self) -> Dict[int, str]:
+        with self._lock:
+            conn = self._get_conn()
+            self._reap_expired(conn)
+            return dict(conn.execute("SELECT user_id, data FROM bot_user_data"))
+
+    def _write_user_data(self, user_id: int, payload: Optional[str]) -> None:
+        """Сохраняет запись пользователя; payload None — удаляет её."""
+        with self._lock:
+            conn = self._get_conn()
+            if payload is None:
+                conn.execute("DELETE FROM bot_user_data WHERE user_id = ?", (user_id,))
+            else:
+                conn.execute(
+                    """
+                    INSERT INTO bot_user_data (user_id, data, updated_at) VALUES (?, ?, ?)
+                    ON CONFLICT(user_id) DO UPDATE SET
+                        data = excluded.data, updated_at = excluded.updated_at
+                    """,
+                    (user_id, payload, time.time()),
+                )
+            conn.commit()
+
+    def _load_conversations(self, name: str) -> Dict[Tuple[int, ...], object]:
+        with self._lock:
+            conn = self._get_conn()
+            self._reap_expired(conn)
+            return {
+                tuple(json.loads(key)): state
+                for key, state in conn.execute(
+                    "SELECT key, state FROM bot_conversations WHERE name = ?", (name,)
+                )
+            }
+
+    def _write_conversation(self, name: str, encoded_key: str, new_state: Optional[object]) -> None:
+        with self._lock:
+            conn = self._get_conn()
+            if new_state is None:
+                conn.execute(
+                    "DELETE FROM bot_conversations WHERE name = ? AND key = ?",
+                    (name, encoded_key),
+                )
+            else:
+                conn.execute(
+                    """
+                    INSERT INTO bot_conversations (name, key, state, updated_at)
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT(name, key) DO UPDATE SET
+                        state = excluded.state, updated_at = excluded.updated_at
+                    """,
+                    (name, encoded_key, new_state, time.time()),
+                )
+            conn.commit()
+
+    def _close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.commit()
+                self._conn.close()
+                self._conn = None
+
+    async def _run(self, func: Callable[..., Any], *args: Any) -> Any:
+        async with self._io:
+            return await asyncio.to_thread(func, *args)
+
+    async def get_user_data(self) -> Dict[int, Dict[str, Any]]:
+        if self._user_data is None:
+            payloads = await self._run(self._load_user_data)
+            self._user_data = {}
+            for user_id, payload in payloads.items():
+                self._user_data[user_id] = decode_user_data(payload)
+                self._user_payloads[user_id] = payload
+        return deepcopy(self._user_data)
+
+    async def update_user_data(self, user_id: int, data: Dict[str, Any]) -> None:
+        if self._user_data is None:
+            self._user_data = {}
+        self._user_data[user_id] = data
+        payload = encode_user_data(data)
+        if self._user_payloads.get(user_id) == payload:
+            return
+        if payload == "{}":
+            self._user_payloads.pop(user_id, None)
+            await self._run(self._write_user_data, user_id, None)
+        else:
+            self._user_payloads[user_id] = payload
+            await self._run(self._write_user_data, user_id, payload)
+
+    async def refresh_user_data(self, user_id: int, user_data: Dict[str, Any]) -> None:
+        pass
+
+    async def drop_user_data(self, user_id: int) -> None:
+        if self._user_data is not None:
+            self._user_data.pop(user_id, None)
+        self._user_payloads.pop(user_id, None)
+        await self._run(self._write_user_data, user_id, None)
+
+    async def get_conversations(self, name: str) -> Dict[Tuple[int, ...], object]:
+        return await self._run(self._load_conversations, name)
+
+    async def update_conversation(
+        self, name: str, key: Tuple[int, ...], new_state: Optional[object]
+    ) -> None:
+        encoded_key = json.dumps(list(key), separators=(",", ":"))
+        await self._run(self._write_conversation, name, encoded_key, new_state)
+
+    async def get_chat_data(self) -> Dict[int, Any]:
+        return {}
+
+    async def update_chat_data(self, chat_id: int, data: Any) -> None:
+        pass
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: Any) -> None:
+        pass
+
+    async def drop_chat_data(self, chat_id: int) -> None:
+        pass
+
+    async def get_bot_data(self) -> Any:
+        return {}
+
+    async def update_bot_data(self, data: Any) -> None:
+        pass
+
+    async def refresh_bot_data(self, bot_data: Any) -> None:
+        pass
+
+    async def get_callback_data(self) -> None:
+        return None
+
+    async def update_callback_data(self, data: Any) -> None:
+        pass
+
+    async def flush(self) -> None:
+        await self._run(self._close)
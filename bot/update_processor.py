@@ -0,0 +1,94 @@
+"""
+Параллельная обработка апдейтов с сохранением порядка внутри одного диалога.
+
+Апдейты разных чатов/пользователей обрабатываются одновременно, а апдейты
+с одинаковым ключом (chat_id, user_id) — строго по очереди, в порядке
+поступления. Это тот же ключ, по которому ConversationHandler хранит
+состояние, поэтому нажатия кнопок в одном диалоге не гоняются друг с
+другом, а медленный запрос к kartchrono в одном чате не задерживает другие.
+"""
+import asyncio
+import time
+from typing import Any, Awaitable, Dict, Optional, Tuple
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+from core.metrics import registry
+
+# Верхняя граница апдейтов, ожидающих своей очереди. Реальный параллелизм
+# ограничивается max_concurrent_updates уже после захвата блокировки ключа,
+# чтобы ожидающие апдейты одного чата не занимали слоты остальных.
+_MAX_PENDING_UPDATES = 1024
+
+UPDATE_SECONDS = registry.histogram(
+    "carting_bot_update_seconds",
+    "Время обработки апдейта с учётом ожидания своей очереди",
+    ["kind"],
+)
+
+
+def _update_kind(update: object) -> str:
+    if isinstance(update, Update):
+        if update.callback_query is not None:
+            return "callback_query"
+        if update.message is not None:
+            return "message"
+    return "other"
+
+
+class PerChatUpdateProcessor(BaseUpdateProcessor):
+    """Обрабатывает апдейты параллельно, сериализуя их по (chat_id, user_id)."""
+
+    def __init__(self, max_concurrent_updates: int):
+        if max_concurrent_updates < 1:
+            raise ValueError("`max_concurrent_updates` must be a positive integer!")
+        super().__init__(max(_MAX_PENDING_UPDATES, max_concurrent_updates))
+        self.max_workers = max_concurrent_updates
+        self._workers = asyncio.Semaphore(max_concurrent_updates)
+        self._locks: Dict[Tuple[Optional[int], Optional[int]], asyncio.Lock] = {}
+        self._pending: Dict[Tuple[Optional[int], Optional[int]], int] = {}
+
+    @staticmethod
+    def serialization_key(update: object) -> Optional[Tuple[Optional[int], Optional[int]]]:
+        if not isinstance(update, Update):
+            return None
+        chat_id = update.effective_chat.id if update.effective_chat else None
+        user_id = update.effective_user.id if update.effective_user else None
+        if chat_id is None and user_id is None:
+            return None
+        return chat_id, user_id
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        started = time.perf_counter()
+        try:
+            await self._process_in_order(update, coroutine)
+        finally:
+            UPDATE_SECONDS.labels(_update_kind(update)).observe(time.perf_counter() - started)
+
+    async def _process_in_order(self, update: object, coroutine: Awaitable[Any]) -> None:
+        key = self.serialization_key(update)
+        if key is None:
+            async with self._workers:
+                await coroutine
+            return
+
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = asyncio.Lock()
+        self._pending[key] = self._pending.get(key, 0) + 1
+        try:
+            async with lock:
+                async with self._workers:
+                    await coroutine
+        finally:
+            self._pending[key] -= 1
+            if not self._pending[key]:
+                del self._pending[key]
+                del self._locks[key]
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
@@ -10,6 +10,7 @@ import sys
 # bot/utils/health_check.py → bot/utils → bot → project root
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
+from core.config.config import KARTCHRONO_BASE_URL
 from core.database.db import get_all_competitors
 from core.parsers.parsers import ArchiveParser
 from core.models.models import ParsingError
@@ -19,7 +20,7 @@ async def check_website():
     try:
         timeout = aiohttp.ClientTimeout(total=10)
         async with aiohttp.ClientSession(timeout=timeout) as session:
-            async with session.get("https://mayak.kartchrono.com/archive/") as response:
+            async with session.get(KARTCHRONO_BASE_URL) as response:
                 if response.status == 200:
                     return True, "Сайт доступен"
                 else:
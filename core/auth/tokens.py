@@ -7,19 +7,21 @@ import re
 from collections import OrderedDict
 from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
-from threading import RLock
-from time import monotonic
+from threading import Lock, RLock
+from time import monotonic, time
 from typing import Mapping, Optional
 
 import jwt
 from jwt import PyJWKClient
 
 from core.config.config import (
+    ACCESS_TOKEN_CACHE_SIZE,
     AUTH_SECRET,
     TELEGRAM_LOGIN_CLIENT_ID,
     TELEGRAM_LOGIN_JWKS_TIMEOUT_SECONDS,
     TELEGRAM_LOGIN_JWKS_URL,
 )
+from core.metrics import registry
 
 ACCESS_TOKEN_LIFETIME_SECONDS = 900
 TELEGRAM_AUTH_MAX_AGE_SECONDS = 10 * 60
@@ -36,6 +38,14 @@ logger = logging.getLogger(__name__)
 _TELEGRAM_JWK_CLIENT_LOCK = RLock()
 _telegram_jwk_client: Optional[PyJWKClient] = None
 _telegram_unknown_kids: OrderedDict[str, float] = OrderedDict()
+_ACCESS_TOKEN_CACHE_LOCK = Lock()
+# HMAC(AUTH_SECRET, token) -> (user ID, exp); only successfully verified tokens
+_access_token_cache: OrderedDict[bytes, tuple[int, float]] = OrderedDict()
+ACCESS_TOKEN_CACHE_REQUESTS = registry.counter(
+    "carting_access_token_cache_requests_total",
+    "Access token verifications by verification cache result",
+    ["result"],
+)
 
 
 @dataclass(frozen=True)
@@ -254,7 +264,39 @@ def issue_access_token(user_id: int) -> str:
     )
 
 
-def decode_access_token(token: str) -> int:
+def _access_token_cache_key(token: str) -> bytes:
+    # Keyed by the secret too, so rotating AUTH_SECRET invalidates every entry
+    return hmac.new(AUTH_SECRET.encode(), token.encode(), hashlib.sha256).digest()
+
+
+def _cached_access_token_subject(key: bytes, now: float) -> Optional[int]:
+    with _ACCESS_TOKEN_CACHE_LOCK:
+        entry = _access_token_cache.get(key)
+        if entry is None:
+            return None
+        user_id, expires_at = entry
+        # Same rule as PyJWT: a token is expired once exp <= now
+        if expires_at <= now:
+            _access_token_cache.pop(key, None)
+            return None
+        _access_token_cache.move_to_end(key)
+        return user_id
+
+
+def _remember_access_token(key: bytes, user_id: int, expires_at: float) -> None:
+    with _ACCESS_TOKEN_CACHE_LOCK:
+        _access_token_cache[key] = (user_id, expires_at)
+        _access_token_cache.move_to_end(key)
+        while len(_access_token_cache) > ACCESS_TOKEN_CACHE_SIZE:
+            _access_token_cache.popitem(last=False)
+
+
+def clear_access_token_cache() -> None:
+    with _ACCESS_TOKEN_CACHE_LOCK:
+        _access_token_cache.clear()
+
+
+def _verify_access_token(token: str) -> tuple[int, object]:
     payload = jwt.decode(token, AUTH_SECRET, algorithms=["HS256"])
     if payload.get("type") != "access":
         raise jwt.InvalidTokenError("unexpected token type")
@@ -262,6 +304,28 @@ def decode_access_token(token: str) -> int:
     if not isinstance(subject, str):
         raise jwt.InvalidTokenError("missing subject")
     try:
-        return int(subject)
+        return int(subject), payload.get("exp")
     except ValueError as exc:
         raise jwt.InvalidTokenError("invalid subject") from exc
+
+
+def decode_access_token(token: str) -> int:
+    """Verify an access token and return its user ID.
+
+    Verified tokens are remembered until their exp in a bounded LRU, so a
+    client polling with one token pays for the HS256 decode once. Rejected
+    tokens are never cached and always go through full validation.
+    """
+    if ACCESS_TOKEN_CACHE_SIZE <= 0 or not isinstance(token, str):
+        return _verify_access_token(token)[0]
+    key = _access_token_cache_key(token)
+    user_id = _cached_access_token_subject(key, time())
+    if user_id is not None:
+        ACCESS_TOKEN_CACHE_REQUESTS.labels("hit").inc()
+        return user_id
+    ACCESS_TOKEN_CACHE_REQUESTS.labels("miss").inc()
+    user_id, expires_at = _verify_access_token(token)
+    # Tokens without a numeric exp never expire for PyJWT; keep verifying them in full
+    if isinstance(expires_at, (int, float)) and not isinstance(expires_at, bool):
+        _remember_access_token(key, user_id, float(expires_at))
+    return user_id
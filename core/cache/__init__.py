@@ -0,0 +1,5 @@
+"""Кэш, общий для воркеров API и процесса бота."""
+
+from core.cache.shared import CachedValue, SharedCache, shared_cache
+
+__all__ = ["CachedValue", "SharedCache", "shared_cache"]
@@ -0,0 +1,36 @@
+"""
+Рейтинги гонщиков через общий кэш процессов.
+
+Запрос рейтинга — группировка по всей таблице заездов, а спрашивают его
+чаще, чем меняются данные. Ключ кэша содержит версию данных из
+data_versions, которую триггеры увеличивают при любом изменении заездов
+и имён или аватаров в профилях — так все воркеры API и бот видят одно и
+то же и пересчитывают рейтинг сразу после записи, а не по истечении TTL.
+"""
+from typing import Any, Callable, List
+
+import core.database.db as db
+from core.cache.shared import shared_cache
+from core.config.config import LEADERBOARD_CACHE_TTL_SECONDS
+
+_NAMESPACE = "leaderboard"
+
+
+def _cached(key: str, compute: Callable[[], List[Any]]) -> List[Any]:
+    if shared_cache is None:
+        return compute()
+    version = db.get_data_version("leaderboard")
+    # Путь к базе в ключе: у тестов и нагрузочных прогонов свои файлы
+    return shared_cache.memoize(
+        _NAMESPACE, f"{db.DB_FILE}:{version}:{key}", compute, LEADERBOARD_CACHE_TTL_SECONDS
+    )
+
+
+def best_competitors(limit: int = 20) -> List[Any]:
+    """get_best_competitors через общий кэш."""
+    return _cached(f"all:{limit}", lambda: db.get_best_competitors(limit))
+
+
+def best_competitors_today(today_date: str, limit: int = 20) -> List[Any]:
+    """get_best_competitors_today через общий кэш."""
+    return _cached(f"day:{today_date}:{limit}", lambda: db.get_best_competitors_today(today_date, limit))
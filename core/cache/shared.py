@@ -0,0 +1,222 @@
+"""
+Общий кэш для всех процессов: воркеров API и бота.
+
+Кэши в памяти у каждого процесса свои, и при нескольких воркерах uvicorn
+каждый из них отдельно ходит на kartchrono и отдельно считает рейтинги.
+SharedCache хранит значения в SQLite-файле рядом с базой (как общий
+token bucket в core.parsers.governor): записи — pickle значения со сроком
+годности по часам системы, так что его видят все процессы на машине.
+Внешних сервисов не нужно; режим WAL позволяет читать без блокировок,
+пока другой процесс пишет.
+
+Просроченные записи не удаляются сразу: когда сайт недоступен, они
+годятся как устаревшая копия. Файл ограничен max_entries записями,
+лишние вытесняются по времени записи.
+
+В файле лежат pickle, поэтому он должен быть доступен только сервису —
+так же, как сама база.
+"""
+import asyncio
+import logging
+import pickle
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from core.config.config import SHARED_CACHE_MAX_ENTRIES, SHARED_CACHE_PATH
+from core.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+SHARED_CACHE_REQUESTS = registry.counter(
+    "carting_shared_cache_requests_total",
+    "Обращения к общему кэшу процессов по пространству имён и результату",
+    ["namespace", "result"],
+)
+
+
+@dataclass(frozen=True, slots=True)
+class CachedValue:
+    value: Any
+    expires_at: float
+    stored_at: float
+
+    @property
+    def fresh(self) -> bool:
+        return self.expires_at > time.time()
+
+    @property
+    def ttl_left(self) -> float:
+        return max(0.0, self.expires_at - time.time())
+
+
+class SharedCache:
+    """Кэш «пространство имён + ключ → значение» в SQLite-файле."""
+
+    def __init__(self, path: Path, max_entries: int = 5000, prune_every: int = 200):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.prune_every = prune_every
+        self._local = threading.local()
+        self._writes = 0
+
+    def _get_conn(self) -> sqlite3.Connection:
+        # Соединение на поток: запросы идут и из цикла событий, и из asyncio.to_thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=1.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS cache_entries (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value BLOB NOT NULL,
+                    expires_at REAL NOT NULL,
+                    stored_at REAL NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                ) WITHOUT ROWID
+                """
+            )
+            self._local.conn = conn
+        return conn
+
+    def get(self, namespace: str, key: str) -> Optional[CachedValue]:
+        """Запись с ключом, в том числе просроченная; None — нет или файл недоступен."""
+        try:
+            row = self._get_conn().execute(
+                "SELECT value, expires_at, stored_at FROM cache_entries WHERE namespace = ? AND key = ?",
+                (namespace, key),
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.debug(f"Общий кэш недоступен: {e}")
+            SHARED_CACHE_REQUESTS.labels(namespace, "error").inc()
+            return None
+        if row is None:
+            SHARED_CACHE_REQUESTS.labels(namespace, "miss").inc()
+            return None
+        try:
+            value = pickle.loads(row[0])
+        except Exception as e:
+            # Запись от несовместимой версии кода
+            logger.debug(f"Запись общего кэша {namespace}/{key} не читается: {e}")
+            SHARED_CACHE_REQUESTS.labels(namespace, "error").inc()
+            return None
+        entry = CachedValue(value, row[1], row[2])
+        SHARED_CACHE_REQUESTS.labels(namespace, "hit" if entry.fresh else "stale").inc()
+        return entry
+
+    def put(self, namespace: str, key: str, value: Any, ttl: float) -> None:
+        try:
+            blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            logger.warning(f"Значение {namespace}/{key} не попадёт в общий кэш: {e}")
+            return
+        now = time.time()
+        try:
+            conn = self._get_conn()
+            conn.execute(
+                "INSERT OR REPLACE INTO cache_entries (namespace, key, value, expires_at, stored_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (namespace, key, blob, now + ttl, now),
+            )
+            self._writes += 1
+            if self._writes % self.prune_every == 0:
+                self._prune(conn)
+        except sqlite3.Error as e:
+            logger.debug(f"Общий кэш недоступен: {e}")
+
+    def _prune(self, conn: sqlite3.Connection) -> None:
+        (count,) = conn.execute("SELECT COUNT(*) FROM cache_entries").fetchone()
+        if count > self.max_entries:
+            conn.execute(
+                "DELETE FROM cache_entries WHERE (namespace, key) IN ("
+                "SELECT namespace, key FROM cache_entries ORDER BY stored_at LIMIT ?)",
+                (count - self.max_entries,),
+            )
+
+    def invalidate(self, namespace: str, key: Optional[str] = None) -> None:
+        """Удаляет запись или всё пространство имён."""
+        try:
+            if key is None:
+                self._get_conn().execute("DELETE FROM cache_entries WHERE namespace = ?", (namespace,))
+            else:
+                self._get_conn().execute(
+                    "DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (namespace, key)
+                )
+        except sqlite3.Error as e:
+            logger.debug(f"Общий кэш недоступен: {e}")
+
+    def claim(self, namespace: str, key: str, owner: str, ttl: float) -> bool:
+        """Занимает или продлевает ключ за owner на ttl секунд.
+
+        False, пока ключ держит другой владелец и его запись не истекла,
+        а также если файл недоступен. Проверка и запись — один запрос,
+        так что из нескольких процессов ключ достаётся одному.
+        """
+        now = time.time()
+        try:
+            cursor = self._get_conn().execute(
+                "INSERT INTO cache_entries (namespace, key, value, expires_at, stored_at) "
+                "VALUES (:namespace, :key, :owner, :expires_at, :now) "
+                "ON CONFLICT (namespace, key) DO UPDATE SET "
+                "value = excluded.value, expires_at = excluded.expires_at, stored_at = excluded.stored_at "
+                "WHERE cache_entries.value = excluded.value OR cache_entries.expires_at <= :now",
+                {
+                    "namespace": namespace,
+                    "key": key,
+                    "owner": pickle.dumps(owner, protocol=pickle.HIGHEST_PROTOCOL),
+                    "expires_at": now + ttl,
+                    "now": now,
+                },
+            )
+        except sqlite3.Error as e:
+            logger.debug(f"Общий кэш недоступен: {e}")
+            return False
+        return cursor.rowcount == 1
+
+    def entries(self, namespace: str) -> Dict[str, CachedValue]:
+        """Свежие записи пространства имён по ключам; пусто, если файл недоступен."""
+        try:
+            rows = self._get_conn().execute(
+                "SELECT key, value, expires_at, stored_at FROM cache_entries "
+                "WHERE namespace = ? AND expires_at > ?",
+                (namespace, time.time()),
+            ).fetchall()
+        except sqlite3.Error as e:
+            logger.debug(f"Общий кэш недоступен: {e}")
+            return {}
+        entries: Dict[str, CachedValue] = {}
+        for key, blob, expires_at, stored_at in rows:
+            try:
+                entries[key] = CachedValue(pickle.loads(blob), expires_at, stored_at)
+            except Exception as e:
+                logger.debug(f"Запись общего кэша {namespace}/{key} не читается: {e}")
+        return entries
+
+    def memoize(self, namespace: str, key: str, compute: Callable[[], Any], ttl: float) -> Any:
+        """Свежее значение из кэша или результат compute(), сохранённый для остальных."""
+        entry = self.get(namespace, key)
+        if entry is not None and entry.fresh:
+            return entry.value
+        value = compute()
+        self.put(namespace, key, value, ttl)
+        return value
+
+    async def aget(self, namespace: str, key: str) -> Optional[CachedValue]:
+        return await asyncio.to_thread(self.get, namespace, key)
+
+    async def aput(self, namespace: str, key: str, value: Any, ttl: float) -> None:
+        await asyncio.to_thread(self.put, namespace, key, value, ttl)
+
+
+shared_cache: Optional[SharedCache] = (
+    SharedCache(Path(SHARED_CACHE_PATH), max_entries=SHARED_CACHE_MAX_ENTRIES)
+    if SHARED_CACHE_PATH
+    else None
+)
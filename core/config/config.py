@@ -25,23 +25,114 @@ TELEGRAM_LOGIN_JWKS_TIMEOUT_SECONDS = float(
 
 AUTH_SECRET = os.getenv('AUTH_SECRET', '')
 REFRESH_TOKEN_TTL_SECONDS = int(os.getenv('REFRESH_TOKEN_TTL_SECONDS', '2592000'))
+# Проверенные access-токены запоминаются до их exp; 0 — проверять каждый запрос заново
+ACCESS_TOKEN_CACHE_SIZE = int(os.getenv("ACCESS_TOKEN_CACHE_SIZE", "4096"))
+# Отозванные refresh-сессии хранятся столько секунд, потом их удаляет уборщик
+REFRESH_REVOKED_RETENTION_SECONDS = int(os.getenv("REFRESH_REVOKED_RETENTION_SECONDS", "604800"))
+# Уборка отживших записей авторизации в фоне API: период (0 — выключена) и размер пачки DELETE
+AUTH_JANITOR_INTERVAL_SECONDS = float(os.getenv("AUTH_JANITOR_INTERVAL_SECONDS", "600"))
+AUTH_JANITOR_BATCH_SIZE = int(os.getenv("AUTH_JANITOR_BATCH_SIZE", "500"))
+# Bearer-токен админских эндпоинтов; пусто — эндпоинты выключены
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
 
 DATABASE_URL = os.getenv("DATABASE_URL", "")
 DATABASE_PATH = os.getenv("DATABASE_PATH", str(ROOT_DIR / "data" / "races.db"))
+DB_SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", "100"))
+DB_SLOW_QUERY_HISTORY = int(os.getenv("DB_SLOW_QUERY_HISTORY", "200"))
+# Записи в базу фиксируются пачками: COMMIT делает последняя запись в очереди процесса,
+# или через столько мс после начала пачки (0 — без ожидания), или после WRITE_GROUP_MAX_BATCH записей
+WRITE_GROUP_WINDOW_MS = float(os.getenv("WRITE_GROUP_WINDOW_MS", "0"))
+WRITE_GROUP_MAX_BATCH = int(os.getenv("WRITE_GROUP_MAX_BATCH", "64"))
 
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
 LOG_FILE = os.getenv("LOG_FILE", str(ROOT_DIR / "logs" / "bot.log"))
 
+# Трассировка запросов API: "none", "jsonl" или "otlp"; X-Trace: 1 включает её для запроса
+TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "none")
+TRACE_FILE = os.getenv("TRACE_FILE", str(ROOT_DIR / "logs" / "traces.jsonl"))
+TRACE_OTLP_ENDPOINT = os.getenv("TRACE_OTLP_ENDPOINT", "http://127.0.0.1:4318")
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0"))
+# Вызовы, блокирующие цикл событий дольше порога, попадают в метрики и лог со стеком; 0 — выключено
+LOOP_BLOCK_THRESHOLD_MS = float(os.getenv("LOOP_BLOCK_THRESHOLD_MS", "100"))
+
+# Адрес архива kartchrono; для офлайн-тестов — scripts/kartchrono_standin.py
+KARTCHRONO_BASE_URL = os.getenv("KARTCHRONO_BASE_URL", "https://mayak.kartchrono.com/archive/").rstrip("/") + "/"
+
 PARSER_TIMEOUT = int(os.getenv("PARSER_TIMEOUT", "30"))
 PARSER_MAX_RETRIES = int(os.getenv("PARSER_MAX_RETRIES", "3"))
+PARSER_ATTEMPT_TIMEOUT = float(os.getenv("PARSER_ATTEMPT_TIMEOUT", "10"))
+PARSER_BACKOFF_BASE_SECONDS = float(os.getenv("PARSER_BACKOFF_BASE_SECONDS", "0.5"))
+PARSER_BACKOFF_MAX_SECONDS = float(os.getenv("PARSER_BACKOFF_MAX_SECONDS", "5"))
+PARSER_RETRY_BUDGET_RATIO = float(os.getenv("PARSER_RETRY_BUDGET_RATIO", "0.2"))
+PARSER_BREAKER_FAILURE_THRESHOLD = int(os.getenv("PARSER_BREAKER_FAILURE_THRESHOLD", "5"))
+PARSER_BREAKER_RESET_SECONDS = float(os.getenv("PARSER_BREAKER_RESET_SECONDS", "30"))
+UPSTREAM_MAX_CONCURRENCY = int(os.getenv("UPSTREAM_MAX_CONCURRENCY", "4"))
+UPSTREAM_RATE_PER_SECOND = float(os.getenv("UPSTREAM_RATE_PER_SECOND", "5"))
+UPSTREAM_BURST = float(os.getenv("UPSTREAM_BURST", "10"))
+# Через сколько инкрементальных обновлений архив разбирается целиком
+ARCHIVE_FULL_PARSE_EVERY = int(os.getenv("ARCHIVE_FULL_PARSE_EVERY", "12"))
+RACE_CACHE_SIZE = int(os.getenv("RACE_CACHE_SIZE", "64"))
+RACE_CACHE_TTL_SECONDS = float(os.getenv("RACE_CACHE_TTL_SECONDS", "600"))
+# TTL для ещё идущего заезда (сегодняшнего с наибольшим номером) и заездов, которых нет в архиве
+RACE_LIVE_CACHE_TTL_SECONDS = float(os.getenv("RACE_LIVE_CACHE_TTL_SECONDS", "15"))
+# Где разбираются страницы заездов: inline (в цикле событий), thread или process
+PARSE_EXECUTOR = os.getenv("PARSE_EXECUTOR", "inline").lower()
+# Воркеров пула; 0 — по числу ядер
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", "0"))
+PARSE_BATCH_SIZE = int(os.getenv("PARSE_BATCH_SIZE", "8"))
+PARSE_BATCH_DELAY_MS = float(os.getenv("PARSE_BATCH_DELAY_MS", "2"))
+# Страницы меньше этого размера разбираются на месте: пересылка дороже разбора
+PARSE_OFFLOAD_MIN_KB = int(os.getenv("PARSE_OFFLOAD_MIN_KB", "16"))
 
 MAX_COMPETITORS_PER_PAGE = int(os.getenv("MAX_COMPETITORS_PER_PAGE", "10"))
 ENABLE_WEBHOOKS = os.getenv("ENABLE_WEBHOOKS", "False").lower() == "true"
 WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")
 WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8443"))
+WEBHOOK_LISTEN = os.getenv("WEBHOOK_LISTEN", "0.0.0.0")
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "telegram")
+WEBHOOK_SECRET_TOKEN = os.getenv("WEBHOOK_SECRET_TOKEN", "")
+BOT_CONCURRENT_UPDATES = int(os.getenv("BOT_CONCURRENT_UPDATES", "16"))
+BOT_PREFETCH_CONCURRENCY = int(os.getenv("BOT_PREFETCH_CONCURRENCY", "3"))
+
+# Листенер /metrics процесса бота; 0 — не запускать
+BOT_METRICS_HOST = os.getenv("BOT_METRICS_HOST", "127.0.0.1")
+BOT_METRICS_PORT = int(os.getenv("BOT_METRICS_PORT", "9101"))
+
+BOT_STATE_PATH = os.getenv("BOT_STATE_PATH") or str(
+    Path(DATABASE_PATH).parent / "bot_state.db"
+)
+BOT_CONVERSATION_TIMEOUT_SECONDS = int(
+    os.getenv("BOT_CONVERSATION_TIMEOUT_SECONDS", "1800")
+)
+BOT_PERSISTENCE_INTERVAL_SECONDS = float(
+    os.getenv("BOT_PERSISTENCE_INTERVAL_SECONDS", "10")
+)
+
+# Общий для всех процессов token bucket запросов к kartchrono; "none" — только в памяти
+UPSTREAM_RATE_LIMIT_PATH = os.getenv("UPSTREAM_RATE_LIMIT_PATH") or str(
+    Path(DATABASE_PATH).parent / "upstream_limit.db"
+)
+if UPSTREAM_RATE_LIMIT_PATH.lower() == "none":
+    UPSTREAM_RATE_LIMIT_PATH = ""
+
+# Общий для воркеров API и бота кэш (заезды, архив, рейтинги); "none" — только в памяти
+SHARED_CACHE_PATH = os.getenv("SHARED_CACHE_PATH") or str(
+    Path(DATABASE_PATH).parent / "shared_cache.db"
+)
+if SHARED_CACHE_PATH.lower() == "none":
+    SHARED_CACHE_PATH = ""
+SHARED_CACHE_MAX_ENTRIES = int(os.getenv("SHARED_CACHE_MAX_ENTRIES", "5000"))
+# Сколько секунд архив из общего кэша отдаётся без запроса к kartchrono
+ARCHIVE_SHARED_TTL_SECONDS = float(os.getenv("ARCHIVE_SHARED_TTL_SECONDS", "15"))
+LEADERBOARD_CACHE_TTL_SECONDS = float(os.getenv("LEADERBOARD_CACHE_TTL_SECONDS", "300"))
 
 API_HOST = os.getenv("API_HOST", "0.0.0.0")
 API_PORT = int(os.getenv("API_PORT", "8000"))
+API_WORKERS = int(os.getenv("API_WORKERS", "1"))
+# Как часто воркер API публикует свои метрики для общей выгрузки /api/metrics
+WORKER_METRICS_INTERVAL_SECONDS = float(os.getenv("WORKER_METRICS_INTERVAL_SECONDS", "15"))
+# Сколько заездов можно сохранить одним POST /api/mobile/stats/batch
+STATS_BATCH_MAX_ITEMS = int(os.getenv("STATS_BATCH_MAX_ITEMS", "200"))
 
 os.makedirs(Path(LOG_FILE).parent, exist_ok=True)
 os.makedirs(Path(DATABASE_PATH).parent, exist_ok=True)
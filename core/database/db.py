@@ -1,3 +1,4 @@
+import logging
 import sqlite3
 from pathlib import Path
 from typing import Optional, List, Dict, Any
@@ -5,26 +6,44 @@ import json
 import hashlib
 import secrets
 import re
+import time
 from base64 import urlsafe_b64encode
 from datetime import datetime, timedelta, timezone
 
+from core.database.profiling import DbProfiler, TracingConnection
+from core.database.writer import WriteQueue
+from core.metrics import registry
+from core.timing import NO_TIME_MS, parse_time_ms
+
 try:
     from core.config.config import (
         DATABASE_PATH,
+        DB_SLOW_QUERY_HISTORY,
+        DB_SLOW_QUERY_MS,
+        REFRESH_REVOKED_RETENTION_SECONDS,
         REFRESH_TOKEN_TTL_SECONDS,
+        WRITE_GROUP_MAX_BATCH,
+        WRITE_GROUP_WINDOW_MS,
     )
     DB_FILE = Path(DATABASE_PATH)
 except ImportError:
     DB_FILE = Path(__file__).parent.parent.parent / "data" / "races.db"
     REFRESH_TOKEN_TTL_SECONDS = 2_592_000
+    REFRESH_REVOKED_RETENTION_SECONDS = 604_800
+    DB_SLOW_QUERY_MS = 100.0
+    DB_SLOW_QUERY_HISTORY = 200
+    WRITE_GROUP_MAX_BATCH = 64
+    WRITE_GROUP_WINDOW_MS = 0.0
+
+logger = logging.getLogger(__name__)
 
 
-def _get_conn():
+def _get_conn(**connect_kwargs):
     """Получает соединение с базой данных."""
     DB_FILE.parent.mkdir(parents=True, exist_ok=True)
     if not DB_FILE.exists():
         DB_FILE.touch(mode=0o666)
-    conn = sqlite3.connect(DB_FILE)
+    conn = sqlite3.connect(DB_FILE, factory=TracingConnection, **connect_kwargs)
     conn.execute("PRAGMA journal_mode=WAL")
     conn.execute("PRAGMA foreign_keys = ON")
     return conn
@@ -38,8 +57,22 @@ def _token_hash(value: str) -> str:
     return hashlib.sha256(value.encode()).hexdigest()
 
 
+profiler = DbProfiler(_get_conn, threshold_ms=DB_SLOW_QUERY_MS, history=DB_SLOW_QUERY_HISTORY)
+_timed = profiler.wrap
+
+# Все записи процесса идут через одно соединение с групповым COMMIT (см. core.database.writer)
+write_queue = WriteQueue(
+    lambda: _get_conn(isolation_level=None, check_same_thread=False),
+    target=lambda: DB_FILE,
+    window=WRITE_GROUP_WINDOW_MS / 1000,
+    max_batch=WRITE_GROUP_MAX_BATCH,
+)
+_write = write_queue.transaction
+
+
 LOGIN_TRANSACTION_TTL_SECONDS = 10 * 60
 AUTHORIZATION_CODE_TTL_SECONDS = 60
+REFRESH_SESSION_EXTEND_STEP_SECONDS = 24 * 60 * 60
 _S256_CODE_CHALLENGE_RE = re.compile(r"^[A-Za-z0-9_-]{43}$")
 
 
@@ -47,6 +80,10 @@ def clear_db():
     """Полностью очищает базу данных."""
     with _get_conn() as conn:
         conn.execute("DROP TABLE IF EXISTS user_competitors")
+        try:
+            conn.execute("UPDATE data_versions SET version = version + 1 WHERE name = 'leaderboard'")
+        except sqlite3.OperationalError:
+            pass
         conn.commit()
 
 
@@ -99,8 +136,8 @@ def init_db():
         ).fetchall()
         if rows:
             for rowid, best_lap in rows:
-                ms = _time_string_to_ms(best_lap)
-                if ms < 999999999:
+                ms = parse_time_ms(best_lap)
+                if ms < NO_TIME_MS:
                     conn.execute(
                         "UPDATE user_competitors SET best_lap_ms = ? WHERE rowid = ?",
                         (ms, rowid),
@@ -132,6 +169,48 @@ def init_db():
         except sqlite3.OperationalError:
             pass
 
+        # Счётчик изменений данных рейтингов: по нему процессы сверяют общий кэш рейтингов
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS data_versions (
+                name TEXT PRIMARY KEY,
+                version INTEGER NOT NULL DEFAULT 0
+            )
+            """
+        )
+        conn.execute("INSERT OR IGNORE INTO data_versions (name, version) VALUES ('leaderboard', 0)")
+        for event in ("INSERT", "UPDATE", "DELETE"):
+            conn.execute(
+                f"""
+                CREATE TRIGGER IF NOT EXISTS user_competitors_{event.lower()}_version
+                AFTER {event} ON user_competitors
+                BEGIN
+                    UPDATE data_versions SET version = version + 1 WHERE name = 'leaderboard';
+                END
+                """
+            )
+        # Профили обновляются при каждом входе, а рейтингу важны только имя и аватар
+        conn.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS user_profiles_update_version
+            AFTER UPDATE OF telegram_name, photo_url ON user_profiles
+            WHEN OLD.telegram_name IS NOT NEW.telegram_name OR OLD.photo_url IS NOT NEW.photo_url
+            BEGIN
+                UPDATE data_versions SET version = version + 1 WHERE name = 'leaderboard';
+            END
+            """
+        )
+        conn.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS user_profiles_insert_version
+            AFTER INSERT ON user_profiles
+            BEGIN
+                UPDATE data_versions SET version = version + 1 WHERE name = 'leaderboard';
+            END
+            """
+        )
+        conn.commit()
+
         conn.execute("DROP TABLE IF EXISTS mobile_pairing_codes")
         conn.execute(
             """
@@ -173,10 +252,37 @@ def init_db():
                 token_hash TEXT PRIMARY KEY,
                 user_id INTEGER NOT NULL,
                 expires_at TEXT NOT NULL,
-                revoked_at TEXT
+                revoked_at TEXT,
+                current_token_hash TEXT,
+                generation INTEGER NOT NULL DEFAULT 0
+            )
+            """
+        )
+        # Сессия — одна строка на вход, при обновлении токена она меняется на месте
+        for column in ("current_token_hash TEXT", "generation INTEGER NOT NULL DEFAULT 0"):
+            try:
+                conn.execute(f"ALTER TABLE mobile_refresh_sessions ADD COLUMN {column}")
+            except sqlite3.OperationalError:
+                pass
+        # Аренды фоновых задач: из нескольких воркеров API задачу выполняет один
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS job_leases (
+                name TEXT PRIMARY KEY,
+                owner TEXT NOT NULL,
+                expires_at REAL NOT NULL
             )
             """
         )
+        # Индексы для уборки отживших записей (purge_auth_records)
+        for table, column, where in (
+            ("mobile_telegram_login_transactions", "expires_at", ""),
+            ("mobile_telegram_authorization_codes", "expires_at", ""),
+            ("mobile_telegram_authorization_codes", "consumed_at", "WHERE consumed_at IS NOT NULL"),
+            ("mobile_refresh_sessions", "expires_at", ""),
+            ("mobile_refresh_sessions", "revoked_at", "WHERE revoked_at IS NOT NULL"),
+        ):
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_{column} ON {table} ({column}) {where}")
         conn.commit()
 
         cursor = conn.execute(
@@ -189,28 +295,59 @@ def init_db():
             raise RuntimeError("Failed to create database table")
 
 
-def _purge_expired_telegram_auth_records(conn: sqlite3.Connection, now: str) -> None:
-    conn.execute(
-        """
-        DELETE FROM mobile_telegram_authorization_codes
-        WHERE consumed_at IS NOT NULL OR expires_at <= ?
-        """,
-        (now,),
-    )
-    conn.execute(
-        """
-        DELETE FROM mobile_telegram_login_transactions
-        WHERE expires_at <= ?
-          AND NOT EXISTS (
-              SELECT 1
-              FROM mobile_telegram_authorization_codes
-              WHERE transaction_id = mobile_telegram_login_transactions.id
-                AND consumed_at IS NULL
-                AND expires_at > ?
-          )
-        """,
-        (now, now),
-    )
+# Какие записи авторизации отжили своё: их удаляет purge_auth_records по расписанию
+_AUTH_PURGE_CONDITIONS = {
+    # Диапазоны, а не IS NOT NULL: так SQLite обходит оба индекса (MULTI-INDEX OR), а не всю таблицу
+    "mobile_telegram_authorization_codes": "consumed_at <= :now OR expires_at <= :now",
+    "mobile_telegram_login_transactions": """
+        expires_at <= :now
+        AND NOT EXISTS (
+            SELECT 1
+            FROM mobile_telegram_authorization_codes
+            WHERE transaction_id = mobile_telegram_login_transactions.id
+              AND consumed_at IS NULL
+              AND expires_at > :now
+        )
+    """,
+    # Отозванные сессии хранятся ещё какое-то время: по ним видно повторное использование токена
+    "mobile_refresh_sessions": "expires_at <= :now OR revoked_at <= :revoked_before",
+}
+AUTH_PURGE_TABLES = tuple(_AUTH_PURGE_CONDITIONS)
+
+
+@_timed
+def acquire_lease(name: str, owner: str, ttl: float) -> bool:
+    """Take or renew the named lease for ttl seconds; False while another owner holds it."""
+    now = time.time()
+    with _write() as conn:
+        cursor = conn.execute(
+            """
+            INSERT INTO job_leases (name, owner, expires_at) VALUES (:name, :owner, :expires_at)
+            ON CONFLICT (name) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at
+            WHERE job_leases.owner = excluded.owner OR job_leases.expires_at <= :now
+            """,
+            {"name": name, "owner": owner, "expires_at": now + ttl, "now": now},
+        )
+    return cursor.rowcount == 1
+
+
+@_timed
+def purge_auth_records(table: str, limit: int, now: Optional[datetime] = None) -> int:
+    """Delete up to limit expired, consumed or long-revoked rows; return how many."""
+    condition = _AUTH_PURGE_CONDITIONS[table]
+    now = now or datetime.now(timezone.utc)
+    params = {
+        "now": now.isoformat(),
+        "revoked_before": (now - timedelta(seconds=REFRESH_REVOKED_RETENTION_SECONDS)).isoformat(),
+        "limit": limit,
+    }
+    with _write() as conn:
+        # DELETE ... LIMIT есть не во всех сборках SQLite, поэтому через rowid
+        cursor = conn.execute(
+            f"DELETE FROM {table} WHERE rowid IN (SELECT rowid FROM {table} WHERE {condition} LIMIT :limit)",
+            params,
+        )
+    return cursor.rowcount
 
 
 def _s256_code_challenge(verifier: str) -> str:
@@ -218,6 +355,7 @@ def _s256_code_challenge(verifier: str) -> str:
     return urlsafe_b64encode(digest).rstrip(b"=").decode()
 
 
+@_timed
 def create_telegram_login_transaction(
     state: str, code_challenge: str, code_challenge_method: str
 ) -> bool:
@@ -230,9 +368,7 @@ def create_telegram_login_transaction(
     now = datetime.now(timezone.utc)
     now_iso = now.isoformat()
     expires_at = (now + timedelta(seconds=LOGIN_TRANSACTION_TTL_SECONDS)).isoformat()
-    with _get_conn() as conn:
-        conn.execute("BEGIN IMMEDIATE")
-        _purge_expired_telegram_auth_records(conn, now_iso)
+    with _write() as conn:
         try:
             conn.execute(
                 """
@@ -247,12 +383,11 @@ def create_telegram_login_transaction(
     return True
 
 
+@_timed
 def find_telegram_login_transaction(state: str) -> Optional[Dict[str, Any]]:
     """Find an active Telegram Login transaction without exposing raw artifacts."""
     now = _utc_now_iso()
     with _get_conn() as conn:
-        conn.execute("BEGIN IMMEDIATE")
-        _purge_expired_telegram_auth_records(conn, now)
         row = conn.execute(
             """
             SELECT id, user_id, created_at, expires_at, completed_at
@@ -272,12 +407,11 @@ def find_telegram_login_transaction(state: str) -> Optional[Dict[str, Any]]:
     }
 
 
+@_timed
 def complete_telegram_login_transaction(state: str, user_id: int) -> bool:
     """Atomically bind a Telegram user to an active login transaction once."""
     now = _utc_now_iso()
-    with _get_conn() as conn:
-        conn.execute("BEGIN IMMEDIATE")
-        _purge_expired_telegram_auth_records(conn, now)
+    with _write() as conn:
         cursor = conn.execute(
             """
             UPDATE mobile_telegram_login_transactions
@@ -291,14 +425,13 @@ def complete_telegram_login_transaction(state: str, user_id: int) -> bool:
     return cursor.rowcount == 1
 
 
+@_timed
 def issue_telegram_authorization_code(state: str) -> Optional[str]:
     """Issue a one-minute authorization code for a completed login transaction."""
     now = datetime.now(timezone.utc)
     now_iso = now.isoformat()
     expires_at = (now + timedelta(seconds=AUTHORIZATION_CODE_TTL_SECONDS)).isoformat()
-    with _get_conn() as conn:
-        conn.execute("BEGIN IMMEDIATE")
-        _purge_expired_telegram_auth_records(conn, now_iso)
+    with _write() as conn:
         transaction = conn.execute(
             """
             SELECT id, user_id
@@ -324,6 +457,7 @@ def issue_telegram_authorization_code(state: str) -> Optional[str]:
     return code
 
 
+@_timed
 def complete_telegram_login_and_issue_authorization_code(
     state: str,
     user_id: int,
@@ -336,9 +470,7 @@ def complete_telegram_login_and_issue_authorization_code(
     now_iso = now.isoformat()
     expires_at = (now + timedelta(seconds=AUTHORIZATION_CODE_TTL_SECONDS)).isoformat()
     code = secrets.token_urlsafe(32)
-    with _get_conn() as conn:
-        conn.execute("BEGIN IMMEDIATE")
-        _purge_expired_telegram_auth_records(conn, now_iso)
+    with _write() as conn:
         cursor = conn.execute(
             """
             UPDATE mobile_telegram_login_transactions
@@ -372,6 +504,7 @@ def complete_telegram_login_and_issue_authorization_code(
     return code
 
 
+@_timed
 def consume_telegram_authorization_code(
     code: str, state: str, code_verifier: str
 ) -> Optional[int]:
@@ -380,9 +513,7 @@ def consume_telegram_authorization_code(
     code_hash = _token_hash(code)
     state_hash = _token_hash(state)
     challenge_hash = _token_hash(_s256_code_challenge(code_verifier))
-    with _get_conn() as conn:
-        conn.execute("BEGIN IMMEDIATE")
-        _purge_expired_telegram_auth_records(conn, now)
+    with _write() as conn:
         row = conn.execute(
             """
             SELECT code.user_id
@@ -413,6 +544,7 @@ def consume_telegram_authorization_code(
     return row[0]
 
 
+@_timed
 def consume_telegram_authorization_code_and_create_refresh_session(
     code: str, state: str, code_verifier: str
 ) -> Optional[tuple[int, str]]:
@@ -422,11 +554,7 @@ def consume_telegram_authorization_code_and_create_refresh_session(
     code_hash = _token_hash(code)
     state_hash = _token_hash(state)
     challenge_hash = _token_hash(_s256_code_challenge(code_verifier))
-    refresh_token = secrets.token_urlsafe(48)
-    refresh_expires_at = (now + timedelta(seconds=REFRESH_TOKEN_TTL_SECONDS)).isoformat()
-    with _get_conn() as conn:
-        conn.execute("BEGIN IMMEDIATE")
-        _purge_expired_telegram_auth_records(conn, now_iso)
+    with _write() as conn:
         row = conn.execute(
             """
             SELECT code.user_id
@@ -454,33 +582,67 @@ def consume_telegram_authorization_code_and_create_refresh_session(
         )
         if cursor.rowcount != 1:
             return None
-        conn.execute(
-            """
-            INSERT INTO mobile_refresh_sessions (token_hash, user_id, expires_at, revoked_at)
-            VALUES (?, ?, ?, NULL)
-            """,
-            (_token_hash(refresh_token), row[0], refresh_expires_at),
-        )
+        refresh_token = _insert_refresh_session(conn, row[0], now)
     return row[0], refresh_token
 
 
+# Refresh-токен: "<семейство>.<поколение>.<секрет>". Семейство — одна строка
+# mobile_refresh_sessions на вход с ключом token_hash = хэш семейства; ротация
+# меняет в ней только неиндексированные current_token_hash и generation.
+# У строк, созданных до семейств, ключ — хэш самого токена, а current_token_hash пуст
+REFRESH_TOKEN_REUSE = registry.counter(
+    "carting_refresh_token_reuse_total",
+    "Предъявления уже заменённых refresh-токенов",
+)
+
+
+def _parse_refresh_token(token: str) -> Optional[tuple[str, int]]:
+    """Return the family and generation of a token, or None for legacy tokens."""
+    parts = token.split(".")
+    if len(parts) != 3 or not parts[1].isdigit():
+        return None
+    return parts[0], int(parts[1])
+
+
+def _refresh_token(family_id: str, generation: int) -> str:
+    return f"{family_id}.{generation}.{secrets.token_urlsafe(48)}"
+
+
+def _refresh_expires_at(now: datetime) -> str:
+    return (now + timedelta(seconds=REFRESH_TOKEN_TTL_SECONDS)).isoformat()
+
+
+def _insert_refresh_session(conn, user_id: int, now: datetime) -> str:
+    """Start a new session family inside the caller's write and return its first token."""
+    family_id = secrets.token_urlsafe(16)
+    token = _refresh_token(family_id, 0)
+    conn.execute(
+        """
+        INSERT INTO mobile_refresh_sessions
+            (token_hash, user_id, expires_at, revoked_at, current_token_hash, generation)
+        VALUES (?, ?, ?, NULL, ?, 0)
+        """,
+        (_token_hash(family_id), user_id, _refresh_expires_at(now), _token_hash(token)),
+    )
+    return token
+
+
+def _refresh_session_match(token: str) -> tuple[str, Optional[str]]:
+    """Row key and expected current_token_hash of the session a token belongs to."""
+    parsed = _parse_refresh_token(token)
+    if parsed is None:
+        return _token_hash(token), None
+    return _token_hash(parsed[0]), _token_hash(token)
+
+
+@_timed
 def create_refresh_session(user_id: int) -> str:
     """Create a refresh session and return its opaque token."""
-    token = secrets.token_urlsafe(48)
-    expires_at = (
-        datetime.now(timezone.utc) + timedelta(seconds=REFRESH_TOKEN_TTL_SECONDS)
-    ).isoformat()
-    with _get_conn() as conn:
-        conn.execute(
-            """
-            INSERT INTO mobile_refresh_sessions (token_hash, user_id, expires_at, revoked_at)
-            VALUES (?, ?, ?, NULL)
-            """,
-            (_token_hash(token), user_id, expires_at),
-        )
-    return token
+    with _write() as conn:
+        return _insert_refresh_session(conn, user_id, datetime.now(timezone.utc))
 
 
+@_timed
 def provision_telegram_identity_and_create_refresh_session(
     user_id: int,
     telegram_name: Optional[str] = None,
@@ -488,133 +650,201 @@ def provision_telegram_identity_and_create_refresh_session(
     photo_url: Optional[str] = None,
 ) -> str:
     """Atomically store a Telegram profile update and create a refresh session."""
-    refresh_token = secrets.token_urlsafe(48)
-    refresh_expires_at = (
-        datetime.now(timezone.utc) + timedelta(seconds=REFRESH_TOKEN_TTL_SECONDS)
-    ).isoformat()
-    with _get_conn() as conn:
-        conn.execute("BEGIN IMMEDIATE")
+    with _write() as conn:
         _upsert_user_profile(
             conn, user_id, telegram_name, telegram_username, photo_url
         )
-        conn.execute(
-            """
-            INSERT INTO mobile_refresh_sessions (token_hash, user_id, expires_at, revoked_at)
-            VALUES (?, ?, ?, NULL)
-            """,
-            (_token_hash(refresh_token), user_id, refresh_expires_at),
-        )
-    return refresh_token
+        return _insert_refresh_session(conn, user_id, datetime.now(timezone.utc))
 
 
+@_timed
 def rotate_refresh_session(token: str) -> Optional[tuple[int, str]]:
-    """Revoke a valid refresh token and return its user ID with a replacement token."""
-    now = _utc_now_iso()
-    token_hash = _token_hash(token)
-    replacement = secrets.token_urlsafe(48)
-    replacement_expires_at = (
-        datetime.now(timezone.utc) + timedelta(seconds=REFRESH_TOKEN_TTL_SECONDS)
-    ).isoformat()
-    with _get_conn() as conn:
-        conn.execute("BEGIN IMMEDIATE")
+    """Replace a valid refresh token in place and return its user ID with the next token.
+
+    A refresh rewrites only the unindexed current token hash and generation
+    of the session row; expires_at moves forward at most once per
+    REFRESH_SESSION_EXTEND_STEP_SECONDS. A legacy row joins a family on its
+    first rotation. Presenting an older generation is rejected and logged as
+    reuse, but the family is not revoked: a client that retries a refresh
+    after a timeout keeps the token it already received.
+    """
+    now = datetime.now(timezone.utc)
+    key, current = _refresh_session_match(token)
+    parsed = _parse_refresh_token(token)
+    with _write() as conn:
         row = conn.execute(
             """
-            SELECT user_id FROM mobile_refresh_sessions
-            WHERE token_hash = ? AND revoked_at IS NULL AND expires_at > ?
+            SELECT user_id, generation, current_token_hash, expires_at, revoked_at
+            FROM mobile_refresh_sessions
+            WHERE token_hash = ?
             """,
-            (token_hash, now),
+            (key,),
         ).fetchone()
         if row is None:
             return None
-        conn.execute(
-            """
+        user_id, generation, stored, expires_at, revoked_at = row
+        if stored != current:
+            if parsed is not None and parsed[1] < generation:
+                REFRESH_TOKEN_REUSE.inc()
+                logger.warning(
+                    f"Повторно предъявлен заменённый refresh-токен: пользователь {user_id}, "
+                    f"поколение {parsed[1]}, текущее {generation}"
+                )
+            return None
+        if revoked_at is not None or expires_at <= now.isoformat():
+            return None
+
+        family_id = parsed[0] if parsed is not None else secrets.token_urlsafe(16)
+        replacement = _refresh_token(family_id, generation + 1)
+        params = {
+            "key": key,
+            "current": current,
+            "new_key": _token_hash(family_id),
+            "new_current": _token_hash(replacement),
+            "generation": generation + 1,
+            "expires_at": _refresh_expires_at(now),
+        }
+        assignments = ["current_token_hash = :new_current", "generation = :generation"]
+        if parsed is None:
+            assignments.append("token_hash = :new_key")
+        # expires_at индексирован: сдвигаем его шагами, а не при каждом обновлении
+        extend_after = now - timedelta(seconds=REFRESH_SESSION_EXTEND_STEP_SECONDS)
+        if expires_at <= _refresh_expires_at(extend_after):
+            assignments.append("expires_at = :expires_at")
+        cursor = conn.execute(
+            f"""
             UPDATE mobile_refresh_sessions
-            SET revoked_at = ?
-            WHERE token_hash = ? AND revoked_at IS NULL
-            """,
-            (now, token_hash),
-        )
-        conn.execute(
-            """
-            INSERT INTO mobile_refresh_sessions (token_hash, user_id, expires_at, revoked_at)
-            VALUES (?, ?, ?, NULL)
+            SET {", ".join(assignments)}
+            WHERE token_hash = :key AND current_token_hash IS :current AND revoked_at IS NULL
             """,
-            (_token_hash(replacement), row[0], replacement_expires_at),
+            params,
         )
-    return row[0], replacement
+        if cursor.rowcount != 1:
+            return None
+    return user_id, replacement
 
 
+@_timed
 def revoke_refresh_session(token: str) -> bool:
     """Revoke an active refresh session, returning whether it was active."""
     now = _utc_now_iso()
-    with _get_conn() as conn:
+    key, current = _refresh_session_match(token)
+    with _write() as conn:
         cursor = conn.execute(
             """
             UPDATE mobile_refresh_sessions
             SET revoked_at = ?
-            WHERE token_hash = ? AND revoked_at IS NULL AND expires_at > ?
+            WHERE token_hash = ? AND current_token_hash IS ?
+              AND revoked_at IS NULL AND expires_at > ?
             """,
-            (now, _token_hash(token), now),
+            (now, key, current, now),
         )
     return cursor.rowcount == 1
 
 
+_INSERT_COMPETITOR_SQL = """
+    INSERT INTO user_competitors (
+        user_id, date, race_number, race_href, competitor_id, num, name, pos, laps,
+        theor_lap, best_lap, binary_laps, theor_lap_formatted, display_name,
+        gap_to_leader, lap_times_json, best_lap_ms
+    ) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)
+"""
+
+
+def _competitor_row(
+    user_id: int, date: str, race_number: str, race_href: str, competitor_data: Dict[str, Any]
+) -> tuple:
+    """Значения строки user_competitors в порядке _INSERT_COMPETITOR_SQL."""
+    lap_times_json = json.dumps([
+        {
+            'lap_number': lap.lap_number,
+            'lap_time': lap.lap_time,
+            'sector1': lap.sector1,
+            'sector2': lap.sector2,
+            'sector3': lap.sector3,
+            'sector4': lap.sector4,
+        }
+        for lap in competitor_data.get('lap_times', [])
+    ]) if competitor_data.get('lap_times') else None
+
+    best_lap_ms = parse_time_ms(competitor_data['best_lap'])
+    if best_lap_ms >= NO_TIME_MS:
+        best_lap_ms = None
+
+    return (
+        user_id,
+        date,
+        race_number,
+        race_href,
+        competitor_data['id'],
+        competitor_data['num'],
+        competitor_data['name'],
+        competitor_data['pos'],
+        competitor_data['laps'],
+        competitor_data['theor_lap'],
+        competitor_data['best_lap'],
+        competitor_data['binary_laps'],
+        competitor_data['theor_lap_formatted'],
+        competitor_data['display_name'],
+        competitor_data['gap_to_leader'],
+        lap_times_json,
+        best_lap_ms,
+    )
+
+
+@_timed
 def save_competitor(
     user_id: int, date: str, race_number: str, race_href: str, competitor_data: Dict[str, Any]
 ) -> bool:
     """Insert competitor data for user; return True if inserted, False if duplicate."""
     try:
-        lap_times_json = json.dumps([
-            {
-                'lap_number': lap.lap_number,
-                'lap_time': lap.lap_time,
-                'sector1': lap.sector1,
-                'sector2': lap.sector2,
-                'sector3': lap.sector3,
-                'sector4': lap.sector4,
-            }
-            for lap in competitor_data.get('lap_times', [])
-        ]) if competitor_data.get('lap_times') else None
-
-        best_lap_ms = _time_string_to_ms(competitor_data['best_lap'])
-        if best_lap_ms >= 999999999:
-            best_lap_ms = None
-
-        with _get_conn() as conn:
-            conn.execute(
-                """
-                INSERT INTO user_competitors (
-                    user_id, date, race_number, race_href, competitor_id, num, name, pos, laps,
-                    theor_lap, best_lap, binary_laps, theor_lap_formatted, display_name,
-                    gap_to_leader, lap_times_json, best_lap_ms
-                ) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)
-                """,
-                (
-                    user_id,
-                    date,
-                    race_number,
-                    race_href,
-                    competitor_data['id'],
-                    competitor_data['num'],
-                    competitor_data['name'],
-                    competitor_data['pos'],
-                    competitor_data['laps'],
-                    competitor_data['theor_lap'],
-                    competitor_data['best_lap'],
-                    competitor_data['binary_laps'],
-                    competitor_data['theor_lap_formatted'],
-                    competitor_data['display_name'],
-                    competitor_data['gap_to_leader'],
-                    lap_times_json,
-                    best_lap_ms,
-                ),
-            )
-            conn.commit()
-            return True
+        row = _competitor_row(user_id, date, race_number, race_href, competitor_data)
+        with _write() as conn:
+            conn.execute(_INSERT_COMPETITOR_SQL, row)
+        return True
     except sqlite3.IntegrityError:
         return False
 
 
+@_timed
+def save_competitors_bulk(user_id: int, items: List[Dict[str, Any]]) -> List[bool]:
+    """Insert many competitors for user in one transaction.
+
+    Each item has date, race_number, race_href and competitor_data, as the
+    arguments of save_competitor. Returns True/False (inserted/duplicate)
+    per item in input order; a repeat of a key within the batch is a
+    duplicate too.
+    """
+    rows = [
+        _competitor_row(
+            user_id, item['date'], item['race_number'], item['race_href'], item['competitor_data']
+        )
+        for item in items
+    ]
+    if not rows:
+        return []
+    with _write() as conn:
+        # Ключи проверяются и вставляются в одной транзакции под блокировкой записи
+        dates = sorted({row[1] for row in rows})
+        placeholders = ",".join("?" * len(dates))
+        seen = set(conn.execute(
+            f"SELECT date, race_number, num FROM user_competitors WHERE user_id=? AND date IN ({placeholders})",
+            (user_id, *dates),
+        ).fetchall())
+        results = []
+        fresh = []
+        for row in rows:
+            key = (row[1], row[2], row[5])
+            saved = key not in seen
+            seen.add(key)
+            results.append(saved)
+            if saved:
+                fresh.append(row)
+        conn.executemany(_INSERT_COMPETITOR_SQL, fresh)
+    return results
+
+
+@_timed
 def get_user_competitors(user_id: int):
     """Return list of competitor data sorted by date desc."""
     with _get_conn() as conn:
@@ -632,6 +862,7 @@ def get_user_competitors(user_id: int):
         return cur.fetchall()
 
 
+@_timed
 def get_competitor_by_key(user_id: int, date: str, race_number: str, num: str):
     """Get specific competitor data by key."""
     with _get_conn() as conn:
@@ -648,17 +879,18 @@ def get_competitor_by_key(user_id: int, date: str, race_number: str, num: str):
         return cur.fetchone()
 
 
+@_timed
 def delete_competitor(user_id: int, date: str, race_number: str, num: str):
     """Delete competitor; return True if row deleted."""
-    with _get_conn() as conn:
+    with _write() as conn:
         cur = conn.execute(
             "DELETE FROM user_competitors WHERE user_id=? AND date=? AND race_number=? AND num=?",
             (user_id, date, race_number, num),
         )
-        conn.commit()
-        return cur.rowcount > 0
+    return cur.rowcount > 0
 
 
+@_timed
 def get_all_competitors():
     """Get all competitors from all users."""
     with _get_conn() as conn:
@@ -702,12 +934,14 @@ def _upsert_user_profile(
     )
 
 
+@_timed
 def upsert_user_profile(user_id: int, telegram_name: str, telegram_username: str = None, photo_url: str = None):
     """Сохраняет или обновляет Telegram-имя, username и аватар пользователя."""
-    with _get_conn() as conn:
+    with _write() as conn:
         _upsert_user_profile(conn, user_id, telegram_name, telegram_username, photo_url)
 
 
+@_timed
 def get_all_users():
     """Return list of {user_id, display_name, telegram_username} for all users with saved races."""
     with _get_conn() as conn:
@@ -747,6 +981,7 @@ def get_all_users():
     return result
 
 
+@_timed
 def get_best_karts_today(today_date: str):
     """Рейтинг картов за день: лучший круг каждого карта, сортировка по возрастанию."""
     with _get_conn() as conn:
@@ -775,21 +1010,15 @@ def get_best_karts_today(today_date: str):
         return cur.fetchall()
 
 
-def _time_string_to_ms(time_str: str) -> int:
-    """Преобразует строку времени 'M:SS.sss' в миллисекунды."""
-    if not time_str or time_str == "-":
-        return 999999999
-    try:
-        time_str = time_str.strip()
-        if ':' in time_str and '.' in time_str:
-            minutes, rest = time_str.split(':', 1)
-            seconds, ms = rest.split('.', 1)
-            return int(minutes) * 60000 + int(seconds) * 1000 + int(ms)
-        return 999999999
-    except Exception:
-        return 999999999
+@_timed
+def get_data_version(name: str) -> int:
+    """Номер версии данных; растёт при каждом изменении (см. триггеры в init_db)."""
+    with _get_conn() as conn:
+        row = conn.execute("SELECT version FROM data_versions WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else 0
 
 
+@_timed
 def get_best_competitors(limit: int = 20):
     """Get one best-lap row per user, sorted by best_lap_ms ASC."""
     with _get_conn() as conn:
@@ -819,6 +1048,7 @@ def get_best_competitors(limit: int = 20):
         return cur.fetchall()
 
 
+@_timed
 def get_best_competitors_today(today_date: str, limit: int = 20):
     """Get one best-lap row per user for today, sorted by best_lap_ms ASC."""
     with _get_conn() as conn:
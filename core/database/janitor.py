@@ -0,0 +1,117 @@
+"""
+Фоновая уборка отживших записей авторизации.
+
+Раньше просроченные транзакции входа и коды удалялись внутри каждой
+транзакции входа, а refresh-сессии не удалялись никогда. AuthJanitor
+раз в interval секунд удаляет их пачками по batch_size строк: каждая
+пачка — отдельная короткая запись через очередь записей, между пачками
+пауза, так что блокировка записи не держится долго и запросы входа
+не ждут уборку.
+
+Уборщик запускается в каждом воркере API, но проход делает только тот,
+кто держит аренду auth_janitor в таблице job_leases: владелец продлевает
+её каждый интервал, остальные забирают её, только когда она истекла
+(воркер умер или перезапущен).
+"""
+import asyncio
+import logging
+import os
+import socket
+import time
+from typing import Dict, Optional
+
+import core.database.db as db
+from core.config.config import AUTH_JANITOR_BATCH_SIZE, AUTH_JANITOR_INTERVAL_SECONDS
+from core.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+# Владелец аренды: у каждого процесса свой
+_OWNER = f"{socket.gethostname()}:{os.getpid()}"
+
+AUTH_JANITOR_DELETED = registry.counter(
+    "carting_auth_janitor_deleted_total",
+    "Удалено отживших записей авторизации по таблицам",
+    ["table"],
+)
+AUTH_JANITOR_RUN_SECONDS = registry.histogram(
+    "carting_auth_janitor_run_seconds",
+    "Длительность одного прохода уборки записей авторизации",
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0, 120.0),
+)
+AUTH_JANITOR_ERRORS = registry.counter(
+    "carting_auth_janitor_errors_total",
+    "Проходы уборки, прерванные ошибкой базы",
+)
+AUTH_JANITOR_LAST_RUN = registry.gauge(
+    "carting_auth_janitor_last_run_timestamp_seconds",
+    "Время окончания последнего успешного прохода уборки",
+)
+
+
+class AuthJanitor:
+    """Периодически удаляет просроченные и использованные записи авторизации."""
+
+    def __init__(
+        self,
+        interval: float = 600.0,
+        batch_size: int = 500,
+        pause: float = 0.05,
+        owner: str = _OWNER,
+    ):
+        self.interval = interval
+        self.batch_size = max(1, batch_size)
+        self.pause = pause
+        self.owner = owner
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self.interval <= 0:
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            # Первый проход не при старте: воркеры API запускаются одновременно
+            await asyncio.sleep(self.interval)
+            try:
+                # Аренда на полтора интервала: запас на длительность прохода владельца
+                if await asyncio.to_thread(db.acquire_lease, "auth_janitor", self.owner, self.interval * 1.5):
+                    await self.run_once()
+            except Exception as e:
+                AUTH_JANITOR_ERRORS.inc()
+                logger.warning(f"Уборка записей авторизации прервана: {e}")
+
+    async def run_once(self) -> Dict[str, int]:
+        """Один проход по всем таблицам; возвращает, сколько строк удалено в каждой."""
+        started = time.perf_counter()
+        deleted: Dict[str, int] = {}
+        # Коды раньше транзакций: транзакцию с живым кодом удалять нельзя
+        for table in db.AUTH_PURGE_TABLES:
+            deleted[table] = 0
+            while True:
+                count = await asyncio.to_thread(db.purge_auth_records, table, self.batch_size)
+                deleted[table] += count
+                AUTH_JANITOR_DELETED.labels(table).inc(count)
+                if count < self.batch_size:
+                    break
+                await asyncio.sleep(self.pause)
+        AUTH_JANITOR_RUN_SECONDS.observe(time.perf_counter() - started)
+        AUTH_JANITOR_LAST_RUN.set(time.time())
+        if any(deleted.values()):
+            logger.info(f"Удалены отжившие записи авторизации: {deleted}")
+        return deleted
+
+
+auth_janitor = AuthJanitor(interval=AUTH_JANITOR_INTERVAL_SECONDS, batch_size=AUTH_JANITOR_BATCH_SIZE)
@@ -0,0 +1,226 @@
+"""
+Профилирование функций core.database.db.
+
+Каждая публичная функция базы оборачивается DbProfiler.wrap: время вызова
+и число возвращённых строк идут в метрики и в сводку по функциям. Запросы,
+выполненные внутри вызова, запоминаются соединением TracingConnection
+(только текст и параметры, без расширения SQL). Если вызов дольше порога,
+для его запросов выполняется EXPLAIN QUERY PLAN, и всё это пишется в лог
+и в кольцевой журнал медленных вызовов, откуда его отдаёт админский
+эндпоинт. Внутри трассы запроса (core.tracing) вызов становится спаном
+db.<функция>. Для быстрых вызовов накладные расходы — пара замеров времени
+и добавление в список.
+"""
+import functools
+import logging
+import sqlite3
+import time
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from core.metrics import registry
+from core.tracing import start_span
+
+logger = logging.getLogger(__name__)
+
+DB_QUERY_SECONDS = registry.histogram(
+    "carting_db_query_seconds",
+    "Время выполнения функций core.database.db",
+    ["function"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+DB_ROWS_RETURNED = registry.histogram(
+    "carting_db_rows_returned",
+    "Сколько строк вернула функция core.database.db",
+    ["function"],
+    buckets=(0, 1, 5, 20, 100, 500, 2000, 10000),
+)
+DB_SLOW_CALLS = registry.counter(
+    "carting_db_slow_calls_total",
+    "Вызовы функций core.database.db дольше порога",
+    ["function"],
+)
+
+# Запросы, выполненные внутри текущего профилируемого вызова: (sql, параметры)
+_statements: ContextVar[Optional[List[Tuple[str, Any]]]] = ContextVar(
+    "db_statements", default=None
+)
+
+_EXPLAINABLE = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "REPLACE")
+
+
+class TracingConnection(sqlite3.Connection):
+    """Соединение, запоминающее запросы профилируемого вызова."""
+
+    def execute(self, sql, parameters=(), /):
+        statements = _statements.get()
+        if statements is not None:
+            statements.append((sql, parameters))
+        return super().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters, /):
+        statements = _statements.get()
+        if statements is not None:
+            # Параметров много, для плана подставить нечего
+            statements.append((sql, None))
+        return super().executemany(sql, seq_of_parameters)
+
+
+def _count_rows(result: Any) -> int:
+    # bool — признак успеха записи, а не строка; проверяется раньше int
+    if result is None or isinstance(result, bool):
+        return 0
+    if isinstance(result, list):
+        return len(result)
+    return 1
+
+
+class _FunctionStats:
+    __slots__ = ("calls", "slow_calls", "total", "max", "rows")
+
+    def __init__(self):
+        self.calls = 0
+        self.slow_calls = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+
+
+class DbProfiler:
+    """Замеры функций базы, журнал медленных вызовов и их планы запросов."""
+
+    def __init__(
+        self,
+        connect: Callable[[], sqlite3.Connection],
+        threshold_ms: float = 100.0,
+        history: int = 200,
+        explain_interval: float = 60.0,
+    ):
+        self.connect = connect
+        self.threshold = threshold_ms / 1000
+        self.explain_interval = explain_interval
+        self.slow_calls: "deque[dict]" = deque(maxlen=history)
+        self.stats: Dict[str, _FunctionStats] = {}
+        self._explained_at: Dict[str, float] = {}
+        self._plans: Dict[str, List[dict]] = {}
+
+    def wrap(self, func):
+        name = func.__name__
+        seconds = DB_QUERY_SECONDS.labels(name)
+        rows_returned = DB_ROWS_RETURNED.labels(name)
+        stats = self.stats.setdefault(name, _FunctionStats())
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            statements: List[Tuple[str, Any]] = []
+            token = _statements.set(statements)
+            trace_span = start_span(f"db.{name}")
+            started = time.perf_counter()
+            result = None
+            try:
+                result = func(*args, **kwargs)
+                return result
+            finally:
+                elapsed = time.perf_counter() - started
+                _statements.reset(token)
+                rows = _count_rows(result)
+                if trace_span is not None:
+                    trace_span.set("rows", rows)
+                    trace_span.set("statements", len(statements))
+                    trace_span.finish()
+                seconds.observe(elapsed)
+                rows_returned.observe(rows)
+                stats.calls += 1
+                stats.total += elapsed
+                stats.rows += rows
+                if elapsed > stats.max:
+                    stats.max = elapsed
+                if elapsed >= self.threshold:
+                    stats.slow_calls += 1
+                    self._record_slow(name, elapsed, rows, statements)
+
+        return wrapper
+
+    def _record_slow(
+        self, name: str, elapsed: float, rows: int, statements: List[Tuple[str, Any]]
+    ) -> None:
+        DB_SLOW_CALLS.labels(name).inc()
+        plans = self._plans_for(name, statements)
+        record = {
+            "function": name,
+            "duration_ms": round(elapsed * 1000, 3),
+            "rows": rows,
+            "at": datetime.now(timezone.utc).isoformat(),
+            "statements": [" ".join(sql.split()) for sql, _ in statements],
+            "plans": plans,
+        }
+        self.slow_calls.append(record)
+        plan_text = "; ".join(
+            f"{' '.join(plan['sql'].split())[:120]} → {' | '.join(plan['plan'])}" for plan in plans
+        )
+        logger.warning(
+            f"Медленный вызов {name}: {record['duration_ms']:.1f} мс, строк {rows}"
+            + (f"; план: {plan_text}" if plan_text else "")
+        )
+
+    def _plans_for(self, name: str, statements: List[Tuple[str, Any]]) -> List[dict]:
+        """EXPLAIN QUERY PLAN не чаще раза в explain_interval на функцию."""
+        now = time.monotonic()
+        explained_at = self._explained_at.get(name)
+        if explained_at is not None and now - explained_at < self.explain_interval:
+            return self._plans.get(name, [])
+        self._explained_at[name] = now
+        self._plans[name] = self.explain(statements)
+        return self._plans[name]
+
+    def explain(self, statements: List[Tuple[str, Any]]) -> List[dict]:
+        plans = []
+        candidates = [
+            (sql, params) for sql, params in statements
+            if params is not None and sql.lstrip().upper().startswith(_EXPLAINABLE)
+        ]
+        if not candidates:
+            return plans
+        try:
+            conn = self.connect()
+        except sqlite3.Error as e:
+            logger.debug(f"EXPLAIN QUERY PLAN недоступен: {e}")
+            return plans
+        try:
+            for sql, params in candidates:
+                try:
+                    rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+                    plans.append({"sql": sql, "plan": [row[-1] for row in rows]})
+                except sqlite3.Error as e:
+                    plans.append({"sql": sql, "plan": [f"error: {e}"]})
+        finally:
+            conn.close()
+        return plans
+
+    def top(self, limit: int = 20) -> List[dict]:
+        """Самые медленные вызовы из журнала, по убыванию длительности."""
+        return sorted(self.slow_calls, key=lambda record: record["duration_ms"], reverse=True)[:limit]
+
+    def summary(self) -> Dict[str, dict]:
+        return {
+            name: {
+                "calls": stats.calls,
+                "slow_calls": stats.slow_calls,
+                "total_ms": round(stats.total * 1000, 3),
+                "avg_ms": round(stats.total * 1000 / stats.calls, 3) if stats.calls else 0.0,
+                "max_ms": round(stats.max * 1000, 3),
+                "rows": stats.rows,
+            }
+            for name, stats in sorted(self.stats.items())
+            if stats.calls
+        }
+
+    def reset(self) -> None:
+        self.slow_calls.clear()
+        self._explained_at.clear()
+        self._plans.clear()
+        for stats in self.stats.values():
+            # Обёртки держат ссылки на эти объекты — обнуляем на месте
+            stats.__init__()
@@ -0,0 +1,217 @@
+"""
+Групповая фиксация записей в SQLite.
+
+Бот и API пишут в одну базу: заезды, профили, ротация refresh-сессий,
+транзакции входа. Раньше каждая запись открывала соединение, ждала
+блокировку записи WAL (BEGIN IMMEDIATE) и делала свой COMMIT с fsync, и
+процессы стояли в очереди за этой блокировкой.
+
+WriteQueue держит одно соединение на процесс. Записи выполняются в нём
+по очереди внутри общей транзакции, каждая в своей точке сохранения
+(SAVEPOINT): ошибка одной записи откатывает только её, а многошаговые
+функции авторизации остаются атомарными. Транзакцию фиксирует последняя
+запись, за которой в очереди никого нет (или по истечении window секунд,
+или после max_batch записей): одиночная запись фиксируется сразу, а под
+нагрузкой на пачку записей приходятся одна блокировка и один COMMIT.
+Вызывающий возвращается только после COMMIT своей пачки и сразу видит
+запись при чтении; если COMMIT не удался, ошибку получают все записи
+пачки. То же, если SQLite сам откатил всю транзакцию (SQLITE_FULL, ошибка
+ввода-вывода) и откатить одну запись до её точки сохранения уже нельзя.
+
+Запись внутри записи в том же потоке ждала бы сама себя, поэтому
+вложенный transaction() сразу выбрасывает RuntimeError.
+
+Тело записи выполняется в потоке вызывающего, поэтому профилирование
+(core.database.profiling) и спаны трассировки работают как раньше. Из
+цикла событий записи вызываются через asyncio.to_thread — иначе они
+выполняются строго по одной и не группируются.
+"""
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Optional
+
+from core.metrics import registry
+
+WRITE_QUEUE_WAIT_SECONDS = registry.histogram(
+    "carting_db_write_queue_wait_seconds",
+    "Ожидание очереди записей внутри процесса",
+    buckets=(0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0),
+)
+WRITE_LOCK_WAIT_SECONDS = registry.histogram(
+    "carting_db_write_lock_wait_seconds",
+    "Ожидание блокировки записи SQLite (BEGIN IMMEDIATE) — конкуренция с другими процессами",
+    buckets=(0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0, 5.0),
+)
+WRITE_LOCK_BUSY = registry.counter(
+    "carting_db_write_lock_busy_total",
+    "Блокировку записи SQLite не удалось получить за время ожидания",
+)
+WRITE_GROUP_SIZE = registry.histogram(
+    "carting_db_write_group_size",
+    "Записей в одной зафиксированной транзакции",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128),
+)
+WRITE_COMMITS = registry.counter(
+    "carting_db_write_commits_total",
+    "Групповые COMMIT по результату",
+    ["result"],
+)
+
+
+class _Group:
+    """Открытая транзакция и записи, выполненные в ней."""
+
+    __slots__ = ("jobs", "opened", "done", "error")
+
+    def __init__(self):
+        self.jobs = 0
+        self.opened = time.monotonic()
+        self.done = threading.Event()
+        self.error: Optional[BaseException] = None
+
+
+class WriteQueue:
+    """Очередь записей процесса с общей фиксацией."""
+
+    def __init__(
+        self,
+        connect: Callable[[], sqlite3.Connection],
+        target: Callable[[], Any] = lambda: None,
+        window: float = 0.0,
+        max_batch: int = 64,
+    ):
+        # connect должен вернуть соединение с isolation_level=None и check_same_thread=False
+        self.connect = connect
+        self.target = target
+        self.window = window
+        self.max_batch = max(1, max_batch)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._conn_target: Any = None
+        self._group: Optional[_Group] = None
+        self._lock = threading.Lock()
+        self._arrivals = threading.Lock()
+        self._waiting = 0
+        self._local = threading.local()
+
+    @contextmanager
+    def transaction(self):
+        """Соединение для одной записи; выход — после COMMIT её пачки."""
+        if getattr(self._local, "active", False):
+            raise RuntimeError("Вложенная запись в том же потоке: внешняя запись ещё держит очередь")
+        self._local.active = True
+        try:
+            with self._job() as conn:
+                yield conn
+        finally:
+            self._local.active = False
+
+    @contextmanager
+    def _job(self):
+        with self._arrivals:
+            self._waiting += 1
+        started = time.perf_counter()
+        self._lock.acquire()
+        with self._arrivals:
+            self._waiting -= 1
+        WRITE_QUEUE_WAIT_SECONDS.observe(time.perf_counter() - started)
+        try:
+            group = self._group or self._begin()
+            conn = self._conn
+            conn.execute("SAVEPOINT write_job")
+            try:
+                yield conn
+            except BaseException:
+                self._rollback_job(group)
+                raise
+            else:
+                conn.execute("RELEASE write_job")
+            finally:
+                group.jobs += 1
+                if self._group is group and self._should_commit(group):
+                    self._commit(group)
+        finally:
+            self._lock.release()
+        self._await(group)
+
+    def _begin(self) -> _Group:
+        target = self.target()
+        if self._conn is None or self._conn_target != target:
+            # База сменилась (тесты подменяют DB_FILE) — переоткрываем соединение
+            if self._conn is not None:
+                self._conn.close()
+            self._conn = self.connect()
+            self._conn_target = target
+        started = time.perf_counter()
+        try:
+            self._conn.execute("BEGIN IMMEDIATE")
+        except sqlite3.OperationalError:
+            WRITE_LOCK_BUSY.inc()
+            raise
+        finally:
+            WRITE_LOCK_WAIT_SECONDS.observe(time.perf_counter() - started)
+        self._group = _Group()
+        return self._group
+
+    def _rollback_job(self, group: _Group) -> None:
+        """Откатывает запись до её точки сохранения.
+
+        Если SQLite уже откатил всю транзакцию, точки сохранения нет: записи
+        пачки потеряны, и пачка завершается с ошибкой для всех.
+        """
+        try:
+            self._conn.execute("ROLLBACK TO write_job")
+            self._conn.execute("RELEASE write_job")
+        except sqlite3.Error as e:
+            self._fail(group, e)
+
+    def _fail(self, group: _Group, error: BaseException) -> None:
+        self._group = None
+        group.error = error
+        WRITE_COMMITS.labels("error").inc()
+        if self._conn.in_transaction:
+            try:
+                self._conn.execute("ROLLBACK")
+            except sqlite3.Error:
+                pass
+        WRITE_GROUP_SIZE.observe(group.jobs)
+        group.done.set()
+
+    def _should_commit(self, group: _Group) -> bool:
+        if group.jobs >= self.max_batch:
+            return True
+        if self.window > 0:
+            return time.monotonic() - group.opened >= self.window
+        # Кто-то уже ждёт очереди — он и зафиксирует пачку
+        return self._waiting == 0
+
+    def _commit(self, group: _Group) -> None:
+        self._group = None
+        try:
+            self._conn.execute("COMMIT")
+            WRITE_COMMITS.labels("ok").inc()
+        except sqlite3.Error as e:
+            self._fail(group, e)
+            return
+        WRITE_GROUP_SIZE.observe(group.jobs)
+        group.done.set()
+
+    def _await(self, group: _Group) -> None:
+        if self.window > 0 and not group.done.is_set():
+            remaining = self.window - (time.monotonic() - group.opened)
+            if not group.done.wait(max(0.0, remaining)):
+                with self._lock:
+                    if self._group is group:
+                        self._commit(group)
+        group.done.wait()
+        if group.error is not None:
+            raise sqlite3.OperationalError(f"Пачка записей не зафиксирована: {group.error}") from group.error
+
+    def close(self) -> None:
+        with self._lock:
+            if self._group is not None:
+                self._commit(self._group)
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
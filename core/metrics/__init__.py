@@ -0,0 +1,27 @@
+"""Метрики процесса в формате Prometheus."""
+
+from core.metrics.loop import BlockingWatchdog, LoopLagMonitor, blocking_watchdog
+from core.metrics.metrics import (
+    CONTENT_TYPE,
+    Counter,
+    Gauge,
+    Histogram,
+    Registry,
+    registry,
+    render_families,
+    timed,
+)
+
+__all__ = [
+    "BlockingWatchdog",
+    "CONTENT_TYPE",
+    "Counter",
+    "Gauge",
+    "Histogram",
+    "LoopLagMonitor",
+    "Registry",
+    "blocking_watchdog",
+    "registry",
+    "render_families",
+    "timed",
+]
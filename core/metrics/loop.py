@@ -0,0 +1,193 @@
+"""
+Задержка цикла событий и поиск блокирующих вызовов.
+
+Фоновая задача засыпает на interval секунд и замеряет, насколько позже
+она проснулась. Всё, что блокирует цикл (синхронный SQLite, разбор большой
+страницы, запись файлов), видно как рост этой задержки.
+
+Сама задержка не говорит, кто виноват, поэтому BlockingWatchdog из отдельного
+потока ставит в цикл пустой колбэк и ждёт его. Если колбэк не выполнился за
+порог, цикл занят чужим кодом: watchdog снимает стек потока цикла, считает
+место блокировки в метрике carting_event_loop_blocked_total{site} и пишет
+стек в лог. В спокойном состоянии это один call_soon_threadsafe за период.
+"""
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from core.config.config import LOOP_BLOCK_THRESHOLD_MS
+from core.metrics.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+EVENT_LOOP_LAG = registry.histogram(
+    "carting_event_loop_lag_seconds",
+    "Опоздание пробуждения фоновой задачи относительно запланированного",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+EVENT_LOOP_LAG_MAX = registry.gauge(
+    "carting_event_loop_lag_max_seconds",
+    "Наибольшая задержка цикла событий с момента запуска",
+)
+EVENT_LOOP_BLOCKED = registry.counter(
+    "carting_event_loop_blocked_total",
+    "Блокировки цикла событий дольше порога по месту в коде",
+    ["site"],
+)
+EVENT_LOOP_BLOCKED_SECONDS = registry.histogram(
+    "carting_event_loop_blocked_seconds",
+    "Длительность блокировок цикла событий дольше порога",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+
+# Корень проекта: место блокировки ищется в нашем коде, а не в библиотеках
+_PROJECT_ROOT = str(Path(__file__).resolve().parent.parent.parent) + "/"
+_MAX_SITES = 50
+
+
+class LoopLagMonitor:
+    """Периодически измеряет задержку текущего цикла событий."""
+
+    def __init__(self, interval: float = 0.5):
+        self.interval = interval
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.observe(max(0.0, time.perf_counter() - started - self.interval))
+
+    def observe(self, lag: float) -> None:
+        self.last_lag = lag
+        EVENT_LOOP_LAG.observe(lag)
+        if lag > self.max_lag:
+            self.max_lag = lag
+            EVENT_LOOP_LAG_MAX.set(lag)
+
+
+def _blocking_site(frames: traceback.StackSummary) -> str:
+    """Самый глубокий кадр из кода проекта: «путь:функция»."""
+    for frame in reversed(frames):
+        if frame.filename.startswith(_PROJECT_ROOT) and "site-packages" not in frame.filename:
+            return f"{frame.filename[len(_PROJECT_ROOT):]}:{frame.name}"
+    if frames:
+        return f"{Path(frames[-1].filename).name}:{frames[-1].name}"
+    return "unknown"
+
+
+class BlockingWatchdog:
+    """Ловит колбэки, блокирующие цикл событий дольше threshold секунд."""
+
+    def __init__(
+        self,
+        threshold: float = 0.1,
+        interval: Optional[float] = None,
+        history: int = 50,
+        log_interval: float = 60.0,
+    ):
+        self.threshold = threshold
+        self.interval = interval if interval is not None else threshold
+        self.log_interval = log_interval
+        self.blocks: "deque[dict]" = deque(maxlen=history)
+        self._logged_at: Dict[str, float] = {}
+        self._sites: set = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+
+    def start(self) -> None:
+        """Запускает наблюдение за текущим циклом событий."""
+        if self.threshold <= 0 or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    async def stop(self) -> None:
+        thread = self._thread
+        if thread is None:
+            return
+        self._stopping.set()
+        await asyncio.to_thread(thread.join, self.threshold + self.interval + 1)
+        self._thread = None
+
+    def _run(self) -> None:
+        while not self._stopping.wait(self.interval):
+            answered = threading.Event()
+            try:
+                self._loop.call_soon_threadsafe(answered.set)
+            except RuntimeError:
+                # Цикл закрыт
+                return
+            started = time.perf_counter()
+            if answered.wait(self.threshold):
+                continue
+            frames = self._loop_stack()
+            while not answered.wait(self.interval):
+                if self._stopping.is_set():
+                    return
+            self.record(time.perf_counter() - started, frames)
+
+    def _loop_stack(self) -> traceback.StackSummary:
+        frame = sys._current_frames().get(self._loop_thread)
+        if frame is None:
+            return traceback.StackSummary()
+        return traceback.extract_stack(frame)
+
+    def record(self, duration: float, frames: traceback.StackSummary) -> None:
+        site = _blocking_site(frames)
+        if site not in self._sites:
+            if len(self._sites) >= _MAX_SITES:
+                site = "other"
+            else:
+                self._sites.add(site)
+        EVENT_LOOP_BLOCKED.labels(site).inc()
+        EVENT_LOOP_BLOCKED_SECONDS.observe(duration)
+        stack = traceback.format_list(frames[-12:])
+        self.blocks.append({
+            "site": site,
+            "duration_ms": round(duration * 1000, 1),
+            "at": datetime.now(timezone.utc).isoformat(),
+            "stack": [line.rstrip() for line in stack],
+        })
+        now = time.monotonic()
+        logged_at = self._logged_at.get(site)
+        if logged_at is None or now - logged_at >= self.log_interval:
+            self._logged_at[site] = now
+            logger.warning(
+                f"Цикл событий заблокирован на {duration * 1000:.0f} мс в {site}:\n" + "".join(stack)
+            )
+
+    def recent(self, limit: int = 20) -> List[dict]:
+        """Последние блокировки, самые свежие первыми."""
+        return list(reversed(self.blocks))[:limit]
+
+
+blocking_watchdog = BlockingWatchdog(threshold=LOOP_BLOCK_THRESHOLD_MS / 1000)
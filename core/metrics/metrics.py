@@ -0,0 +1,260 @@
+"""
+Метрики в формате Prometheus без внешних зависимостей.
+
+Счётчики, gauge и гистограммы хранятся в памяти процесса; у каждой метрики
+с метками дочерние серии создаются один раз и кэшируются, так что на горячем
+пути остаются поиск в словаре и сложение. Значения, которые и так считаются
+в других местах (кэш заездов, предохранитель), снимаются колбэками только
+в момент выгрузки.
+"""
+import functools
+import math
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Семейство значений из колбэка: (имя, тип, описание, [(метки, значение)])
+CollectedFamily = Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]
+# Семейство в снимке Registry.collect: значения с суффиксом серии (_bucket, _sum, ...)
+Family = Tuple[str, str, str, List[Tuple[str, Dict[str, str], float]]]
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, int) or value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels.items())
+    return "{" + pairs + "}"
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+
+class _GaugeChild(_CounterChild):
+    __slots__ = ()
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        # Последняя ячейка — значения больше верхней границы (+Inf)
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    @contextmanager
+    def time(self):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        if not self.labelnames:
+            self._default = self.labels()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        """Серия с данными значениями меток (создаётся при первом обращении)."""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name}: ожидались метки {self.labelnames}")
+            child = self._children[values] = self._new_child()
+        return child
+
+    def series(self) -> List[Tuple[Dict[str, str], object]]:
+        """Все серии метрики: метки и объект серии (value, counts/sum/count у гистограмм)."""
+        return [(dict(zip(self.labelnames, values)), child) for values, child in list(self._children.items())]
+
+    def _samples(self) -> Iterable[Tuple[str, Dict[str, str], float]]:
+        for values, child in list(self._children.items()):
+            yield "", dict(zip(self.labelnames, values)), child.value
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default.inc(amount)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value: float) -> None:
+        self._default.set(value)
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default.inc(amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self._default.dec(amount)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        self.bounds = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.bounds)
+
+    def observe(self, value: float) -> None:
+        self._default.observe(value)
+
+    def time(self):
+        return self._default.time()
+
+    def _samples(self):
+        for values, child in list(self._children.items()):
+            labels = dict(zip(self.labelnames, values))
+            cumulative = 0
+            for bound, count in zip(self.bounds + (math.inf,), child.counts):
+                cumulative += count
+                yield "_bucket", {**labels, "le": _format_value(bound)}, cumulative
+            yield "_sum", labels, child.sum
+            yield "_count", labels, child.count
+
+
+class Registry:
+    """Набор метрик процесса и колбэков, вызываемых при выгрузке."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], Iterable[CollectedFamily]]] = []
+
+    def _get_or_create(self, cls, name, documentation, labelnames, **kwargs):
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+        elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+            raise ValueError(f"Метрика {name} уже зарегистрирована с другим типом или метками")
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def add_collector(self, collector: Callable[[], Iterable[CollectedFamily]]) -> None:
+        """Добавляет колбэк, возвращающий семейства (имя, тип, описание, значения)."""
+        self._collectors.append(collector)
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def collect(self) -> List[Family]:
+        """Все семейства с текущими значениями: снимок, который можно передать другому процессу."""
+        families: List[Family] = []
+        for metric in list(self._metrics.values()):
+            families.append((metric.name, metric.kind, metric.documentation, list(metric._samples())))
+        for collector in self._collectors:
+            for name, kind, documentation, samples in collector():
+                families.append((name, kind, documentation, [("", labels, value) for labels, value in samples]))
+        return families
+
+    def render(self) -> str:
+        """Текстовый формат экспозиции Prometheus 0.0.4."""
+        return render_families(self.collect())
+
+
+def render_families(families: Iterable[Family]) -> str:
+    lines: List[str] = []
+    for name, kind, documentation, samples in families:
+        lines.append(f"# HELP {name} {documentation}")
+        lines.append(f"# TYPE {name} {kind}")
+        for suffix, labels, value in samples:
+            lines.append(f"{name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def timed(histogram: Histogram, *labels: str):
+    """Декоратор: время вызова функции в серию histogram.labels(*labels)."""
+    child = histogram.labels(*labels)
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                child.observe(time.perf_counter() - started)
+        return wrapper
+
+    return decorator
+
+
+registry = Registry()
@@ -0,0 +1,25 @@
+"""
+Небольшой HTTP-листенер с /metrics для процессов без своего веб-сервера (бот).
+"""
+from aiohttp import web
+
+from core.metrics.metrics import CONTENT_TYPE, Registry, registry
+
+
+def create_metrics_app(source: Registry = registry) -> web.Application:
+    async def metrics(request: web.Request) -> web.Response:
+        return web.Response(
+            body=source.render().encode(), headers={"Content-Type": CONTENT_TYPE}
+        )
+
+    app = web.Application()
+    app.router.add_get("/metrics", metrics)
+    return app
+
+
+async def start_metrics_server(host: str, port: int, source: Registry = registry) -> web.AppRunner:
+    """Запускает листенер в текущем цикле событий; остановка — runner.cleanup()."""
+    runner = web.AppRunner(create_metrics_app(source), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
@@ -0,0 +1,137 @@
+"""
+Метрики всех воркеров API в одной выгрузке.
+
+У каждого воркера uvicorn свой registry, а /api/metrics отвечает тот воркер,
+которому достался запрос. WorkerMetrics раз в interval секунд кладёт снимок
+registry.collect() своего процесса в общий кэш (core.cache) под номером
+воркера; выгрузка собирает свежие снимки всех воркеров и отдаёт серии
+с меткой worker. Снимок умершего воркера пропадает через три интервала.
+
+Номер воркера — наименьший свободный слот "0", "1", … в общем кэше: процесс
+занимает его при первой публикации и продлевает при каждой следующей.
+Перезапущенный воркер получает освободившийся номер, так что серии
+в Prometheus не множатся с каждым новым pid.
+
+Без общего кэша (SHARED_CACHE_PATH=none) выгружается только свой процесс.
+"""
+import asyncio
+import logging
+import os
+import socket
+from typing import Dict, List, Optional
+
+from core.cache.shared import SharedCache, shared_cache
+from core.config.config import WORKER_METRICS_INTERVAL_SECONDS
+from core.metrics.metrics import Family, Registry, registry, render_families
+
+logger = logging.getLogger(__name__)
+
+_NAMESPACE = "worker_metrics"
+_SLOTS = "worker_slots"
+# Больше воркеров на одной машине не бывает; без свободного слота метка — имя процесса
+_MAX_SLOTS = 64
+
+# Имя процесса: владелец слота и метка, пока номер не получен
+PROCESS_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _merge(snapshots: Dict[str, List[Family]]) -> List[Family]:
+    """Семейства всех воркеров: серии одного семейства подряд, у каждой метка worker."""
+    merged: Dict[str, Family] = {}
+    for worker, families in sorted(snapshots.items()):
+        for name, kind, documentation, samples in families:
+            family = merged.setdefault(name, (name, kind, documentation, []))
+            family[3].extend((suffix, {"worker": worker, **labels}, value) for suffix, labels, value in samples)
+    return list(merged.values())
+
+
+class WorkerMetrics:
+    """Публикует снимок метрик процесса и собирает снимки остальных воркеров.
+
+    worker задаёт метку явно; по умолчанию она — занятый в общем кэше слот.
+    """
+
+    def __init__(
+        self,
+        cache: Optional[SharedCache],
+        source: Registry = registry,
+        interval: float = 15.0,
+        worker: Optional[str] = None,
+        owner: str = PROCESS_ID,
+    ):
+        self.cache = cache
+        self.source = source
+        self.interval = interval
+        self.owner = owner
+        self._fixed = worker
+        self._slot: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def worker(self) -> str:
+        """Метка worker этого процесса в выгрузке."""
+        return self._fixed or self._slot or self.owner
+
+    def start(self) -> None:
+        if self.cache is None or self.interval <= 0:
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        await asyncio.to_thread(self._release)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.to_thread(self.publish)
+            await asyncio.sleep(self.interval)
+
+    def _claim(self) -> None:
+        """Продлевает свой слот или занимает наименьший свободный."""
+        if self._fixed is not None or self.cache is None:
+            return
+        ttl = self.interval * 3
+        if self._slot is not None and self.cache.claim(_SLOTS, self._slot, self.owner, ttl):
+            return
+        for index in range(_MAX_SLOTS):
+            if self.cache.claim(_SLOTS, str(index), self.owner, ttl):
+                self._slot = str(index)
+                return
+        logger.warning(f"Нет свободного номера воркера, метрики под меткой {self.owner}")
+        self._slot = None
+
+    def _release(self) -> None:
+        self.cache.invalidate(_NAMESPACE, self.worker)
+        if self._slot is not None:
+            self.cache.invalidate(_SLOTS, self._slot)
+            self._slot = None
+
+    def publish(self) -> List[Family]:
+        families = self.source.collect()
+        if self.cache is not None:
+            previous = self.worker
+            self._claim()
+            if self.worker != previous:
+                self.cache.invalidate(_NAMESPACE, previous)
+            self.cache.put(_NAMESPACE, self.worker, families, ttl=self.interval * 3)
+        return families
+
+    def render(self) -> str:
+        """Выгрузка Prometheus по всем живым воркерам; свой снимок — текущий."""
+        own = self.publish()
+        if self.cache is None:
+            return render_families(own)
+        snapshots = {worker: entry.value for worker, entry in self.cache.entries(_NAMESPACE).items()}
+        snapshots[self.worker] = own
+        return render_families(_merge(snapshots))
+
+
+worker_metrics = WorkerMetrics(shared_cache, interval=WORKER_METRICS_INTERVAL_SECONDS)
@@ -1,25 +1,31 @@
+from array import array
 from dataclasses import dataclass
 from datetime import datetime
-from typing import List, Optional
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple, Union, overload
 
-@dataclass
+from core.timing import format_ms_many, format_ms_or_none
+
+# Модели неизменяемы: разобранные заезды лежат в общем кэше и
+# разделяются между запросами, поэтому менять их на месте нельзя.
+
+@dataclass(frozen=True, slots=True)
 class Race:
     number: str
     href: str
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class DayRaces:
     date: datetime
     races: List[Race]
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Cart:
     id: str
     number: str
     best_lap: str
     position: str
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class LapData:
     """Данные об одном круге"""
     lap_number: int
@@ -29,7 +35,99 @@ class LapData:
     sector3: Optional[str] = None
     sector4: Optional[str] = None
 
-@dataclass
+
+class LapTable(Sequence[LapData]):
+    """Круги заезда в колоночном виде: номера, время круга и секторов
+    хранятся массивами int (мс), а LapData со строками собирается
+    только при обращении к элементу.
+
+    Круг 0 — выезд с пит-лейна: у него нет времени круга и первого сектора.
+    """
+
+    __slots__ = ("lap_numbers", "lap_times", "sector1", "sector2", "sector3", "sector4")
+
+    def __init__(self, rows: Iterable[Tuple[int, int, int, int, int, int]] = ()):
+        self.lap_numbers = array("i")
+        # Время круга может быть суммой секторов, поэтому 64 бита
+        self.lap_times = array("q")
+        self.sector1 = array("i")
+        self.sector2 = array("i")
+        self.sector3 = array("i")
+        self.sector4 = array("i")
+        for lap_number, lap_time, s1, s2, s3, s4 in rows:
+            self.lap_numbers.append(lap_number)
+            self.lap_times.append(lap_time)
+            self.sector1.append(s1)
+            self.sector2.append(s2)
+            self.sector3.append(s3)
+            self.sector4.append(s4)
+
+    def __len__(self) -> int:
+        return len(self.lap_numbers)
+
+    @overload
+    def __getitem__(self, index: int) -> LapData: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[LapData]: ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[LapData, List[LapData]]:
+        if isinstance(index, slice):
+            return [self._lap(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("lap index out of range")
+        return self._lap(index)
+
+    def __iter__(self) -> Iterator[LapData]:
+        # Колонки форматируются пачкой, а не по одному значению на круг
+        lap_times = format_ms_many(self.lap_times)
+        sector1 = format_ms_many(self.sector1)
+        sector2 = format_ms_many(self.sector2)
+        sector3 = format_ms_many(self.sector3)
+        sector4 = format_ms_many(self.sector4)
+        for i, lap_number in enumerate(self.lap_numbers):
+            if lap_number == 0:
+                yield LapData(0, "", None, sector2[i], sector3[i], sector4[i])
+            else:
+                yield LapData(
+                    lap_number, lap_times[i], sector1[i], sector2[i], sector3[i], sector4[i]
+                )
+
+    def _lap(self, i: int) -> LapData:
+        lap_number = self.lap_numbers[i]
+        if lap_number == 0:
+            return LapData(
+                lap_number=0,
+                lap_time="",
+                sector1=None,
+                sector2=format_ms_or_none(self.sector2[i]),
+                sector3=format_ms_or_none(self.sector3[i]),
+                sector4=format_ms_or_none(self.sector4[i]),
+            )
+        return LapData(
+            lap_number=lap_number,
+            lap_time=format_ms_or_none(self.lap_times[i]),
+            sector1=format_ms_or_none(self.sector1[i]),
+            sector2=format_ms_or_none(self.sector2[i]),
+            sector3=format_ms_or_none(self.sector3[i]),
+            sector4=format_ms_or_none(self.sector4[i]),
+        )
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, LapTable):
+            return all(
+                getattr(self, column) == getattr(other, column) for column in self.__slots__
+            )
+        if isinstance(other, Sequence):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"LapTable({len(self)} laps)"
+
+@dataclass(frozen=True, slots=True)
 class Competitor:
     """Модель для детальной информации о конкуренте из jsCompetitors"""
     id: str
@@ -44,8 +142,20 @@ class Competitor:
     theor_lap_formatted: Optional[str] = None
     display_name: Optional[str] = None
     gap_to_leader: Optional[str] = None
-    lap_times: Optional[List[LapData]] = None
+    lap_times: Optional[Sequence[LapData]] = None
+
+@dataclass(frozen=True, slots=True)
+class RacePage:
+    """Страница заезда, разобранная один раз: результаты и данные jsCompetitors"""
+    carts: List[Cart]
+    competitors: Optional[List[Competitor]] = None
+    competitors_error: Optional[str] = None
 
 class ParsingError(Exception):
     """Ошибки парсинга"""
     pass
+
+
+class UpstreamError(ParsingError):
+    """Сайт kartchrono не ответил или недоступен"""
+    pass
@@ -0,0 +1,178 @@
+"""
+Потоковый разбор страницы архива kartchrono.
+
+Страница читается HTMLParser'ом сверху вниз (новые заезды — вверху), и
+разбор можно остановить на первом уже известном заезде: для обновления
+архива нужно прочитать только то, что появилось с прошлого раза.
+"""
+from dataclasses import dataclass, field
+from html.parser import HTMLParser
+from typing import Collection, List, Optional, Tuple
+
+_VOID_ELEMENTS = frozenset({
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "link",
+    "meta", "param", "source", "track", "wbr",
+})
+
+# ("date", текст заголовка, "") или ("race", номер заезда, href)
+ArchiveItem = Tuple[str, str, str]
+
+
+@dataclass
+class ArchiveScan:
+    """Элементы .archiveData по порядку до места остановки."""
+    found: bool = False
+    reached_known: bool = False
+    items: List[ArchiveItem] = field(default_factory=list)
+
+
+class _StopScan(Exception):
+    pass
+
+
+class _Link:
+    __slots__ = ("href", "depth", "text", "first_depth", "second_depth", "second_text", "done")
+
+    def __init__(self, href: str, depth: int):
+        self.href = href
+        self.depth = depth
+        self.text: List[str] = []
+        self.first_depth: Optional[int] = None
+        self.second_depth: Optional[int] = None
+        self.second_text: Optional[List[str]] = None
+        self.done = False
+
+
+class _ArchiveScanner(HTMLParser):
+    """Повторяет обход archive_data.children из прежнего парсера на bs4:
+    заголовки дат и первая ссылка каждой строки archiveDataRow."""
+
+    def __init__(self, stop_hrefs: Collection[str]):
+        super().__init__(convert_charrefs=True)
+        self.stop_hrefs = stop_hrefs
+        self.scan = ArchiveScan()
+        self.stack: List[str] = []
+        self.archive_depth: Optional[int] = None
+        self.header_depth: Optional[int] = None
+        self.header_text: List[str] = []
+        self.row_depth: Optional[int] = None
+        self.link: Optional[_Link] = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _VOID_ELEMENTS:
+            self._start(tag, attrs, len(self.stack) + 1, void=True)
+            return
+        self.stack.append(tag)
+        self._start(tag, attrs, len(self.stack), void=False)
+
+    def handle_startendtag(self, tag, attrs):
+        self._start(tag, attrs, len(self.stack) + 1, void=True)
+
+    def _start(self, tag, attrs, depth, void):
+        classes = ()
+        href = None
+        for name, value in attrs:
+            if name == "class" and value:
+                classes = value.split()
+            elif name == "href":
+                href = value
+
+        if self.archive_depth is None:
+            if not self.scan.found and "archiveData" in classes and not void:
+                self.archive_depth = depth
+                self.scan.found = True
+            return
+
+        link = self.link
+        if link is not None and not link.done:
+            if link.first_depth is None:
+                link.first_depth = -1 if void else depth
+            elif link.second_depth is None and link.first_depth > 0:
+                link.second_depth = -1 if void else depth
+                link.second_text = []
+
+        if depth == self.archive_depth + 1:
+            if "archiveDateHeader" in classes:
+                if not void:
+                    self.header_depth = depth
+                    self.header_text = []
+                else:
+                    self.scan.items.append(("date", "", ""))
+            elif "archiveDataRow" in classes and not void:
+                self.row_depth = depth
+        elif self.row_depth is not None and self.link is None and tag == "a":
+            href = href or ""
+            if href in self.stop_hrefs:
+                self.scan.reached_known = True
+                raise _StopScan()
+            self.link = _Link(href, depth)
+            if void:
+                self._finish_link()
+
+    def handle_endtag(self, tag):
+        if tag not in self.stack:
+            return
+        while self.stack:
+            depth = len(self.stack)
+            closed = self.stack.pop()
+            self._end(depth)
+            if closed == tag:
+                break
+
+    def _end(self, depth):
+        link = self.link
+        if link is not None and not link.done:
+            if link.second_depth == depth:
+                link.second_depth = -1
+            if link.first_depth == depth:
+                link.first_depth = -1
+            if link.depth == depth:
+                self._finish_link()
+        if self.header_depth == depth:
+            self.header_depth = None
+            self.scan.items.append(("date", "".join(self.header_text).strip(), ""))
+        if self.row_depth == depth:
+            self.row_depth = None
+            self.link = None
+        if self.archive_depth == depth:
+            # Всё, что ниже архива, не нужно
+            raise _StopScan()
+
+    def _finish_link(self):
+        link = self.link
+        link.done = True
+        if link.second_text is not None:
+            number = "".join(link.second_text)
+        else:
+            number = "".join(link.text)
+        self.scan.items.append(("race", number.strip(), link.href))
+
+    def handle_data(self, data):
+        if self.header_depth is not None:
+            self.header_text.append(data)
+        link = self.link
+        if link is not None and not link.done:
+            link.text.append(data)
+            if link.second_text is not None and link.second_depth not in (None, -1):
+                link.second_text.append(data)
+
+    def close(self):
+        try:
+            super().close()
+            while self.stack:
+                depth = len(self.stack)
+                self.stack.pop()
+                self._end(depth)
+        except _StopScan:
+            pass
+
+
+def scan_archive(html: str, stop_hrefs: Collection[str] = ()) -> ArchiveScan:
+    """Читает .archiveData сверху вниз до первого заезда из stop_hrefs."""
+    scanner = _ArchiveScanner(stop_hrefs)
+    try:
+        scanner.feed(html)
+    except _StopScan:
+        return scanner.scan
+    scanner.close()
+    return scanner.scan
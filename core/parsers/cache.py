@@ -0,0 +1,189 @@
+import asyncio
+import re
+from collections import OrderedDict
+from datetime import date
+from time import monotonic
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from core.cache import SharedCache, shared_cache
+from core.config.config import (
+    KARTCHRONO_BASE_URL, RACE_CACHE_SIZE, RACE_CACHE_TTL_SECONDS, RACE_LIVE_CACHE_TTL_SECONDS,
+)
+from core.metrics import registry
+from core.models.models import DayRaces
+
+_RACE_NUMBER_RE = re.compile(r"\d+")
+
+
+def race_finished(days: List[DayRaces], href: str, today: date) -> Optional[bool]:
+    """Завершён ли заезд по архиву; None — заезда в архиве нет.
+
+    Заезды прошлых дней завершены. Из сегодняшних может ещё идти только
+    заезд с наибольшим номером («Заезд 7»), где бы он ни стоял на странице;
+    заезд без номера считается идущим.
+    """
+    for day in days:
+        for race in day.races:
+            if race.href != href:
+                continue
+            if day.date.date() < today:
+                return True
+            numbers = [_race_number(other.number) for other in day.races]
+            number = _race_number(race.number)
+            return number is not None and any(n is not None and n > number for n in numbers)
+    return None
+
+
+def _race_number(text: str) -> Optional[int]:
+    match = _RACE_NUMBER_RE.search(text)
+    return int(match.group()) if match else None
+
+
+class RaceCache:
+    """LRU-кэш результатов разбора страниц заездов с TTL.
+
+    Параллельные запросы одного и того же заезда объединяются в одну
+    загрузку: второй вызов get_or_load ждёт уже идущий запрос (например,
+    фоновую предзагрузку), а не запускает ещё один.
+
+    Если задан shared, промах в памяти сначала проверяется в общем кэше
+    процессов, а загруженное значение записывается и туда — страницу,
+    которую уже разобрал другой воркер или бот, повторно не качаем.
+
+    Если задан live_ttl_seconds, полный ttl_seconds получают только заезды,
+    завершённые по архиву из общего кэша (его туда кладёт ArchiveParser
+    любого процесса, см. race_finished), так что все процессы решают
+    одинаково. Идущий заезд живёт live_ttl_seconds и в памяти, и в общем
+    кэше. Заезд, которого в архиве нет (или архива нет), хранится
+    live_ttl_seconds только в памяти: в общий кэш он не пишется, чтобы
+    не укорачивать запись, сделанную процессом, который знает больше.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = RACE_CACHE_SIZE,
+        ttl_seconds: float = RACE_CACHE_TTL_SECONDS,
+        shared: Optional[SharedCache] = None,
+        namespace: str = "race",
+        live_ttl_seconds: Optional[float] = None,
+        archive_key: str = KARTCHRONO_BASE_URL,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.live_ttl_seconds = live_ttl_seconds
+        self.archive_key = archive_key
+        self.shared = shared
+        self.namespace = namespace
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, href: str) -> Optional[Any]:
+        """Возвращает закэшированное значение или None."""
+        entry = self._entries.get(href)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= monotonic():
+            return None
+        self._entries.move_to_end(href)
+        return value
+
+    def get_stale(self, href: str) -> Optional[Any]:
+        """Возвращает значение даже с истёкшим TTL (пока оно не вытеснено).
+
+        Используется, когда сайт недоступен: лучше показать старые данные,
+        чем ошибку.
+        """
+        entry = self._entries.get(href)
+        if entry is not None:
+            return entry[1]
+        if self.shared is not None:
+            # Путь ошибки, поэтому синхронное чтение файла допустимо
+            shared_entry = self.shared.get(self.namespace, href)
+            if shared_entry is not None:
+                return shared_entry.value
+        return None
+
+    async def _finished(self, href: str) -> Optional[bool]:
+        """Завершён ли заезд по архиву из общего кэша (устаревший архив тоже годится)."""
+        if self.live_ttl_seconds is None:
+            return True
+        if self.shared is None:
+            return None
+        entry = await self.shared.aget("archive", self.archive_key)
+        if entry is None:
+            return None
+        days, _ = entry.value
+        return race_finished(days, href, date.today())
+
+    def put(self, href: str, value: Any, ttl: Optional[float] = None) -> None:
+        """Кладёт значение в память процесса (в общий кэш пишет только загрузка)."""
+        ttl = self.ttl_seconds if ttl is None else ttl
+        self._entries[href] = (monotonic() + ttl, value)
+        self._entries.move_to_end(href)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def metric_families(self, cache: str):
+        """Счётчики кэша для выгрузки метрик (см. core.metrics)."""
+        labels = {"cache": cache}
+        lookups = self.hits + self.misses
+        return [
+            ("carting_cache_hits_total", "counter", "Попадания в кэш", [(labels, self.hits)]),
+            ("carting_cache_misses_total", "counter", "Промахи кэша", [(labels, self.misses)]),
+            ("carting_cache_hit_ratio", "gauge", "Доля попаданий с запуска",
+             [(labels, self.hits / lookups if lookups else 0.0)]),
+            ("carting_cache_entries", "gauge", "Записей в кэше", [(labels, len(self._entries))]),
+        ]
+
+    async def get_or_load(self, href: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Возвращает значение из кэша или загружает его один раз для всех ожидающих.
+
+        Отмена вызывающей задачи не прерывает уже начатую загрузку:
+        её результат всё равно попадёт в кэш.
+        """
+        value = self.get(href)
+        if value is not None:
+            self.hits += 1
+            return value
+        self.misses += 1
+
+        task = self._inflight.get(href)
+        if task is None:
+            task = asyncio.ensure_future(self._load(href, loader))
+            task.add_done_callback(_consume_exception)
+            self._inflight[href] = task
+        return await asyncio.shield(task)
+
+    async def _load(self, href: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            if self.shared is not None:
+                entry = await self.shared.aget(self.namespace, href)
+                if entry is not None and entry.fresh:
+                    self.put(href, entry.value, ttl=entry.ttl_left)
+                    return entry.value
+            value = await loader()
+            finished = await self._finished(href)
+            ttl = self.ttl_seconds if finished else self.live_ttl_seconds
+            self.put(href, value, ttl=ttl)
+            if self.shared is not None and finished is not None:
+                await self.shared.aput(self.namespace, href, value, ttl)
+            return value
+        finally:
+            self._inflight.pop(href, None)
+
+
+def _consume_exception(task: asyncio.Future) -> None:
+    # Ошибку получают ожидающие вызовы; если их не осталось (предзагрузку
+    # отменили), не даём asyncio ругаться на «never retrieved».
+    if not task.cancelled():
+        task.exception()
+
+
+race_cache = RaceCache(shared=shared_cache, live_ttl_seconds=RACE_LIVE_CACHE_TTL_SECONDS)
+registry.add_collector(lambda: race_cache.metric_families("race"))
@@ -0,0 +1,81 @@
+"""
+Лента новых заездов архива.
+
+ArchiveParser после каждого обновления сообщает сюда заезды, которых
+раньше не видел; подписчики (кэши, фоновая выгрузка, уведомления бота)
+получают только действительно новые заезды, даже если архив в процессе
+разбирают несколько экземпляров парсера.
+"""
+import asyncio
+import inspect
+import logging
+from collections import OrderedDict
+from typing import Awaitable, Callable, List, Union
+
+from core.models.models import DayRaces
+
+logger = logging.getLogger(__name__)
+
+NewRacesListener = Callable[[List[DayRaces]], Union[None, Awaitable[None]]]
+
+
+class NewRacesFeed:
+    """Рассылает подписчикам заезды, которых ещё не было в архиве."""
+
+    def __init__(self, max_seen: int = 10000):
+        self.max_seen = max_seen
+        self._seen: "OrderedDict[str, None]" = OrderedDict()
+        self._listeners: List[NewRacesListener] = []
+        self._primed = False
+
+    def subscribe(self, listener: NewRacesListener) -> Callable[[], None]:
+        """Подписывает listener; возвращает функцию отписки.
+
+        listener может быть обычной функцией или корутиной — корутина
+        запускается отдельной задачей и не задерживает разбор архива.
+        """
+        self._listeners.append(listener)
+        return lambda: self._listeners.remove(listener) if listener in self._listeners else None
+
+    def publish(self, day_races: List[DayRaces]) -> List[DayRaces]:
+        """Отмечает заезды как увиденные и рассылает новые из них.
+
+        Первый вызов в процессе только запоминает текущий архив.
+        """
+        fresh = []
+        for day in day_races:
+            races = [race for race in day.races if race.href not in self._seen]
+            for race in races:
+                self._seen[race.href] = None
+            if races:
+                fresh.append(DayRaces(date=day.date, races=races))
+        while len(self._seen) > self.max_seen:
+            self._seen.popitem(last=False)
+
+        if not self._primed:
+            self._primed = True
+            return []
+        if fresh:
+            count = sum(len(day.races) for day in fresh)
+            logger.info(f"В архиве новых заездов: {count}")
+            for listener in list(self._listeners):
+                self._notify(listener, fresh)
+        return fresh
+
+    @staticmethod
+    def _notify(listener: NewRacesListener, fresh: List[DayRaces]) -> None:
+        try:
+            result = listener(fresh)
+            if inspect.isawaitable(result):
+                task = asyncio.ensure_future(result)
+                task.add_done_callback(_log_listener_error)
+        except Exception:
+            logger.exception("Ошибка подписчика новых заездов")
+
+
+def _log_listener_error(task: asyncio.Future) -> None:
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("Ошибка подписчика новых заездов", exc_info=task.exception())
+
+
+new_races_feed = NewRacesFeed()
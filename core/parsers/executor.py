@@ -0,0 +1,189 @@
+"""
+Где разбираются страницы заездов: в цикле событий, в пуле потоков или
+в пуле процессов.
+
+Разбор страницы занимает ~10 мс на обычную страницу и сотни мс на большую,
+и при веерной загрузке (/api/karts/today, 40 заездов) он держит цикл
+событий. Загрузка по-прежнему асинхронная, а html уходит в пул. Запросы
+на разбор, пришедшие почти одновременно, собираются в пачку (до batch_size
+страниц или batch_delay секунд) и отправляются одним заданием — так на
+процессный пул меньше пересылок. Из пула возвращаются RacePage: неизменяемые
+dataclass со slots и LapTable из массивов, они компактно сериализуются pickle.
+
+Маленькие страницы (меньше min_bytes) дешевле разобрать на месте, чем
+переслать. Спаны трассировки внутри пула не пишутся — весь разбор виден
+одним спаном parse.offload.
+"""
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from concurrent.futures.thread import BrokenThreadPool
+from typing import Any, List, Optional, Tuple
+
+from core.config.config import (
+    PARSE_BATCH_DELAY_MS,
+    PARSE_BATCH_SIZE,
+    PARSE_EXECUTOR,
+    PARSE_OFFLOAD_MIN_KB,
+    PARSE_WORKERS,
+)
+from core.metrics import registry
+from core.models.models import ParsingError, RacePage
+from core.tracing import span
+
+logger = logging.getLogger(__name__)
+
+MODES = ("inline", "thread", "process")
+
+
+def _parse_batch(pages: List[str]) -> List[Tuple[bool, Any]]:
+    """Разбирает пачку страниц в пуле: (True, RacePage) или (False, ParsingError)."""
+    from core.parsers.parsers import build_race_page
+
+    results = []
+    for html in pages:
+        try:
+            results.append((True, build_race_page(html)))
+        except ParsingError as e:
+            results.append((False, e))
+        except Exception as e:
+            # Произвольное исключение может не пережить pickle
+            results.append((False, ParsingError(f"Ошибка парсинга: {e}")))
+    return results
+
+
+class ParseExecutor:
+    """Разбор страниц заездов пачками вне цикла событий."""
+
+    def __init__(
+        self,
+        mode: str = "inline",
+        workers: int = 0,
+        batch_size: int = 8,
+        batch_delay: float = 0.002,
+        min_bytes: int = 0,
+    ):
+        if mode not in MODES:
+            raise ValueError(f"Неизвестный режим разбора: {mode} (ожидался один из {MODES})")
+        self.mode = mode
+        self.workers = workers or None
+        self.batch_size = max(1, batch_size)
+        self.batch_delay = batch_delay
+        self.min_bytes = min_bytes
+        self.batches = 0
+        self.pages = 0
+        self._pool: Optional[Executor] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+
+    def _get_pool(self) -> Executor:
+        if self._pool is None:
+            if self.mode == "process":
+                # spawn: форк процесса с потоками (watchdog, экспорт трасс) небезопасен
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            else:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="race-parse"
+                )
+        return self._pool
+
+    async def build_race_page(self, html: str) -> RacePage:
+        """Разбирает страницу заезда согласно режиму; ошибки — ParsingError."""
+        if self.mode == "inline" or len(html) < self.min_bytes:
+            from core.parsers.parsers import build_race_page
+            return build_race_page(html)
+
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # Новый цикл событий (например, перезапуск в тестах): старая пачка ему не принадлежит
+            self._loop = loop
+            self._pending = []
+            self._flush_handle = None
+        future = loop.create_future()
+        self._pending.append((html, future))
+        if len(self._pending) >= self.batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.batch_delay, self._flush)
+        with span("parse.offload", mode=self.mode, chars=len(html)):
+            return await future
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch = [(html, future) for html, future in self._pending if not future.done()]
+        self._pending = []
+        if not batch:
+            return
+        self.batches += 1
+        self.pages += len(batch)
+        try:
+            job = asyncio.wrap_future(
+                self._get_pool().submit(_parse_batch, [html for html, _ in batch])
+            )
+        except RuntimeError as e:
+            # Пул уже закрыт или сломан
+            self._discard_pool(e)
+            for _, future in batch:
+                future.set_exception(ParsingError(f"Ошибка парсинга: {e}"))
+            return
+        job.add_done_callback(lambda job: self._deliver(job, [future for _, future in batch]))
+
+    def _deliver(self, job: asyncio.Future, futures: List[asyncio.Future]) -> None:
+        if job.cancelled():
+            for future in futures:
+                future.cancel()
+            return
+        error = job.exception()
+        if error is not None:
+            if isinstance(error, (BrokenProcessPool, BrokenThreadPool)):
+                self._discard_pool(error)
+            for future in futures:
+                if not future.done():
+                    future.set_exception(ParsingError(f"Ошибка парсинга: {error!r}"))
+            return
+        for (ok, value), future in zip(job.result(), futures):
+            if future.done():
+                continue
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+    def _discard_pool(self, error: BaseException) -> None:
+        """Сломанный пул (упал воркер) заменяется новым при следующей пачке."""
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            logger.error(f"Пул разбора страниц пересоздаётся: {error!r}")
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self) -> None:
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def metric_families(self):
+        """Счётчики пачек для выгрузки метрик (см. core.metrics)."""
+        labels = {"mode": self.mode}
+        return [
+            ("carting_parse_batches_total", "counter", "Пачек страниц отправлено в пул разбора",
+             [(labels, self.batches)]),
+            ("carting_parse_offloaded_pages_total", "counter", "Страниц разобрано вне цикла событий",
+             [(labels, self.pages)]),
+        ]
+
+
+parse_executor = ParseExecutor(
+    PARSE_EXECUTOR,
+    workers=PARSE_WORKERS,
+    batch_size=PARSE_BATCH_SIZE,
+    batch_delay=PARSE_BATCH_DELAY_MS / 1000,
+    min_bytes=PARSE_OFFLOAD_MIN_KB * 1024,
+)
+registry.add_collector(parse_executor.metric_families)
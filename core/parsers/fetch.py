@@ -0,0 +1,428 @@
+"""
+Общий слой загрузки страниц kartchrono для всех парсеров.
+
+Каждая загрузка ограничена таймаутом попытки и общим дедлайном, повторы
+идут с экспоненциальной задержкой со случайным разбросом и расходуют общий
+бюджет повторов, чтобы при сбоях сайта не умножать нагрузку на него.
+Перед каждой попыткой нужно получить разрешение у UpstreamGovernor
+(лимит одновременных запросов, темп и приоритеты).
+Автомат-предохранитель (circuit breaker) после серии сбоев перестаёт
+ходить на сайт и сразу отдаёт UpstreamError — парсеры в этом случае
+отвечают данными из кэша, если они есть.
+"""
+import asyncio
+import hashlib
+import logging
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from time import monotonic
+from typing import Dict, Optional
+
+import aiohttp
+
+from core.config.config import (
+    PARSER_ATTEMPT_TIMEOUT,
+    PARSER_BACKOFF_BASE_SECONDS,
+    PARSER_BACKOFF_MAX_SECONDS,
+    PARSER_BREAKER_FAILURE_THRESHOLD,
+    PARSER_BREAKER_RESET_SECONDS,
+    PARSER_MAX_RETRIES,
+    PARSER_RETRY_BUDGET_RATIO,
+    PARSER_TIMEOUT,
+)
+from core.metrics import registry
+from core.models.models import UpstreamError
+from core.parsers.governor import UpstreamGovernor, upstream_governor
+from core.tracing import span, start_span
+
+logger = logging.getLogger(__name__)
+
+# Ответы, после которых имеет смысл повторить запрос
+_RETRYABLE_STATUSES = frozenset({429, 500, 502, 503, 504})
+_LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+UPSTREAM_ATTEMPT_SECONDS = registry.histogram(
+    "carting_upstream_attempt_seconds",
+    "Длительность попытки загрузки с kartchrono по парсеру и исходу",
+    ["parser", "outcome"],
+    buckets=_LATENCY_BUCKETS,
+)
+UPSTREAM_RESPONSES = registry.counter(
+    "carting_upstream_responses_total",
+    "Ответы kartchrono по парсеру и HTTP-статусу",
+    ["parser", "status"],
+)
+UPSTREAM_BYTES = registry.counter(
+    "carting_upstream_bytes_total",
+    "Скачано байт с kartchrono по парсеру",
+    ["parser"],
+)
+UPSTREAM_REQUESTS = registry.counter(
+    "carting_upstream_requests_total",
+    "Загрузки страниц (с учётом повторов) по парсеру и результату",
+    ["parser", "result"],
+)
+UPSTREAM_RETRIES = registry.counter(
+    "carting_upstream_retries_total",
+    "Повторные попытки загрузки по парсеру",
+    ["parser"],
+)
+UPSTREAM_QUEUE_WAIT_SECONDS = registry.histogram(
+    "carting_upstream_queue_wait_seconds",
+    "Ожидание очереди к kartchrono перед попыткой по парсеру",
+    ["parser"],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+# Чем закончилась загрузка: успехом или отказом (остальные исходы — неудачи)
+_SUCCESS_RESULTS = frozenset({"ok", "not_modified"})
+
+_source: ContextVar[str] = ContextVar("upstream_source", default="other")
+
+
+@contextmanager
+def upstream_source(name: str):
+    """Подписывает метрики загрузок внутри блока именем парсера."""
+    token = _source.set(name)
+    try:
+        yield
+    finally:
+        _source.reset(token)
+
+
+class _RetryableError(Exception):
+    """Сбой попытки, который можно повторить."""
+
+
+@dataclass
+class Validators:
+    """Валидаторы ответа для условного запроса."""
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    content_hash: Optional[str] = None
+
+    def headers(self) -> Dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+@dataclass
+class FetchResult:
+    """Ответ сайта. Если not_modified, text может быть None (ответ 304)."""
+    text: Optional[str]
+    validators: Validators
+    not_modified: bool = False
+    size: int = 0
+
+
+class RetryBudget:
+    """Бюджет повторов: каждый новый запрос добавляет ratio токена,
+    каждый повтор тратит один токен. Не даёт повторам превысить
+    заданную долю от основного трафика во время длительных сбоев."""
+
+    def __init__(self, ratio: float = PARSER_RETRY_BUDGET_RATIO, max_tokens: float = 10):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+
+    def deposit(self) -> None:
+        self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def try_withdraw(self) -> bool:
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class CircuitBreaker:
+    """Предохранитель: closed → open после failure_threshold сбоев подряд,
+    через reset_seconds пропускает одну пробную загрузку (half_open)."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        failure_threshold: int = PARSER_BREAKER_FAILURE_THRESHOLD,
+        reset_seconds: float = PARSER_BREAKER_RESET_SECONDS,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.opened_total = 0
+        self._probe_in_flight = False
+
+    def allow(self) -> bool:
+        """Можно ли сейчас обращаться к сайту."""
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN and monotonic() - self.opened_at >= self.reset_seconds:
+            self.state = self.HALF_OPEN
+            self._probe_in_flight = False
+        if self.state == self.HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        return False
+
+    def release_probe(self) -> None:
+        """Пробная загрузка прервана без результата (например, отменена)."""
+        self._probe_in_flight = False
+
+    def record_success(self) -> None:
+        if self.state != self.CLOSED:
+            logger.info("Сайт kartchrono снова отвечает, предохранитель закрыт")
+        self.state = self.CLOSED
+        self.failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                logger.warning(
+                    f"Сайт kartchrono недоступен ({self.failures} сбоев подряд), "
+                    f"запросы приостановлены на {self.reset_seconds:g} с"
+                )
+                self.opened_total += 1
+            self.state = self.OPEN
+            self.opened_at = monotonic()
+            self._probe_in_flight = False
+
+
+class UpstreamFetcher:
+    """Загружает страницы с таймаутами, повторами и предохранителем."""
+
+    def __init__(
+        self,
+        attempt_timeout: float = PARSER_ATTEMPT_TIMEOUT,
+        total_timeout: float = PARSER_TIMEOUT,
+        max_retries: int = PARSER_MAX_RETRIES,
+        backoff_base: float = PARSER_BACKOFF_BASE_SECONDS,
+        backoff_max: float = PARSER_BACKOFF_MAX_SECONDS,
+        budget: Optional[RetryBudget] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        governor: UpstreamGovernor = upstream_governor,
+    ):
+        self.attempt_timeout = attempt_timeout
+        self.total_timeout = total_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.budget = budget or RetryBudget()
+        self.breaker = breaker or CircuitBreaker()
+        self.governor = governor
+
+    async def fetch_text(self, url: str) -> str:
+        """Возвращает текст страницы или выбрасывает UpstreamError."""
+        return (await self.fetch(url)).text
+
+    async def fetch(self, url: str, validators: Optional[Validators] = None) -> FetchResult:
+        """Загружает страницу; с валидаторами — условным запросом.
+
+        Выбрасывает UpstreamError, если страницу получить не удалось.
+        """
+        with span("upstream.fetch", url=url, parser=_source.get()) as fetch_span:
+            result = await self._fetch(url, validators)
+            fetch_span.set("bytes", result.size)
+            fetch_span.set("not_modified", result.not_modified)
+            return result
+
+    async def _fetch(self, url: str, validators: Optional[Validators]) -> FetchResult:
+        source = _source.get()
+        self.budget.deposit()
+        deadline = monotonic() + self.total_timeout
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                UPSTREAM_REQUESTS.labels(source, "rejected").inc()
+                raise UpstreamError("Сайт kartchrono временно недоступен")
+
+            try:
+                await self._wait_for_slot(deadline)
+            except UpstreamError:
+                UPSTREAM_REQUESTS.labels(source, "queue_timeout").inc()
+                raise
+            remaining = deadline - monotonic()
+            started = monotonic()
+            attempt_span = start_span("upstream.attempt", attempt=attempt)
+            try:
+                try:
+                    result = await asyncio.wait_for(
+                        self._attempt(url, validators),
+                        timeout=max(0.0, min(self.attempt_timeout, remaining)),
+                    )
+                finally:
+                    self.governor.release()
+                    if attempt_span is not None:
+                        attempt_span.finish()
+            except asyncio.CancelledError:
+                self.breaker.release_probe()
+                raise
+            except asyncio.TimeoutError:
+                outcome = "timeout"
+                error = f"превышено время ожидания ответа ({url})"
+            except _RetryableError as e:
+                outcome = "retryable"
+                error = str(e)
+            except aiohttp.ClientResponseError as e:
+                if attempt_span is not None:
+                    attempt_span.fail(e)
+                # 4xx, кроме 429, повторять бесполезно, и сайт при этом жив
+                UPSTREAM_ATTEMPT_SECONDS.labels(source, "http_error").observe(monotonic() - started)
+                UPSTREAM_REQUESTS.labels(source, "failed").inc()
+                self.breaker.record_success()
+                raise UpstreamError(f"Ошибка загрузки страницы: HTTP {e.status} ({url})")
+            except aiohttp.ClientError as e:
+                outcome = "network"
+                error = str(e)
+            else:
+                elapsed = monotonic() - started
+                outcome = "not_modified" if result.not_modified else "ok"
+                if attempt_span is not None:
+                    attempt_span.set("outcome", outcome)
+                UPSTREAM_ATTEMPT_SECONDS.labels(source, outcome).observe(elapsed)
+                UPSTREAM_REQUESTS.labels(source, outcome).inc()
+                UPSTREAM_BYTES.labels(source).inc(result.size)
+                self.breaker.record_success()
+                return result
+
+            elapsed = monotonic() - started
+            UPSTREAM_ATTEMPT_SECONDS.labels(source, outcome).observe(elapsed)
+            if attempt_span is not None:
+                attempt_span.set("outcome", outcome)
+                attempt_span.fail(error)
+            self.breaker.record_failure()
+            delay = self._backoff(attempt)
+            if attempt >= self.max_retries or monotonic() + delay >= deadline:
+                UPSTREAM_REQUESTS.labels(source, "failed").inc()
+                raise UpstreamError(f"Ошибка загрузки страницы: {error}")
+            if not self.budget.try_withdraw():
+                UPSTREAM_REQUESTS.labels(source, "budget_exhausted").inc()
+                raise UpstreamError(f"Ошибка загрузки страницы: {error}")
+
+            attempt += 1
+            UPSTREAM_RETRIES.labels(source).inc()
+            logger.info(f"Повтор загрузки {url} через {delay:.2f} с ({error})")
+            await asyncio.sleep(delay)
+
+    async def _wait_for_slot(self, deadline: float) -> None:
+        """Ждёт очереди к сайту, не дольше общего дедлайна загрузки."""
+        started = monotonic()
+        queue_span = start_span("upstream.queue")
+        try:
+            await asyncio.wait_for(
+                self.governor.acquire(), timeout=max(0.0, deadline - started)
+            )
+        except asyncio.TimeoutError:
+            # Сайт тут ни при чём — предохранитель не трогаем
+            self.breaker.release_probe()
+            raise UpstreamError("Превышено время ожидания очереди запросов к kartchrono")
+        except asyncio.CancelledError:
+            self.breaker.release_probe()
+            raise
+        finally:
+            UPSTREAM_QUEUE_WAIT_SECONDS.labels(_source.get()).observe(monotonic() - started)
+            if queue_span is not None:
+                queue_span.finish()
+
+    def _backoff(self, attempt: int) -> float:
+        """Экспоненциальная задержка с полным случайным разбросом."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    async def _attempt(self, url: str, validators: Optional[Validators]) -> FetchResult:
+        headers = validators.headers() if validators else None
+        async with aiohttp.ClientSession() as session:
+            async with session.get(url, headers=headers) as response:
+                UPSTREAM_RESPONSES.labels(_source.get(), str(response.status)).inc()
+                if response.status in _RETRYABLE_STATUSES:
+                    raise _RetryableError(f"HTTP {response.status} ({url})")
+                if response.status == 304 and validators is not None:
+                    return FetchResult(text=None, validators=validators, not_modified=True)
+                response.raise_for_status()
+                body = await response.read()
+                text = body.decode(response.get_encoding())
+                fresh = Validators(
+                    etag=response.headers.get("ETag"),
+                    last_modified=response.headers.get("Last-Modified"),
+                    content_hash=hashlib.sha256(body).hexdigest(),
+                )
+        unchanged = validators is not None and validators.content_hash == fresh.content_hash
+        return FetchResult(text=text, validators=fresh, not_modified=unchanged, size=len(body))
+
+    def state(self) -> dict:
+        """Состояние предохранителя и очереди этого загрузчика."""
+        return {
+            "breaker": {
+                "state": self.breaker.state,
+                "consecutive_failures": self.breaker.failures,
+                "opened_total": self.breaker.opened_total,
+            },
+            "governor": {"in_use": self.governor.in_use, "queued": self.governor.queued},
+        }
+
+    def metric_families(self):
+        """Состояние предохранителя, бюджета и очереди для выгрузки метрик."""
+        breaker = self.breaker
+        return [
+            ("carting_upstream_breaker_open", "gauge", "1, если запросы к kartchrono приостановлены",
+             [({}, 0 if breaker.state == CircuitBreaker.CLOSED else 1)]),
+            ("carting_upstream_breaker_opened_total", "counter", "Сколько раз срабатывал предохранитель",
+             [({}, breaker.opened_total)]),
+            ("carting_upstream_retry_budget_tokens", "gauge", "Остаток бюджета повторов",
+             [({}, self.budget.tokens)]),
+            ("carting_upstream_in_flight", "gauge", "Запросов к kartchrono выполняется",
+             [({}, self.governor.in_use)]),
+            ("carting_upstream_queued", "gauge", "Запросов ждут очереди к kartchrono",
+             [({}, self.governor.queued)]),
+        ]
+
+
+def upstream_snapshot() -> dict:
+    """Сводка загрузок процесса по метрикам carting_upstream_* (все загрузчики вместе)."""
+    results: Dict[str, int] = {}
+    for labels, child in UPSTREAM_REQUESTS.series():
+        results[labels["result"]] = results.get(labels["result"], 0) + int(child.value)
+    counts = [0] * (len(_LATENCY_BUCKETS) + 1)
+    latency_sum = 0.0
+    timeouts = 0
+    for labels, child in UPSTREAM_ATTEMPT_SECONDS.series():
+        counts = [total + n for total, n in zip(counts, child.counts)]
+        latency_sum += child.sum
+        if labels["outcome"] == "timeout":
+            timeouts += child.count
+    cumulative = [sum(counts[:i + 1]) for i in range(len(_LATENCY_BUCKETS))]
+    return {
+        "requests": sum(results.values()),
+        "attempts": sum(counts),
+        "retries": int(sum(child.value for _, child in UPSTREAM_RETRIES.series())),
+        "successes": sum(n for result, n in results.items() if result in _SUCCESS_RESULTS),
+        "failures": sum(
+            n for result, n in results.items() if result not in _SUCCESS_RESULTS and result != "rejected"
+        ),
+        "timeouts": timeouts,
+        "rejected": results.get("rejected", 0),
+        "budget_exhausted": results.get("budget_exhausted", 0),
+        "queue_timeouts": results.get("queue_timeout", 0),
+        "queue_wait_seconds": round(sum(child.sum for _, child in UPSTREAM_QUEUE_WAIT_SECONDS.series()), 6),
+        "not_modified": results.get("not_modified", 0),
+        "bytes_downloaded": int(sum(child.value for _, child in UPSTREAM_BYTES.series())),
+        "latency_seconds": {
+            "sum": round(latency_sum, 6),
+            "count": sum(counts),
+            "buckets": {str(bound): n for bound, n in zip(_LATENCY_BUCKETS, cumulative)},
+        },
+    }
+
+
+upstream_fetcher = UpstreamFetcher()
+registry.add_collector(upstream_fetcher.metric_families)
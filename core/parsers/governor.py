@@ -0,0 +1,290 @@
+"""
+Ограничение нагрузки на kartchrono: число одновременных запросов и их темп.
+
+Все загрузки через UpstreamFetcher проходят через один UpstreamGovernor.
+Он выдаёт разрешения по приоритету: интерактивные запросы пользователя
+обгоняют предзагрузку и фоновые выгрузки, стоящие в той же очереди.
+
+Лимит одновременных запросов действует в пределах процесса, а темп
+(token bucket) по умолчанию хранится в маленьком SQLite-файле рядом с базой
+и поэтому общий для API, его воркеров и бота.
+"""
+import asyncio
+import heapq
+import itertools
+import sqlite3
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from pathlib import Path
+from typing import List, Optional, Set
+
+from core.config.config import (
+    UPSTREAM_BURST,
+    UPSTREAM_MAX_CONCURRENCY,
+    UPSTREAM_RATE_LIMIT_PATH,
+    UPSTREAM_RATE_PER_SECOND,
+)
+
+
+class Priority(IntEnum):
+    """Чем меньше значение, тем раньше запрос получит разрешение."""
+    INTERACTIVE = 0
+    PREFETCH = 1
+    BACKGROUND = 2
+
+
+_priority: ContextVar[Priority] = ContextVar("upstream_priority", default=Priority.INTERACTIVE)
+
+
+def current_priority() -> Priority:
+    return _priority.get()
+
+
+@contextmanager
+def upstream_priority(priority: Priority):
+    """Задаёт приоритет всех загрузок внутри блока (и порождённых в нём задач)."""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class TokenBucket:
+    """Token bucket в памяти процесса."""
+
+    def __init__(self, rate: float = UPSTREAM_RATE_PER_SECOND, burst: float = UPSTREAM_BURST):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated_at = time.monotonic()
+
+    def _take(self, tokens: float, updated_at: float, now: float):
+        tokens = min(self.burst, tokens + (now - updated_at) * self.rate)
+        if tokens >= 1:
+            return tokens - 1, 0.0
+        return tokens, (1 - tokens) / self.rate
+
+    def _give_back(self, tokens: float, updated_at: float, now: float) -> float:
+        return min(self.burst, tokens + (now - updated_at) * self.rate + 1)
+
+    async def reserve(self) -> float:
+        """Забирает токен и возвращает 0 или сообщает, сколько ждать до следующего."""
+        if self.rate <= 0:
+            return 0.0
+        now = time.monotonic()
+        self._tokens, wait = self._take(self._tokens, self._updated_at, now)
+        self._updated_at = now
+        return wait
+
+    async def refund(self) -> None:
+        """Возвращает токен, взятый для запроса, который так и не ушёл."""
+        if self.rate <= 0:
+            return
+        now = time.monotonic()
+        self._tokens = self._give_back(self._tokens, self._updated_at, now)
+        self._updated_at = now
+
+
+class SharedTokenBucket(TokenBucket):
+    """Token bucket, состояние которого хранится в SQLite и общее для процессов."""
+
+    def __init__(
+        self,
+        path: Path,
+        rate: float = UPSTREAM_RATE_PER_SECOND,
+        burst: float = UPSTREAM_BURST,
+    ):
+        super().__init__(rate, burst)
+        self.path = Path(path)
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _get_conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(
+                self.path, timeout=1.0, isolation_level=None, check_same_thread=False
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS upstream_bucket (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    tokens REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+            self._conn = conn
+        return self._conn
+
+    def _reserve_sync(self) -> float:
+        conn = self._get_conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT tokens, updated_at FROM upstream_bucket WHERE id = 1"
+            ).fetchone()
+            tokens, updated_at = row if row else (self.burst, now)
+            tokens, wait = self._take(tokens, min(updated_at, now), now)
+            conn.execute(
+                "INSERT OR REPLACE INTO upstream_bucket (id, tokens, updated_at) VALUES (1, ?, ?)",
+                (tokens, now),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return wait
+
+    def _refund_sync(self) -> None:
+        conn = self._get_conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT tokens, updated_at FROM upstream_bucket WHERE id = 1"
+            ).fetchone()
+            if row is not None:
+                tokens = self._give_back(row[0], min(row[1], now), now)
+                conn.execute(
+                    "UPDATE upstream_bucket SET tokens = ?, updated_at = ? WHERE id = 1",
+                    (tokens, now),
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    async def reserve(self) -> float:
+        if self.rate <= 0:
+            return 0.0
+        try:
+            return await asyncio.to_thread(self._reserve_sync)
+        except sqlite3.Error:
+            # Файл недоступен — не блокируем загрузки, а ограничиваем темп локально
+            return await super().reserve()
+
+    async def refund(self) -> None:
+        if self.rate <= 0:
+            return
+        try:
+            await asyncio.to_thread(self._refund_sync)
+        except sqlite3.Error:
+            await super().refund()
+
+
+class UpstreamGovernor:
+    """Приоритетная очередь разрешений на запрос к сайту."""
+
+    def __init__(
+        self,
+        max_concurrency: int = UPSTREAM_MAX_CONCURRENCY,
+        bucket: Optional[TokenBucket] = None,
+    ):
+        self.max_concurrency = max_concurrency
+        self.bucket = bucket or TokenBucket()
+        self._seq = itertools.count()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._reset()
+
+    def _reset(self) -> None:
+        self._refunds: Set[asyncio.Task] = set()
+        self._waiters: List[list] = []
+        self._in_use = 0
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Future] = None
+
+    def _bind_loop(self) -> asyncio.AbstractEventLoop:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Новый цикл событий (например, в тестах) — старые ожидания мертвы
+            self._loop = loop
+            self._reset()
+        return loop
+
+    @property
+    def queued(self) -> int:
+        return sum(1 for entry in self._waiters if not entry[2].done())
+
+    @property
+    def in_use(self) -> int:
+        return self._in_use
+
+    async def acquire(self, priority: Optional[Priority] = None) -> None:
+        """Ждёт разрешения на один запрос к сайту."""
+        loop = self._bind_loop()
+        if priority is None:
+            priority = current_priority()
+        future = loop.create_future()
+        heapq.heappush(self._waiters, [int(priority), next(self._seq), future])
+        self._wake()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Разрешение уже выдано, но вызывающий отменён — вернуть его
+                # и токен темпа, взятый под этот запрос
+                self.release()
+                self._refund()
+            raise
+
+    def _refund(self) -> None:
+        task = self._loop.create_task(self.bucket.refund())
+        self._refunds.add(task)
+        task.add_done_callback(self._refunds.discard)
+
+    def release(self) -> None:
+        self._in_use = max(0, self._in_use - 1)
+        self._wake()
+
+    @asynccontextmanager
+    async def slot(self, priority: Optional[Priority] = None):
+        await self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def _wake(self) -> None:
+        if self._wakeup is not None and not self._wakeup.done():
+            self._wakeup.set_result(None)
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = self._loop.create_task(self._dispatch())
+
+    def _head(self) -> Optional[list]:
+        while self._waiters and self._waiters[0][2].done():
+            heapq.heappop(self._waiters)
+        return self._waiters[0] if self._waiters else None
+
+    async def _dispatch(self) -> None:
+        while self._head() is not None:
+            if self._in_use >= self.max_concurrency:
+                self._wakeup = self._loop.create_future()
+                await self._wakeup
+                continue
+            wait = await self.bucket.reserve()
+            if wait > 0:
+                # Пока ждём токен, в очередь может встать более срочный запрос
+                await asyncio.sleep(wait)
+                continue
+            head = self._head()
+            if head is None:
+                # Ожидающие отменились, пока брали токен
+                await self.bucket.refund()
+                break
+            heapq.heappop(self._waiters)
+            self._in_use += 1
+            head[2].set_result(None)
+        self._wakeup = None
+
+
+def _default_bucket() -> TokenBucket:
+    if UPSTREAM_RATE_LIMIT_PATH:
+        return SharedTokenBucket(Path(UPSTREAM_RATE_LIMIT_PATH))
+    return TokenBucket()
+
+
+upstream_governor = UpstreamGovernor(bucket=_default_bucket())
@@ -1,32 +1,96 @@
 import logging
 import aiohttp
-from bs4 import BeautifulSoup
 from datetime import datetime
-from typing import List, Optional, Tuple
-from core.models.models import Race, DayRaces, Cart, ParsingError, Competitor, LapData
+from typing import Awaitable, Callable, List, Optional, Tuple
+from core.models.models import (
+    Race, DayRaces, Cart, ParsingError, Competitor, LapTable, RacePage, UpstreamError,
+)
+from core.cache import SharedCache, shared_cache
+from core.config.config import ARCHIVE_FULL_PARSE_EVERY, ARCHIVE_SHARED_TTL_SECONDS, KARTCHRONO_BASE_URL
+from core.parsers.archive_page import ArchiveItem, scan_archive
+from core.parsers.cache import RaceCache, race_cache
+from core.parsers.events import NewRacesFeed, new_races_feed
+from core.parsers.executor import ParseExecutor, parse_executor
+from core.parsers.fetch import UpstreamFetcher, Validators, upstream_fetcher, upstream_source
+from core.parsers.race_page import extract_js_competitors, scan_race_page
+from core.timing import format_ms
+from core.tracing import span
 import json
-import re
 import base64
 import struct
 
 logger = logging.getLogger(__name__)
 
+# Запись круга в binary_laps: номер круга, секторы 1–3, время круга, сектор 4
+_LAP_RECORD = struct.Struct('<8xi8x4i12xi')
+
 
 class ArchiveParser:
     """Парсер архива заездов"""
 
-    def __init__(self):
-        self.url_string = "https://mayak.kartchrono.com/archive/"
+    def __init__(
+        self,
+        fetcher: UpstreamFetcher = upstream_fetcher,
+        feed: Optional[NewRacesFeed] = new_races_feed,
+        incremental: bool = True,
+        full_parse_every: int = ARCHIVE_FULL_PARSE_EVERY,
+        base_url: str = KARTCHRONO_BASE_URL,
+        shared: Optional[SharedCache] = shared_cache,
+        shared_ttl: float = ARCHIVE_SHARED_TTL_SECONDS,
+    ):
+        self.url_string = base_url
+        self.fetcher = fetcher
+        self.feed = feed
+        self.incremental = incremental
+        self.full_parse_every = full_parse_every
+        self.shared = shared
+        self.shared_ttl = shared_ttl
+        self._last_days: Optional[List[DayRaces]] = None
+        self._validators: Optional[Validators] = None
+        self._incremental_runs = 0
+        self._shared_stamp: Optional[float] = None
 
     async def parse(self) -> List[DayRaces]:
-        """Парсит главную страницу архива"""
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(self.url_string) as response:
-                    response.raise_for_status()
-                    html = await response.text()
+        """Парсит главную страницу архива.
 
-            return self._parse_html(html)
+        Страница перезапрашивается условным запросом: если архив не менялся,
+        возвращается ранее разобранный список без повторного парсинга.
+        Иначе разбирается только верх страницы до первого известного заезда.
+        Если сайт недоступен, возвращается последний успешно разобранный архив.
+
+        С общим кэшем архив, обновлённый другим процессом не раньше чем
+        shared_ttl секунд назад, берётся оттуда без запроса к сайту.
+        """
+        try:
+            if self.shared is not None:
+                entry = await self.shared.aget("archive", self.url_string)
+                if entry is not None and entry.fresh:
+                    return self._adopt_shared(entry)
+            validators = self._validators if self._last_days is not None else None
+            with upstream_source(type(self).__name__):
+                result = await self.fetcher.fetch(self.url_string, validators)
+            if result.not_modified and self._last_days is not None:
+                self._validators = result.validators
+                await self._share()
+                return self._last_days
+            with span("parse.archive", chars=len(result.text)):
+                days, new_days = self._refresh(result.text)
+            self._last_days = days
+            self._validators = result.validators
+            if self.feed is not None and new_days:
+                self.feed.publish(new_days)
+            await self._share()
+            return days
+        except UpstreamError as e:
+            if self._last_days is None and self.shared is not None:
+                entry = self.shared.get("archive", self.url_string)
+                if entry is not None:
+                    logger.warning(f"Архив отдан из общего кэша: {e}")
+                    return self._adopt_shared(entry)
+            if self._last_days is None:
+                raise
+            logger.warning(f"Архив отдан из кэша: {e}")
+            return self._last_days
         except aiohttp.ClientError as e:
             raise ParsingError(f"Ошибка загрузки страницы: {e}")
         except ParsingError:
@@ -34,81 +98,157 @@ class ArchiveParser:
         except Exception as e:
             raise ParsingError(f"Ошибка парсинга: {e}")
 
+    async def _share(self) -> None:
+        if self.shared is None:
+            return
+        await self.shared.aput(
+            "archive", self.url_string, (self._last_days, self._validators), self.shared_ttl
+        )
+
+    def _adopt_shared(self, entry) -> List[DayRaces]:
+        """Принимает архив из общего кэша как свой последний разбор."""
+        if entry.stored_at == self._shared_stamp:
+            return self._last_days
+        days, validators = entry.value
+        previous = self._last_days
+        self._shared_stamp = entry.stored_at
+        self._last_days = days
+        self._validators = validators
+        if self.feed is not None:
+            fresh = _new_races(previous, days) if previous else days
+            if fresh:
+                self.feed.publish(fresh)
+        return days
+
+    def _refresh(self, html: str) -> Tuple[List[DayRaces], List[DayRaces]]:
+        """Возвращает новый архив и заезды, появившиеся с прошлого разбора.
+
+        Раз в full_parse_every обновлений архив разбирается целиком, чтобы
+        из него уходили дни, пропавшие с сайта.
+        """
+        previous = self._last_days
+        if (
+            self.incremental
+            and previous
+            and self._incremental_runs < self.full_parse_every
+        ):
+            merged = self._parse_incremental(html, previous)
+            if merged is not None:
+                self._incremental_runs += 1
+                return merged
+
+        self._incremental_runs = 0
+        days = self._parse_html(html)
+        if not previous:
+            return days, days
+        return days, _new_races(previous, days)
+
+    def _parse_incremental(
+        self, html: str, previous: List[DayRaces]
+    ) -> Optional[Tuple[List[DayRaces], List[DayRaces]]]:
+        """Разбирает только заезды выше уже известных.
+
+        Возвращает None, если известных заездов на странице не нашлось
+        и архив нужно разобрать целиком.
+        """
+        top = previous[0]
+        scan = scan_archive(html, stop_hrefs={race.href for race in top.races})
+        if not scan.found:
+            raise ParsingError("Не найден элемент archiveData")
+        if not scan.reached_known:
+            return None
+
+        new_days = _build_day_races(scan.items)
+        if not new_days:
+            return previous, []
+        if new_days[-1].date == top.date:
+            merged_top = DayRaces(date=top.date, races=new_days[-1].races + top.races)
+            days = new_days[:-1] + [merged_top] + previous[1:]
+        else:
+            days = new_days + previous
+        return days, new_days
+
     def _parse_html(self, html: str) -> List[DayRaces]:
         """Парсит HTML и извлекает данные о заездах"""
-        soup = BeautifulSoup(html, 'html.parser')
-        day_races = []
-
-        archive_data = soup.find(class_="archiveData")
-        if not archive_data:
+        scan = scan_archive(html)
+        if not scan.found:
             raise ParsingError("Не найден элемент archiveData")
+        return _build_day_races(scan.items)
+
+
+def _new_races(previous: List[DayRaces], days: List[DayRaces]) -> List[DayRaces]:
+    """Заезды из days, которых не было в previous, по дням."""
+    known = {race.href for day in previous for race in day.races}
+    new_days = [
+        DayRaces(date=day.date, races=[r for r in day.races if r.href not in known])
+        for day in days
+    ]
+    return [day for day in new_days if day.races]
+
+
+def _build_day_races(items: List[ArchiveItem]) -> List[DayRaces]:
+    """Собирает DayRaces из заголовков дат и заездов в порядке страницы."""
+    day_races = []
+    race_date = None
+    races = []
+
+    for kind, text, href in items:
+        if kind == "date":
+            if race_date:
+                day_races.append(DayRaces(date=race_date, races=races))
+                races = []
 
-        race_date = None
-        races = []
-
-        for element in archive_data.children:
-            if hasattr(element, 'get') and element.get('class'):
-                if 'archiveDateHeader' in element.get('class', []):
-                    if race_date:
-                        day_races.append(DayRaces(date=race_date, races=races))
-                        races = []
-
-                    date_text = element.get_text().strip()
-                    try:
-                        race_date = datetime.strptime(date_text, "%d.%m.%Y")
-                    except ValueError:
-                        logger.warning(f"Не удалось распарсить дату: {date_text}")
-                        continue
-
-                elif 'archiveDataRow' in element.get('class', []):
-                    link_element = element.find('a')
-                    if link_element:
-                        href = link_element.get('href', '')
-                        race_number_element = link_element.find()
-                        if race_number_element:
-                            race_number_element = race_number_element.find()
-                            if race_number_element:
-                                race_number = race_number_element.get_text().strip()
-                            else:
-                                race_number = link_element.get_text().strip()
-                        else:
-                            race_number = link_element.get_text().strip()
-
-                        races.append(Race(number=race_number, href=href))
-
-        if race_date and races:
-            day_races.append(DayRaces(date=race_date, races=races))
-
-        return day_races
+            try:
+                race_date = datetime.strptime(text, "%d.%m.%Y")
+            except ValueError:
+                logger.warning(f"Не удалось распарсить дату: {text}")
+                continue
+        else:
+            races.append(Race(number=text, href=href))
+
+    if race_date and races:
+        day_races.append(DayRaces(date=race_date, races=races))
+
+    return day_races
 
 
 class RaceParser:
     """Парсер результатов конкретного заезда"""
 
-    def __init__(self):
-        self.url_string = "https://mayak.kartchrono.com/archive/"
+    def __init__(
+        self,
+        cache: Optional[RaceCache] = race_cache,
+        fetcher: UpstreamFetcher = upstream_fetcher,
+        base_url: str = KARTCHRONO_BASE_URL,
+        executor: ParseExecutor = parse_executor,
+    ):
+        self.url_string = base_url
+        self.cache = cache
+        self.fetcher = fetcher
+        self.executor = executor
 
     async def parse(self, href: str) -> List[Cart]:
         """Парсит результаты конкретного заезда."""
-        carts, _ = await self._fetch_and_parse(href)
-        return carts
+        page = await self.parse_page(href)
+        return page.carts
 
-    async def parse_with_html(self, href: str) -> Tuple[List[Cart], str]:
-        """Парсит результаты и возвращает (carts, raw_html) для повторного использования."""
-        return await self._fetch_and_parse(href)
+    async def parse_page(self, href: str) -> RacePage:
+        """Возвращает разобранную страницу заезда (результаты и jsCompetitors).
 
-    async def _fetch_and_parse(self, href: str) -> Tuple[List[Cart], str]:
-        """Выполняет HTTP-запрос и парсинг; возвращает (carts, html)."""
+        Результат берётся из общего кэша заездов, если он там уже есть
+        (в том числе после фоновой предзагрузки).
+        """
+        return await _load_race_page(self.cache, href, lambda: self._fetch_page(href))
+
+    async def _fetch_page(self, href: str) -> RacePage:
+        """Выполняет HTTP-запрос и однократный разбор страницы."""
         try:
             url = self.url_string + href
             logger.info(f"Парсим URL: {url}")
 
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url) as response:
-                    response.raise_for_status()
-                    html = await response.text()
-
-            return self._parse_html(html), html
+            with upstream_source(type(self).__name__):
+                html = await self.fetcher.fetch_text(url)
+            return await self.executor.build_race_page(html)
         except aiohttp.ClientError as e:
             raise ParsingError(f"Ошибка загрузки страницы: {e}")
         except ParsingError:
@@ -118,57 +258,46 @@ class RaceParser:
 
     def _parse_html(self, html: str) -> List[Cart]:
         """Парсит HTML и извлекает результаты заезда"""
-        soup = BeautifulSoup(html, 'html.parser')
-        race_carts = []
-
-        results_table = soup.find(id="resultsTable")
-        if not results_table:
+        carts = scan_race_page(html).carts
+        if carts is None:
             raise ParsingError("Не найдена таблица с результатами")
-
-        data_rows = results_table.find_all(class_="dataRow")
-
-        for row in data_rows:
-            number_element = row.find(id="num")
-            best_lap_element = row.find(id="best_lap_time")
-            position_element = row.find(id="pos")
-
-            number = number_element.get_text().strip() if number_element else ""
-            best_lap = best_lap_element.get_text().strip() if best_lap_element else ""
-            position = position_element.get_text().strip() if position_element else ""
-
-            race_carts.append(Cart(
-                id="",
-                number=number,
-                best_lap=best_lap,
-                position=position,
-            ))
-
-        return race_carts
+        return carts
 
 
 class FullRaceInfoParser:
     """Парсер полной информации по заезду с информацией о секторах"""
 
-    def __init__(self):
-        self.url_string = "https://mayak.kartchrono.com/archive/"
+    def __init__(
+        self,
+        cache: Optional[RaceCache] = race_cache,
+        fetcher: UpstreamFetcher = upstream_fetcher,
+        base_url: str = KARTCHRONO_BASE_URL,
+        executor: ParseExecutor = parse_executor,
+    ):
+        self.url_string = base_url
+        self.cache = cache
+        self.fetcher = fetcher
+        self.executor = executor
 
     async def parse(
-        self, href: str, race_carts: List = None, html: str = None
+        self,
+        href: str,
+        race_carts: List = None,
+        html: str = None,
+        page: Optional[RacePage] = None,
     ) -> List[Competitor]:
         """Парсит полную информацию о конкурентах заезда.
 
-        Если html передан (закэширован из RaceParser), HTTP-запрос не выполняется.
+        Если передана уже разобранная страница (page) или её html, HTTP-запрос
+        не выполняется. Иначе страница берётся из общего кэша заездов.
         """
+        if page is not None:
+            return self._page_competitors(page)
         try:
-            if html is None:
-                url = self.url_string + href
-                logger.info(f"Парсим полную информацию по URL: {url}")
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(url) as response:
-                        response.raise_for_status()
-                        html = await response.text()
-
-            return self._parse_html(html, race_carts)
+            if html is not None:
+                return self._parse_html(html, race_carts)
+            page = await _load_race_page(self.cache, href, lambda: self._fetch_page(href))
+            return self._page_competitors(page)
         except aiohttp.ClientError as e:
             raise ParsingError(f"Ошибка загрузки страницы: {e}")
         except ParsingError:
@@ -176,151 +305,155 @@ class FullRaceInfoParser:
         except Exception as e:
             raise ParsingError(f"Ошибка парсинга: {e}")
 
+    async def _fetch_page(self, href: str) -> RacePage:
+        url = self.url_string + href
+        logger.info(f"Парсим полную информацию по URL: {url}")
+        with upstream_source(type(self).__name__):
+            html = await self.fetcher.fetch_text(url)
+        return await self.executor.build_race_page(html)
+
+    @staticmethod
+    def _page_competitors(page: RacePage) -> List[Competitor]:
+        if page.competitors is None:
+            raise ParsingError(page.competitors_error or "Не найдена переменная jsCompetitors")
+        return page.competitors
+
     def _parse_html(self, html: str, race_carts: List = None) -> List[Competitor]:
         """Парсит HTML и извлекает данные о конкурентах из jsCompetitors"""
-        js_competitors_data = self._extract_js_competitors(html)
-        if not js_competitors_data:
-            raise ParsingError("Не найдена переменная jsCompetitors")
+        return self._competitors_from_js(scan_race_page(html).competitors_script, race_carts)
 
+    def _competitors_from_js(
+        self, script: Optional[str], race_carts: List = None
+    ) -> List[Competitor]:
+        """Разбирает jsCompetitors из текста скрипта в список Competitor"""
         try:
-            competitors_json = json.loads(js_competitors_data)
-            return self._parse_competitors_json(competitors_json, race_carts)
+            with span("parse.extract_js", chars=len(script or "")):
+                competitors_json = extract_js_competitors(script) if script else None
         except json.JSONDecodeError as e:
             raise ParsingError(f"Ошибка парсинга JSON: {e}")
-
-    def _extract_js_competitors(self, html: str) -> Optional[str]:
-        """Извлекает данные из переменной jsCompetitors"""
-        pattern = r'var\s+jsCompetitors\s*=\s*(\{.*?\});'
-        match = re.search(pattern, html, re.DOTALL)
-        if match:
-            return match.group(1)
-
-        pattern = r'jsCompetitors\s*=\s*(\{.*?\});'
-        match = re.search(pattern, html, re.DOTALL)
-        if match:
-            return match.group(1)
-
-        return None
+        if competitors_json is None:
+            raise ParsingError("Не найдена переменная jsCompetitors")
+        return self._parse_competitors_json(competitors_json, race_carts)
 
     def _parse_competitors_json(
         self, competitors_json: dict, race_carts: List = None
     ) -> List[Competitor]:
         """Парсит JSON данные конкурентов в объекты Competitor"""
-        competitors = []
-
         best_laps_dict = {}
         if race_carts:
             for cart in race_carts:
                 best_laps_dict[cart.number] = cart.best_lap
 
+        rows = []
         for competitor_id, competitor_data in competitors_json.items():
-            num = str(competitor_data.get('num', ''))
-            name = str(competitor_data.get('name', ''))
-            pos = int(competitor_data.get('pos', 0))
-            laps = int(competitor_data.get('laps', 0))
-            theor_lap = int(competitor_data.get('theor_lap', 0))
-            binary_laps = str(competitor_data.get('binary_laps', ''))
-
-            best_lap = best_laps_dict.get(num, "")
-            theor_lap_formatted = self._format_time(theor_lap)
-            display_name = name if name.strip() else f"Карт #{num}"
-            lap_times = self._decode_binary_laps(binary_laps)
-
-            competitor = Competitor(
+            rows.append((
+                competitor_id,
+                str(competitor_data.get('num', '')),
+                str(competitor_data.get('name', '')),
+                int(competitor_data.get('pos', 0)),
+                int(competitor_data.get('laps', 0)),
+                int(competitor_data.get('theor_lap', 0)),
+                str(competitor_data.get('binary_laps', '')),
+            ))
+
+        rows.sort(key=lambda row: row[3])
+        leader_theor_lap = rows[0][5] if rows else 0
+
+        with span("parse.decode_laps", competitors=len(rows)):
+            lap_tables = [self._decode_binary_laps(row[6]) for row in rows]
+
+        competitors = []
+        for (competitor_id, num, name, pos, laps, theor_lap, binary_laps), lap_times in zip(
+            rows, lap_tables
+        ):
+            if pos == 1:
+                gap_to_leader = "Лидер"
+            else:
+                gap_to_leader = f"+{format_ms(theor_lap - leader_theor_lap)}"
+
+            competitors.append(Competitor(
                 id=competitor_id,
                 num=num,
                 name=name,
                 pos=pos,
                 laps=laps,
                 theor_lap=theor_lap,
-                best_lap=best_lap,
+                best_lap=best_laps_dict.get(num, ""),
                 binary_laps=binary_laps,
-                theor_lap_formatted=theor_lap_formatted,
-                display_name=display_name,
-                gap_to_leader=None,
+                theor_lap_formatted=format_ms(theor_lap),
+                display_name=name if name.strip() else f"Карт #{num}",
+                gap_to_leader=gap_to_leader,
                 lap_times=lap_times,
-            )
-            competitors.append(competitor)
-
-        competitors.sort(key=lambda x: x.pos)
-
-        if competitors:
-            leader_theor_lap = competitors[0].theor_lap
-            for competitor in competitors:
-                if competitor.pos == 1:
-                    competitor.gap_to_leader = "Лидер"
-                else:
-                    gap_ms = competitor.theor_lap - leader_theor_lap
-                    competitor.gap_to_leader = f"+{self._format_time(gap_ms)}"
+            ))
 
         return competitors
 
-    def _format_time(self, time_ms: int) -> str:
-        """Преобразует время из миллисекунд в формат MM:SS.sss"""
-        if time_ms <= 0:
-            return "00:00.000"
-        minutes = time_ms // 60000
-        seconds = (time_ms % 60000) // 1000
-        milliseconds = time_ms % 1000
-        return f"{minutes}:{seconds:02d}.{milliseconds:03d}"
-
-    def _decode_binary_laps(self, binary_laps: str) -> List[LapData]:
-        """Расшифровывает binary_laps и возвращает данные о кругах"""
+    def _decode_binary_laps(self, binary_laps: str) -> LapTable:
+        """Расшифровывает binary_laps в таблицу кругов.
+
+        Каждый круг — запись из 52 байт: номер круга по смещению 8,
+        секторы 1–3 по смещениям 20–28, время круга по 32, сектор 4 по 48.
+        """
         if not binary_laps:
-            return []
+            return LapTable()
 
         try:
             binary_data = base64.b64decode(binary_laps)
-            lap_times = []
-            offset = 0
-            data_length = len(binary_data)
-
-            while offset < data_length:
-                if offset + 52 > data_length:
-                    break
-
-                try:
-                    lap_num = struct.unpack('<i', binary_data[offset+8:offset+12])[0]
-
-                    sector1 = struct.unpack('<i', binary_data[offset+20:offset+24])[0]
-                    sector2 = struct.unpack('<i', binary_data[offset+24:offset+28])[0]
-                    sector3 = struct.unpack('<i', binary_data[offset+28:offset+32])[0]
-                    lap_time = struct.unpack('<i', binary_data[offset+32:offset+36])[0]
-                    sector4 = struct.unpack('<i', binary_data[offset+48:offset+52])[0]
-
-                    if lap_num == 0:
-                        lap_data = LapData(
-                            lap_number=0,
-                            lap_time="",
-                            sector1=None,
-                            sector2=self._format_time(sector2) if sector2 > 0 else None,
-                            sector3=self._format_time(sector3) if sector3 > 0 else None,
-                            sector4=self._format_time(sector4) if sector4 > 0 else None,
-                        )
-                    else:
-                        if lap_time > 0 and lap_time < 600000:
-                            final_lap_time = lap_time
-                        else:
-                            final_lap_time = sector1 + sector2 + sector3 + sector4
-                        lap_data = LapData(
-                            lap_number=lap_num,
-                            lap_time=self._format_time(final_lap_time) if final_lap_time > 0 else None,
-                            sector1=self._format_time(sector1) if sector1 > 0 else None,
-                            sector2=self._format_time(sector2) if sector2 > 0 else None,
-                            sector3=self._format_time(sector3) if sector3 > 0 else None,
-                            sector4=self._format_time(sector4) if sector4 > 0 else None,
-                        )
-
-                    lap_times.append(lap_data)
-
-                except struct.error:
-                    pass
-
-                offset += 52
-
-            lap_times.sort(key=lambda x: x.lap_number)
-            return lap_times
+            usable = len(binary_data) - len(binary_data) % _LAP_RECORD.size
+            rows = []
+            for lap_num, sector1, sector2, sector3, lap_time, sector4 in _LAP_RECORD.iter_unpack(
+                memoryview(binary_data)[:usable]
+            ):
+                if lap_num == 0:
+                    final_lap_time = 0
+                elif 0 < lap_time < 600000:
+                    final_lap_time = lap_time
+                else:
+                    final_lap_time = sector1 + sector2 + sector3 + sector4
+                rows.append((lap_num, final_lap_time, sector1, sector2, sector3, sector4))
+
+            rows.sort(key=lambda row: row[0])
+            return LapTable(rows)
 
         except Exception as e:
             logger.warning(f"Ошибка расшифровки binary_laps: {e}")
-            return []
+            return LapTable()
+
+
+_competitors_parser = FullRaceInfoParser(cache=None)
+
+
+async def _load_race_page(
+    cache: Optional[RaceCache], href: str, loader: Callable[[], Awaitable[RacePage]]
+) -> RacePage:
+    """Загружает страницу заезда через кэш; если сайт недоступен,
+    отдаёт устаревшую копию из кэша, когда она есть."""
+    if cache is None:
+        return await loader()
+    try:
+        return await cache.get_or_load(href, loader)
+    except UpstreamError as e:
+        stale = cache.get_stale(href)
+        if stale is None:
+            raise
+        logger.warning(f"Заезд {href} отдан из кэша: {e}")
+        return stale
+
+
+def build_race_page(html: str) -> RacePage:
+    """Разбирает страницу заезда за один проход для обоих парсеров.
+
+    Отсутствие или ошибка jsCompetitors не мешает получить результаты:
+    ошибка сохраняется и будет выброшена только при запросе полных данных.
+    """
+    with span("parse.scan", chars=len(html)):
+        scan = scan_race_page(html)
+    if scan.carts is None:
+        raise ParsingError("Не найдена таблица с результатами")
+    try:
+        competitors = _competitors_parser._competitors_from_js(scan.competitors_script, scan.carts)
+    except ParsingError as e:
+        return RacePage(carts=scan.carts, competitors_error=str(e))
+    except Exception as e:
+        return RacePage(carts=scan.carts, competitors_error=f"Ошибка парсинга: {e}")
+    return RacePage(carts=scan.carts, competitors=competitors)
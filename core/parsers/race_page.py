@@ -0,0 +1,176 @@
+"""
+Однопроходный разбор страницы заезда kartchrono.
+
+Вместо построения полного дерева BeautifulSoup и отдельного поиска
+jsCompetitors регулярным выражением по всему документу страница читается
+одним потоковым проходом HTMLParser: по пути собираются строки таблицы
+resultsTable и текст скрипта с переменной jsCompetitors. Сам объект
+jsCompetitors извлекается отдельно (extract_js_competitors): присваивание
+находится заранее скомпилированным шаблоном, а границы объекта определяет
+json.JSONDecoder.raw_decode, который читает только байты самого объекта.
+"""
+import json
+import re
+from dataclasses import dataclass
+from html.parser import HTMLParser
+from typing import Any, Dict, List, Optional
+
+from core.models.models import Cart
+
+_VOID_ELEMENTS = frozenset({
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "link",
+    "meta", "param", "source", "track", "wbr",
+})
+_CART_FIELDS = ("num", "best_lap_time", "pos")
+_JS_COMPETITORS_RE = re.compile(r'jsCompetitors\s*=\s*(?=\{)')
+_JSON_DECODER = json.JSONDecoder()
+
+
+@dataclass
+class RacePageScan:
+    """Сырые данные страницы заезда после одного прохода."""
+    carts: Optional[List[Cart]]
+    # Текст скрипта, в котором присваивается jsCompetitors
+    competitors_script: Optional[str]
+
+
+class _Row:
+    __slots__ = ("fields", "depth")
+
+    def __init__(self, depth: int):
+        self.fields: Dict[str, str] = {}
+        self.depth = depth
+
+
+class _RacePageScanner(HTMLParser):
+    """Повторяет семантику soup.find(id="resultsTable").find_all(class_="dataRow")
+    и row.find(id=...).get_text() без построения дерева."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.stack: List[str] = []
+        self.table_depth: Optional[int] = None
+        self.table_seen = False
+        self.rows: List[_Row] = []
+        self.open_rows: List[_Row] = []
+        # (row, field, depth, text parts) — текст собирается до закрытия элемента
+        self.captures: List[list] = []
+        self.script_depth: Optional[int] = None
+        self.script_parts: List[str] = []
+        self.competitors_script: Optional[str] = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _VOID_ELEMENTS:
+            self._start(tag, attrs, depth=len(self.stack) + 1)
+            return
+        self.stack.append(tag)
+        self._start(tag, attrs, depth=len(self.stack))
+
+    def handle_startendtag(self, tag, attrs):
+        self._start(tag, attrs, depth=len(self.stack) + 1)
+
+    def _start(self, tag, attrs, depth):
+        element_id = None
+        classes = ()
+        for name, value in attrs:
+            if name == "id":
+                element_id = value
+            elif name == "class" and value:
+                classes = value.split()
+
+        if self.table_depth is None:
+            if element_id == "resultsTable" and not self.table_seen and tag not in _VOID_ELEMENTS:
+                self.table_depth = depth
+                self.table_seen = True
+        else:
+            if element_id in _CART_FIELDS:
+                for row in self.open_rows:
+                    if element_id not in row.fields and not any(
+                        c[0] is row and c[1] == element_id for c in self.captures
+                    ):
+                        self.captures.append([row, element_id, depth, []])
+            if "dataRow" in classes:
+                row = _Row(depth)
+                self.rows.append(row)
+                if tag not in _VOID_ELEMENTS:
+                    self.open_rows.append(row)
+
+        if tag == "script" and self.competitors_script is None:
+            self.script_depth = depth
+            self.script_parts = []
+
+    def handle_endtag(self, tag):
+        if tag not in self.stack:
+            return
+        while self.stack:
+            depth = len(self.stack)
+            closed = self.stack.pop()
+            self._end(closed, depth)
+            if closed == tag:
+                break
+
+    def _end(self, tag, depth):
+        if self.captures:
+            remaining = []
+            for capture in self.captures:
+                row, field, capture_depth, parts = capture
+                if capture_depth == depth:
+                    row.fields[field] = "".join(parts)
+                else:
+                    remaining.append(capture)
+            self.captures = remaining
+        if self.open_rows and self.open_rows[-1].depth == depth:
+            self.open_rows.pop()
+        if self.table_depth == depth:
+            self.table_depth = None
+        if self.script_depth == depth:
+            self.script_depth = None
+            script = "".join(self.script_parts)
+            self.script_parts = []
+            if "jsCompetitors" in script and _JS_COMPETITORS_RE.search(script):
+                self.competitors_script = script
+
+    def handle_data(self, data):
+        for capture in self.captures:
+            capture[3].append(data)
+        if self.script_depth is not None:
+            self.script_parts.append(data)
+
+    def close(self):
+        super().close()
+        while self.stack:
+            depth = len(self.stack)
+            self._end(self.stack.pop(), depth)
+
+
+def scan_race_page(html: str) -> RacePageScan:
+    """Читает страницу заезда за один проход: строки результатов и jsCompetitors."""
+    scanner = _RacePageScanner()
+    scanner.feed(html)
+    scanner.close()
+
+    carts = None
+    if scanner.table_seen:
+        carts = [
+            Cart(
+                id="",
+                number=row.fields.get("num", "").strip(),
+                best_lap=row.fields.get("best_lap_time", "").strip(),
+                position=row.fields.get("pos", "").strip(),
+            )
+            for row in scanner.rows
+        ]
+    return RacePageScan(carts=carts, competitors_script=scanner.competitors_script)
+
+
+def extract_js_competitors(text: str) -> Optional[Dict[str, Any]]:
+    """Извлекает объект jsCompetitors из текста скрипта или страницы.
+
+    Возвращает None, если присваивания нет. Вложенные "};" внутри строк
+    JSON не обрезают объект. При битом JSON выбрасывает json.JSONDecodeError.
+    """
+    match = _JS_COMPETITORS_RE.search(text)
+    if match is None:
+        return None
+    competitors, _ = _JSON_DECODER.raw_decode(text, match.end())
+    return competitors
@@ -0,0 +1,19 @@
+"""Преобразование времени круга между миллисекундами и строками M:SS.sss."""
+
+from core.timing.timing import (
+    NO_TIME_MS,
+    format_ms,
+    format_ms_many,
+    format_ms_or_none,
+    parse_time_ms,
+    parse_time_ms_many,
+)
+
+__all__ = [
+    "NO_TIME_MS",
+    "format_ms",
+    "format_ms_many",
+    "format_ms_or_none",
+    "parse_time_ms",
+    "parse_time_ms_many",
+]
@@ -0,0 +1,30 @@
+"""Трассировка запросов: спаны в contextvars и их экспорт."""
+
+from core.tracing.exporters import JsonlExporter, OtlpHttpExporter, create_tracer, otlp_payload
+from core.tracing.tracing import (
+    NOOP_SPAN,
+    Span,
+    SpanExporter,
+    Trace,
+    Tracer,
+    current_span,
+    current_trace_id,
+    span,
+    start_span,
+)
+
+__all__ = [
+    "JsonlExporter",
+    "NOOP_SPAN",
+    "OtlpHttpExporter",
+    "Span",
+    "SpanExporter",
+    "Trace",
+    "Tracer",
+    "create_tracer",
+    "current_span",
+    "current_trace_id",
+    "otlp_payload",
+    "span",
+    "start_span",
+]
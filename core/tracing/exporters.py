@@ -0,0 +1,106 @@
+"""
+Экспортёры трасс: построчный JSONL-файл и OTLP/HTTP в формате JSON.
+
+OTLP-экспортёр шлёт POST {endpoint}/v1/traces, как ожидают OpenTelemetry
+Collector, Jaeger и Tempo; для локальной проверки подходит
+scripts/otlp_standin.py.
+"""
+import json
+import threading
+import urllib.request
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from core.tracing.tracing import STATUS_ERROR, SpanExporter, Span, Tracer
+
+
+class JsonlExporter(SpanExporter):
+    """Дописывает спаны в файл, по одному JSON-объекту на строку."""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Span]) -> None:
+        lines = "".join(
+            json.dumps(span.to_dict(), ensure_ascii=False, default=str) + "\n" for span in spans
+        )
+        with self._lock, self.path.open("a", encoding="utf-8") as f:
+            f.write(lines)
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items()]
+
+
+def otlp_payload(spans: List[Span], service_name: str) -> Dict[str, Any]:
+    """Тело запроса ExportTraceServiceRequest в JSON-кодировке OTLP."""
+    otlp_spans = []
+    for span in spans:
+        item = {
+            "traceId": span.trace_id,
+            "spanId": span.span_id,
+            "name": span.name,
+            # SPAN_KIND_SERVER у корня, SPAN_KIND_INTERNAL у остальных
+            "kind": 2 if span.parent_id is None else 1,
+            "startTimeUnixNano": str(span.start_ns),
+            "endTimeUnixNano": str(span.end_ns),
+            "attributes": _otlp_attributes(span.attributes),
+            "status": {"code": 2, "message": span.error or ""} if span.status == STATUS_ERROR else {"code": 1},
+        }
+        if span.parent_id:
+            item["parentSpanId"] = span.parent_id
+        otlp_spans.append(item)
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": _otlp_attributes({"service.name": service_name})},
+            "scopeSpans": [{"scope": {"name": "carting"}, "spans": otlp_spans}],
+        }]
+    }
+
+
+class OtlpHttpExporter(SpanExporter):
+    """Отправляет трассы коллектору OTLP/HTTP (JSON)."""
+
+    def __init__(self, endpoint: str, service_name: str, timeout: float = 5.0):
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self.service_name = service_name
+        self.timeout = timeout
+
+    def export(self, spans: List[Span]) -> None:
+        body = json.dumps(otlp_payload(spans, self.service_name), default=str).encode()
+        request = urllib.request.Request(
+            self.url, data=body, headers={"Content-Type": "application/json"}, method="POST"
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+def create_tracer(
+    exporter: str,
+    service_name: str,
+    path: str = "",
+    endpoint: str = "",
+    sample_rate: float = 0.0,
+) -> Tracer:
+    """Трассировщик по настройкам: exporter — "jsonl", "otlp" или "none"."""
+    kind = exporter.lower()
+    span_exporter: Optional[SpanExporter] = None
+    if kind == "jsonl":
+        span_exporter = JsonlExporter(path)
+    elif kind == "otlp":
+        span_exporter = OtlpHttpExporter(endpoint, service_name)
+    elif kind not in ("", "none"):
+        raise ValueError(f"Неизвестный экспортёр трасс: {exporter}")
+    return Tracer(span_exporter, sample_rate=sample_rate)
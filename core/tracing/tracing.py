@@ -0,0 +1,262 @@
+"""
+Лёгкая трассировка запросов: трасса и её спаны живут в contextvars.
+
+Трасса начинается только для выбранных запросов (заголовок X-Trace или доля
+TRACE_SAMPLE_RATE), поэтому вне трассы span() и start_span() сводятся к
+чтению contextvar. Контекст копируется в задачи asyncio и в
+asyncio.to_thread, так что спаны загрузки страницы в общем кэше и вызовов
+базы попадают в трассу запроса, который их начал. Готовая трасса уходит
+экспортёру в фоновом потоке и не задерживает ответ.
+"""
+import logging
+import queue
+import random
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+STATUS_OK = "ok"
+STATUS_ERROR = "error"
+
+_current: ContextVar[Optional["Span"]] = ContextVar("trace_span", default=None)
+
+
+class Trace:
+    """Спаны одного запроса."""
+
+    __slots__ = ("trace_id", "spans", "exported")
+
+    def __init__(self, trace_id: Optional[str] = None):
+        self.trace_id = trace_id or secrets.token_hex(16)
+        self.spans: List["Span"] = []
+        self.exported = False
+
+
+class Span:
+    """Отрезок работы внутри трассы: имя, длительность, атрибуты."""
+
+    __slots__ = (
+        "trace", "name", "span_id", "parent_id", "start_ns", "duration_ns",
+        "_started", "attributes", "status", "error",
+    )
+
+    def __init__(
+        self,
+        trace: Trace,
+        name: str,
+        parent_id: Optional[str] = None,
+        attributes: Optional[Dict[str, Any]] = None,
+    ):
+        self.trace = trace
+        self.name = name
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self._started = time.perf_counter_ns()
+        self.duration_ns: Optional[int] = None
+        self.attributes = attributes or {}
+        self.status = STATUS_OK
+        self.error: Optional[str] = None
+        trace.spans.append(self)
+
+    @property
+    def trace_id(self) -> str:
+        return self.trace.trace_id
+
+    @property
+    def end_ns(self) -> int:
+        return self.start_ns + (self.duration_ns or 0)
+
+    def set(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def fail(self, error: Union[BaseException, str]) -> None:
+        self.status = STATUS_ERROR
+        self.error = error if isinstance(error, str) else f"{type(error).__name__}: {error}"
+
+    def finish(self) -> None:
+        if self.duration_ns is None:
+            self.duration_ns = time.perf_counter_ns() - self._started
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_ns": self.start_ns,
+            "duration_ms": round((self.duration_ns or 0) / 1e6, 3),
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+class _NoopSpan:
+    """Заглушка вне трассы: вызывающему коду не нужно проверять None."""
+
+    __slots__ = ()
+
+    def set(self, key: str, value: Any) -> None:
+        pass
+
+    def fail(self, error: Union[BaseException, str]) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+def current_trace_id() -> Optional[str]:
+    span = _current.get()
+    return span.trace.trace_id if span is not None else None
+
+
+def start_span(name: str, **attributes: Any) -> Optional[Span]:
+    """Дочерний спан текущего, не делая его текущим (для листовых операций).
+
+    Вне трассы возвращает None; вызывающий сам вызывает finish().
+    """
+    parent = _current.get()
+    if parent is None:
+        return None
+    return Span(parent.trace, name, parent.span_id, attributes)
+
+
+@contextmanager
+def span(name: str, **attributes: Any):
+    """Спан вокруг блока; вложенные спаны станут его детьми."""
+    parent = _current.get()
+    if parent is None:
+        yield NOOP_SPAN
+        return
+    child = Span(parent.trace, name, parent.span_id, attributes)
+    token = _current.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.fail(e)
+        raise
+    finally:
+        _current.reset(token)
+        child.finish()
+
+
+class SpanExporter:
+    """Получатель готовых трасс. export вызывается из фонового потока."""
+
+    def export(self, spans: List[Span]) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class Tracer:
+    """Решает, трассировать ли запрос, и отдаёт готовые трассы экспортёру."""
+
+    def __init__(
+        self,
+        exporter: Optional[SpanExporter] = None,
+        sample_rate: float = 0.0,
+        max_queue: int = 1000,
+    ):
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+        self.max_queue = max_queue
+        self.dropped = 0
+        self._queue: "queue.Queue[Optional[List[Span]]]" = queue.Queue(maxsize=max_queue)
+        self._worker: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None
+
+    def should_sample(self, forced: bool = False) -> bool:
+        if self.exporter is None:
+            return False
+        return forced or (self.sample_rate > 0 and random.random() < self.sample_rate)
+
+    @contextmanager
+    def trace(
+        self,
+        name: str,
+        trace_id: Optional[str] = None,
+        parent_id: Optional[str] = None,
+        **attributes: Any,
+    ):
+        """Корневой спан новой трассы; по выходе трасса уходит на экспорт."""
+        root = Span(Trace(trace_id), name, parent_id, attributes)
+        token = _current.set(root)
+        try:
+            yield root
+        except BaseException as e:
+            root.fail(e)
+            raise
+        finally:
+            _current.reset(token)
+            root.finish()
+            self.submit(root.trace)
+
+    def submit(self, trace: Trace) -> None:
+        if self.exporter is None or trace.exported:
+            return
+        trace.exported = True
+        # Спаны фоновых задач, не успевших завершиться, в экспорт не попадают
+        spans = [span for span in trace.spans if span.duration_ns is not None]
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait(spans)
+        except queue.Full:
+            self.dropped += 1
+
+    def _ensure_worker(self) -> None:
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(
+                    target=self._run, name="trace-exporter", daemon=True
+                )
+                self._worker.start()
+
+    def _run(self) -> None:
+        while True:
+            spans = self._queue.get()
+            try:
+                if spans is None:
+                    return
+                try:
+                    self.exporter.export(spans)
+                except Exception as e:
+                    logger.warning(f"Не удалось выгрузить трассу: {e}")
+            finally:
+                self._queue.task_done()
+
+    def flush(self, timeout: float = 5.0) -> None:
+        """Ждёт, пока экспортёр выгрузит всё из очереди."""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        worker = self._worker
+        if worker is not None and worker.is_alive():
+            try:
+                self._queue.put(None, timeout=timeout)
+            except queue.Full:
+                pass
+            worker.join(timeout)
+        self._worker = None
+        if self.exporter is not None:
+            self.exporter.close()
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Генератор синтетических данных для нагрузочного тестирования базы.
+
+Заполняет SQLite-файл N пользователями × M заездами × K кругами: время кругов
+распределено как у живых заездов (разброс по уровню гонщиков, медленный
+первый круг, редкие ошибки), binary_laps — валидные записи, которые
+FullRaceInfoParser._decode_binary_laps разбирает обратно, плюс профили
+пользователей. При одинаковом --seed данные совпадают байт в байт.
+
+Запуск: python scripts/generate_load_data.py --users 2000 --races 50 --laps 14
+"""
+import argparse
+import base64
+import json
+import os
+import random
+import sqlite3
+import struct
+import sys
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import core.database.db as db
+from core.timing import format_ms
+
+DEFAULT_DB = Path(__file__).parent.parent / "data" / "load_test.db"
+RACES_PER_DAY = 25
+
+# Та же раскладка записи, что читает _decode_binary_laps: признак записи,
+# номер круга по смещению 8, секторы 1–3 с 20, время круга по 32, сектор 4 по 48
+_LAP_RECORD = struct.Struct('<i4xi8x4i12xi')
+
+# Доли секторов в круге на трассе
+_SECTOR_SHARES = (0.24, 0.26, 0.25, 0.25)
+
+# (номер круга, время круга, сектор 1, сектор 2, сектор 3, сектор 4), мс
+Lap = Tuple[int, int, int, int, int, int]
+
+_INSERT_COMPETITOR = """
+    INSERT INTO user_competitors (
+        user_id, date, race_number, race_href, competitor_id, num, name, pos, laps,
+        theor_lap, best_lap, binary_laps, theor_lap_formatted, display_name,
+        gap_to_leader, lap_times_json, best_lap_ms
+    ) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)
+"""
+
+_INSERT_PROFILE = """
+    INSERT OR REPLACE INTO user_profiles (user_id, telegram_name, telegram_username, photo_url)
+    VALUES (?, ?, ?, ?)
+"""
+
+_FIRST_NAMES = ("Алексей", "Мария", "Иван", "Ольга", "Дмитрий", "Анна", "Сергей", "Екатерина")
+_LAST_NAMES = ("Иванов", "Смирнов", "Кузнецов", "Попов", "Соколов", "Лебедев", "Новиков")
+
+
+def encode_binary_laps(laps: List[Lap]) -> str:
+    """Упаковывает круги в base64-строку в формате binary_laps kartchrono."""
+    blob = b"".join(
+        _LAP_RECORD.pack(1, lap_number, sector1, sector2, sector3, lap_time, sector4)
+        for lap_number, lap_time, sector1, sector2, sector3, sector4 in laps
+    )
+    return base64.b64encode(blob).decode("ascii")
+
+
+def generate_laps(rng: random.Random, pace_ms: int, count: int) -> List[Lap]:
+    """Круги одного гонщика в заезде.
+
+    Время круга — темп гонщика плюс логнормальный разброс; первый круг
+    с места медленнее, примерно 3% кругов испорчены разворотом или обгоном.
+    """
+    laps = []
+    for lap_number in range(1, count + 1):
+        lap_time = pace_ms + int(rng.lognormvariate(6.0, 0.6))
+        if lap_number == 1:
+            lap_time = int(lap_time * rng.uniform(1.08, 1.15))
+        elif rng.random() < 0.03:
+            lap_time = int(lap_time * rng.uniform(1.2, 1.6))
+        sectors = [int(lap_time * share * rng.uniform(0.97, 1.03)) for share in _SECTOR_SHARES[:3]]
+        sectors.append(lap_time - sum(sectors))
+        laps.append((lap_number, lap_time, *sectors))
+    return laps
+
+
+def _lap_times_json(laps: List[Lap]) -> str:
+    # Тот же вид, что сохраняет save_competitor
+    return json.dumps([
+        {
+            'lap_number': lap_number,
+            'lap_time': format_ms(lap_time),
+            'sector1': format_ms(sector1),
+            'sector2': format_ms(sector2),
+            'sector3': format_ms(sector3),
+            'sector4': format_ms(sector4),
+        }
+        for lap_number, lap_time, sector1, sector2, sector3, sector4 in laps
+    ])
+
+
+def _driver_name(user_id: int) -> str:
+    first = _FIRST_NAMES[user_id % len(_FIRST_NAMES)]
+    last = _LAST_NAMES[(user_id // len(_FIRST_NAMES)) % len(_LAST_NAMES)]
+    return f"{first} {last}"
+
+
+def generate_competitor_rows(
+    users: int,
+    races: int,
+    laps: int,
+    seed: int = 1,
+    days: int = 365,
+    end_date: Optional[date] = None,
+) -> Iterator[tuple]:
+    """Строки user_competitors в порядке столбцов _INSERT_COMPETITOR.
+
+    Заезды пользователя не повторяются: каждому достаётся M разных пар
+    (день, номер заезда) из последних days дней.
+    """
+    end_date = end_date or date.today()
+    slots = days * RACES_PER_DAY
+    if races > slots:
+        raise ValueError(f"За {days} дн. есть только {slots} заездов, а нужно {races}")
+
+    rng = random.Random(seed)
+    for user_id in range(1, users + 1):
+        pace_ms = max(38_000, int(rng.gauss(46_000, 1_800)))
+        name = _driver_name(user_id)
+        for slot in rng.sample(range(slots), races):
+            day, race_number = divmod(slot, RACES_PER_DAY)
+            race_date = (end_date - timedelta(days=day)).strftime("%d.%m.%Y")
+            race_laps = generate_laps(rng, pace_ms, laps)
+            best_ms = min(lap[1] for lap in race_laps[1:] or race_laps)
+            theor_ms = sum(min(lap[i] for lap in race_laps) for i in range(2, 6))
+            pos = rng.randint(1, 12)
+            gap_ms = 0 if pos == 1 else int((pos - 1) * rng.uniform(150, 900))
+            yield (
+                user_id,
+                race_date,
+                str(race_number + 1),
+                f"race.php?id={slot}",
+                f"{slot}-{user_id}",
+                str(rng.randint(1, 40)),
+                name,
+                pos,
+                laps,
+                theor_ms,
+                format_ms(best_ms),
+                encode_binary_laps(race_laps),
+                format_ms(theor_ms),
+                name,
+                f"+{gap_ms / 1000:.3f}",
+                _lap_times_json(race_laps),
+                best_ms,
+            )
+
+
+def generate_profile_rows(users: int, seed: int = 1) -> Iterator[tuple]:
+    """Профили пользователей: у части нет username или аватара, как в жизни."""
+    rng = random.Random(seed + 1)
+    for user_id in range(1, users + 1):
+        username = f"driver{user_id}" if rng.random() < 0.7 else None
+        photo_url = f"https://t.me/i/userpic/320/{user_id}.jpg" if rng.random() < 0.5 else None
+        yield (user_id, _driver_name(user_id), username, photo_url)
+
+
+def _batches(rows: Iterator[tuple], size: int) -> Iterator[List[tuple]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def fill_database(
+    path: Path,
+    users: int,
+    races: int,
+    laps: int,
+    seed: int = 1,
+    days: int = 365,
+    end_date: Optional[date] = None,
+    batch_size: int = 50_000,
+    verbose: bool = True,
+) -> int:
+    """Создаёт схему в path и заполняет её; возвращает число строк user_competitors."""
+    original_db_file = db.DB_FILE
+    db.DB_FILE = Path(path)
+    try:
+        db.init_db()
+    finally:
+        db.DB_FILE = original_db_file
+
+    started = time.perf_counter()
+    inserted = 0
+    conn = sqlite3.connect(path, isolation_level=None)
+    try:
+        # Данные одноразовые: долговечность записи не нужна
+        conn.execute("PRAGMA synchronous=OFF")
+        rows = generate_competitor_rows(users, races, laps, seed, days, end_date)
+        for batch in _batches(rows, batch_size):
+            conn.execute("BEGIN")
+            conn.executemany(_INSERT_COMPETITOR, batch)
+            conn.execute("COMMIT")
+            inserted += len(batch)
+            if verbose:
+                elapsed = time.perf_counter() - started
+                print(f"  {inserted:>9} строк  {elapsed:7.1f} с  {inserted / elapsed:9.0f} строк/с")
+
+        conn.execute("BEGIN")
+        conn.executemany(_INSERT_PROFILE, generate_profile_rows(users, seed))
+        conn.execute("COMMIT")
+    finally:
+        conn.close()
+
+    if verbose:
+        elapsed = time.perf_counter() - started
+        size_mb = Path(path).stat().st_size / 1024 / 1024
+        print(f"✅ {inserted} заездов и {users} профилей за {elapsed:.1f} с, файл {size_mb:.1f} МБ")
+    return inserted
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--db", type=Path, default=DEFAULT_DB, help=f"файл SQLite (по умолчанию {DEFAULT_DB})")
+    parser.add_argument("--users", type=int, default=2000, help="число пользователей")
+    parser.add_argument("--races", type=int, default=50, help="заездов на пользователя")
+    parser.add_argument("--laps", type=int, default=14, help="кругов в заезде")
+    parser.add_argument("--days", type=int, default=365, help="за сколько последних дней заезды")
+    parser.add_argument("--end-date", help="последний день в формате DD.MM.YYYY (по умолчанию сегодня)")
+    parser.add_argument("--seed", type=int, default=1, help="seed генератора")
+    parser.add_argument("--batch-size", type=int, default=50_000, help="строк в одной транзакции")
+    parser.add_argument("--reset", action="store_true", help="удалить файл перед заполнением")
+    args = parser.parse_args(argv)
+
+    end_date = datetime.strptime(args.end_date, "%d.%m.%Y").date() if args.end_date else None
+    if args.reset and args.db.exists():
+        args.db.unlink()
+
+    print(f"📦 {args.users} × {args.races} × {args.laps} (seed {args.seed}) → {args.db}")
+    try:
+        fill_database(
+            args.db, args.users, args.races, args.laps,
+            seed=args.seed, days=args.days, end_date=end_date, batch_size=args.batch_size,
+        )
+    except sqlite3.IntegrityError:
+        print("❌ В базе уже есть такие заезды — запустите с --reset или другим --seed")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Локальная замена kartchrono для офлайн-тестов и нагрузочных прогонов.
+
+Отдаёт страницу архива /archive/ и страницы заездов /archive/race.php?id=N —
+сохранённые (--archive, --race) или синтетические, с настраиваемой задержкой,
+долей ошибок и зависаний и размером страниц. Архив поддерживает ETag, как
+условные запросы UpstreamFetcher.
+
+Запуск:
+    python scripts/kartchrono_standin.py --port 8090 --latency-ms 150 --error-rate 0.05
+    KARTCHRONO_BASE_URL=http://127.0.0.1:8090/archive/ python api/main.py
+"""
+import argparse
+import asyncio
+import hashlib
+import html
+import json
+import os
+import random
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Optional
+
+from aiohttp import web
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.timing import format_ms
+from scripts.generate_load_data import encode_binary_laps, generate_laps
+
+_NAMES = ("", "", "Driver", "Alice", "Пётр Смирнов", "Команда «Ракета»", "")
+
+
+@dataclass
+class StandinOptions:
+    """Что и как отдаёт заглушка."""
+    seed: int = 1
+    days: int = 30
+    races_per_day: int = 25
+    # Каждые new_race_every секунд в сегодняшнем дне появляется ещё один заезд
+    new_race_every: float = 0.0
+    competitors: int = 12
+    laps: int = 14
+    # Дополнительная разметка в конце страницы заезда, КБ
+    padding_kb: int = 0
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+    hang_rate: float = 0.0
+    hang_seconds: float = 30.0
+    archive_html: Optional[str] = None
+    race_pages: List[str] = field(default_factory=list)
+    today: Optional[date] = None
+
+
+class KartchronoStandin:
+    """Генерирует страницы и имитирует поведение сайта."""
+
+    def __init__(self, options: StandinOptions):
+        self.options = options
+        self.rng = random.Random(options.seed)
+        self.started_at = time.monotonic()
+        self.requests = 0
+        self.errors = 0
+        self.hangs = 0
+
+    def _today(self) -> date:
+        return self.options.today or date.today()
+
+    def _races_today(self) -> int:
+        options = self.options
+        if options.new_race_every <= 0:
+            return options.races_per_day
+        grown = int((time.monotonic() - self.started_at) // options.new_race_every)
+        return min(options.races_per_day, 1 + grown)
+
+    def archive_html(self) -> str:
+        if self.options.archive_html is not None:
+            return self.options.archive_html
+        return _render_archive(
+            self._today(), self.options.days, self.options.races_per_day, self._races_today()
+        )
+
+    def race_html(self, race_id: int) -> str:
+        if self.options.race_pages:
+            return self.options.race_pages[race_id % len(self.options.race_pages)]
+        options = self.options
+        return _render_race(
+            race_id, options.seed, options.competitors, options.laps, options.padding_kb
+        )
+
+    async def _behave(self) -> None:
+        """Задержка, зависание или ошибка — как у живого сайта под нагрузкой."""
+        options = self.options
+        self.requests += 1
+        delay = options.latency_ms + self.rng.uniform(-options.jitter_ms, options.jitter_ms)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+        if self.rng.random() < options.hang_rate:
+            self.hangs += 1
+            await asyncio.sleep(options.hang_seconds)
+        if self.rng.random() < options.error_rate:
+            self.errors += 1
+            raise web.HTTPServiceUnavailable(text="standin: injected error")
+
+    async def archive(self, request: web.Request) -> web.Response:
+        await self._behave()
+        body = self.archive_html()
+        etag = '"' + hashlib.sha256(body.encode()).hexdigest()[:16] + '"'
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304, headers={"ETag": etag})
+        return web.Response(text=body, content_type="text/html", headers={"ETag": etag})
+
+    async def race(self, request: web.Request) -> web.Response:
+        await self._behave()
+        try:
+            race_id = int(request.query["id"])
+        except (KeyError, ValueError):
+            raise web.HTTPNotFound(text="standin: unknown race")
+        return web.Response(text=self.race_html(race_id), content_type="text/html")
+
+    async def stats(self, request: web.Request) -> web.Response:
+        return web.json_response({
+            "requests": self.requests,
+            "errors": self.errors,
+            "hangs": self.hangs,
+            "races_today": self._races_today(),
+        })
+
+
+STANDIN_KEY = web.AppKey("standin", KartchronoStandin)
+
+
+def create_app(options: Optional[StandinOptions] = None) -> web.Application:
+    standin = KartchronoStandin(options or StandinOptions())
+    app = web.Application()
+    app[STANDIN_KEY] = standin
+    app.router.add_get("/archive/", standin.archive)
+    app.router.add_get("/archive/race.php", standin.race)
+    app.router.add_get("/standin/stats", standin.stats)
+    return app
+
+
+def _race_id(day_index: int, race_number: int, races_per_day: int) -> int:
+    # Чем новее заезд, тем больше id, как на сайте
+    return 90_000 - day_index * races_per_day + race_number
+
+
+def _render_archive(today: date, days: int, races_per_day: int, races_today: int) -> str:
+    parts = [
+        '<!DOCTYPE html>\n<html lang="ru">\n<head><meta charset="utf-8">'
+        "<title>Mayak Karting — Архив</title></head>\n<body>\n"
+        '  <div class="archiveData">\n'
+    ]
+    for day_index in range(days):
+        count = races_today if day_index == 0 else races_per_day
+        day = today - timedelta(days=day_index)
+        parts.append(f'    <div class="archiveDateHeader"> {day.strftime("%d.%m.%Y")} </div>\n')
+        for number in range(count, 0, -1):
+            race_id = _race_id(day_index, number, races_per_day)
+            parts.append(
+                '    <div class="archiveDataRow">\n'
+                f'      <a href="race.php?id={race_id}"><div class="raceCell">'
+                f"<span>Заезд {number}</span><small>12:{number:02d}</small></div></a>\n"
+                "    </div>\n"
+            )
+    parts.append("  </div>\n</body>\n</html>\n")
+    return "".join(parts)
+
+
+@lru_cache(maxsize=512)
+def _render_race(race_id: int, seed: int, competitors: int, laps: int, padding_kb: int) -> str:
+    rng = random.Random(seed * 1_000_003 + race_id)
+    drivers = []
+    numbers = rng.sample(range(1, max(40, competitors) + 1), competitors)
+    for index, number in enumerate(numbers):
+        pace_ms = max(38_000, int(rng.gauss(46_000, 1_500)))
+        race_laps = generate_laps(rng, pace_ms, laps)
+        best_ms = min(lap[1] for lap in race_laps[1:] or race_laps)
+        theor_ms = sum(min(lap[i] for lap in race_laps) for i in range(2, 6))
+        drivers.append({
+            "id": str(race_id * 100 + index),
+            "num": str(number),
+            "name": rng.choice(_NAMES),
+            "laps": laps,
+            "theor_lap": theor_ms,
+            "best_ms": best_ms,
+            "binary_laps": encode_binary_laps(race_laps),
+        })
+    drivers.sort(key=lambda driver: driver["best_ms"])
+
+    rows = []
+    competitors_js = {}
+    for pos, driver in enumerate(drivers, 1):
+        name = html.escape(driver["name"]) or "&nbsp;"
+        rows.append(
+            f'    <div class="dataRow {"odd" if pos % 2 else "even"}" data-id="{driver["id"]}">\n'
+            f'      <div class="cell" id="pos">{pos}</div>\n'
+            f'      <div class="cell" id="num"><span>{driver["num"]}</span></div>\n'
+            f'      <div class="cell name" id="name">{name}</div>\n'
+            f'      <div class="cell" id="laps">{driver["laps"]}</div>\n'
+            f'      <div class="cell" id="best_lap_time"> {format_ms(driver["best_ms"])} </div>\n'
+            '      <div class="cell" id="gap">-</div><br>\n'
+            "    </div>\n"
+        )
+        competitors_js[driver["id"]] = {
+            "num": driver["num"],
+            "name": driver["name"],
+            "laps": driver["laps"],
+            "theor_lap": driver["theor_lap"],
+            "binary_laps": driver["binary_laps"],
+            "pos": pos,
+        }
+
+    padding = []
+    padding_size = 0
+    while padding_size < padding_kb * 1024:
+        padding.append(
+            f'<tr class="lapRow"><td>{len(padding) + 1}</td><td>{rng.random():.6f}</td></tr>\n'
+        )
+        padding_size += len(padding[-1])
+
+    return (
+        '<!DOCTYPE html>\n<html lang="ru">\n<head>\n  <meta charset="utf-8">\n'
+        "  <title>Mayak Karting — Заезд</title>\n</head>\n<body>\n"
+        '  <div class="header"><a href="/archive/">Архив</a></div>\n'
+        '  <div id="resultsTable" class="results">\n'
+        + "".join(rows)
+        + "  </div>\n  <table class=\"laps\">\n"
+        + "".join(padding)
+        + "  </table>\n  <script type=\"text/javascript\">\n"
+        + f"    var jsCompetitors = {json.dumps(competitors_js, ensure_ascii=False)};\n"
+        + "    var jsSelected = {};\n  </script>\n</body>\n</html>\n"
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Локальная замена kartchrono")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--seed", type=int, default=1, help="seed синтетических страниц и сбоев")
+    parser.add_argument("--days", type=int, default=30, help="дней в архиве")
+    parser.add_argument("--races-per-day", type=int, default=25)
+    parser.add_argument("--new-race-every", type=float, default=0.0,
+                        help="раз в столько секунд сегодня добавляется заезд (0 — все сразу)")
+    parser.add_argument("--competitors", type=int, default=12, help="гонщиков в заезде")
+    parser.add_argument("--laps", type=int, default=14, help="кругов у гонщика")
+    parser.add_argument("--padding-kb", type=int, default=0, help="добавить разметки в страницу заезда")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="задержка ответа")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="разброс задержки ±")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="доля ответов 503")
+    parser.add_argument("--hang-rate", type=float, default=0.0, help="доля зависших ответов")
+    parser.add_argument("--hang-seconds", type=float, default=30.0, help="сколько висит зависший ответ")
+    parser.add_argument("--archive", type=Path, help="сохранённая страница архива")
+    parser.add_argument("--race", type=Path, action="append", default=[],
+                        help="сохранённая страница заезда (можно несколько, по кругу)")
+    args = parser.parse_args(argv)
+
+    options = StandinOptions(
+        seed=args.seed,
+        days=args.days,
+        races_per_day=args.races_per_day,
+        new_race_every=args.new_race_every,
+        competitors=args.competitors,
+        laps=args.laps,
+        padding_kb=args.padding_kb,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        hang_rate=args.hang_rate,
+        hang_seconds=args.hang_seconds,
+        archive_html=args.archive.read_text() if args.archive else None,
+        race_pages=[path.read_text() for path in args.race],
+    )
+    print(f"🏁 kartchrono stand-in: KARTCHRONO_BASE_URL=http://{args.host}:{args.port}/archive/")
+    web.run_app(create_app(options), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
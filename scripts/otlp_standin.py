@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Локальный приёмник трасс OTLP/HTTP (JSON) вместо настоящего коллектора.
+
+Принимает POST /v1/traces от OtlpHttpExporter, печатает каждую трассу
+деревом спанов с длительностями и, если задан --out, дописывает спаны
+в JSONL. Последние трассы отдаются по GET /standin/traces.
+
+Запуск:
+    python scripts/otlp_standin.py --port 4318 --out logs/otlp_traces.jsonl
+    TRACE_EXPORTER=otlp TRACE_OTLP_ENDPOINT=http://127.0.0.1:4318 python api/main.py
+    curl -H 'X-Trace: 1' 'http://127.0.0.1:8000/api/races/full?href=race.php?id=1'
+"""
+import argparse
+import json
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from aiohttp import web
+
+
+def _attribute_value(value: dict):
+    for key in ("stringValue", "boolValue", "doubleValue"):
+        if key in value:
+            return value[key]
+    if "intValue" in value:
+        return int(value["intValue"])
+    return None
+
+
+def flatten_spans(payload: dict) -> List[dict]:
+    """Спаны из ExportTraceServiceRequest в плоском виде, как у JsonlExporter."""
+    spans = []
+    for resource_spans in payload.get("resourceSpans", []):
+        resource = {
+            item["key"]: _attribute_value(item["value"])
+            for item in resource_spans.get("resource", {}).get("attributes", [])
+        }
+        for scope_spans in resource_spans.get("scopeSpans", []):
+            for span in scope_spans.get("spans", []):
+                start = int(span["startTimeUnixNano"])
+                end = int(span["endTimeUnixNano"])
+                spans.append({
+                    "service": resource.get("service.name"),
+                    "trace_id": span["traceId"],
+                    "span_id": span["spanId"],
+                    "parent_id": span.get("parentSpanId"),
+                    "name": span["name"],
+                    "start_ns": start,
+                    "duration_ms": round((end - start) / 1e6, 3),
+                    "status": "error" if span.get("status", {}).get("code") == 2 else "ok",
+                    "attributes": {
+                        item["key"]: _attribute_value(item["value"])
+                        for item in span.get("attributes", [])
+                    },
+                })
+    return spans
+
+
+def format_tree(spans: List[dict]) -> str:
+    """Дерево спанов одной трассы по времени начала."""
+    children: Dict[Optional[str], List[dict]] = {}
+    ids = {span["span_id"] for span in spans}
+    for span in sorted(spans, key=lambda span: span["start_ns"]):
+        parent = span["parent_id"] if span["parent_id"] in ids else None
+        children.setdefault(parent, []).append(span)
+
+    lines = []
+
+    def walk(parent: Optional[str], depth: int) -> None:
+        for span in children.get(parent, []):
+            mark = " ✗" if span["status"] == "error" else ""
+            lines.append(f"{'  ' * depth}{span['name']:<{48 - 2 * depth}} {span['duration_ms']:9.3f} мс{mark}")
+            walk(span["span_id"], depth + 1)
+
+    walk(None, 0)
+    return "\n".join(lines)
+
+
+class OtlpStandin:
+    def __init__(self, out: Optional[Path] = None, keep: int = 100, quiet: bool = False):
+        self.out = out
+        self.keep = keep
+        self.quiet = quiet
+        self.traces: "OrderedDict[str, List[dict]]" = OrderedDict()
+
+    async def receive(self, request: web.Request) -> web.Response:
+        try:
+            payload = await request.json()
+        except json.JSONDecodeError:
+            raise web.HTTPBadRequest(text="standin: expected OTLP JSON")
+        spans = flatten_spans(payload)
+        by_trace: Dict[str, List[dict]] = {}
+        for span in spans:
+            by_trace.setdefault(span["trace_id"], []).append(span)
+        for trace_id, trace_spans in by_trace.items():
+            self.traces.setdefault(trace_id, []).extend(trace_spans)
+            self.traces.move_to_end(trace_id)
+            if not self.quiet:
+                print(f"🔎 {trace_id}\n{format_tree(self.traces[trace_id])}\n", flush=True)
+        while len(self.traces) > self.keep:
+            self.traces.popitem(last=False)
+        if self.out is not None and spans:
+            with self.out.open("a", encoding="utf-8") as f:
+                f.writelines(json.dumps(span, ensure_ascii=False) + "\n" for span in spans)
+        return web.json_response({"partialSuccess": {}})
+
+    async def list_traces(self, request: web.Request) -> web.Response:
+        return web.json_response([
+            {"trace_id": trace_id, "spans": spans} for trace_id, spans in reversed(self.traces.items())
+        ])
+
+
+STANDIN_KEY = web.AppKey("otlp_standin", OtlpStandin)
+
+
+def create_app(out: Optional[Path] = None, keep: int = 100, quiet: bool = False) -> web.Application:
+    standin = OtlpStandin(out, keep, quiet)
+    app = web.Application()
+    app[STANDIN_KEY] = standin
+    app.router.add_post("/v1/traces", standin.receive)
+    app.router.add_get("/standin/traces", standin.list_traces)
+    return app
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Локальный приёмник трасс OTLP/HTTP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=4318)
+    parser.add_argument("--out", type=Path, help="дописывать спаны в этот JSONL")
+    parser.add_argument("--keep", type=int, default=100, help="сколько последних трасс хранить")
+    parser.add_argument("--quiet", action="store_true", help="не печатать деревья трасс")
+    args = parser.parse_args(argv)
+
+    if args.out is not None:
+        args.out.parent.mkdir(parents=True, exist_ok=True)
+    print(f"📡 OTLP stand-in: TRACE_OTLP_ENDPOINT=http://{args.host}:{args.port}")
+    web.run_app(create_app(args.out, args.keep, args.quiet), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
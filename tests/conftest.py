@@ -1,8 +1,16 @@
+import asyncio
+import os
+
+# Тесты не должны видеть общий кэш процессов из data/ и писать в него
+os.environ.setdefault("SHARED_CACHE_PATH", "none")
+
 import pytest
 from fastapi.testclient import TestClient
 
 import core.database.db as db
 from api.main import app
+from core.parsers.fetch import FetchResult, UpstreamFetcher, Validators
+from core.parsers.governor import TokenBucket, UpstreamGovernor
 
 
 @pytest.fixture
@@ -16,3 +24,30 @@ def client(tmp_path):
             yield test_client
     finally:
         db.DB_FILE = original_db_file
+
+
+def upstream_delta(before: dict, after: dict) -> dict:
+    """Разница счётчиков двух upstream_snapshot(): метрики загрузок общие на процесс."""
+    return {key: after[key] - before[key] for key, value in after.items() if isinstance(value, (int, float))}
+
+
+class ScriptedFetcher(UpstreamFetcher):
+    """Вместо HTTP отдаёт заранее заданные исходы попыток."""
+
+    def __init__(self, outcomes, **kwargs):
+        kwargs.setdefault("backoff_base", 0)
+        kwargs.setdefault("governor", UpstreamGovernor(bucket=TokenBucket(rate=0)))
+        super().__init__(**kwargs)
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    async def _attempt(self, url, validators):
+        self.calls += 1
+        outcome = self.outcomes.pop(0)
+        if outcome == "hang":
+            await asyncio.sleep(10)
+        if isinstance(outcome, Exception):
+            raise outcome
+        if isinstance(outcome, FetchResult):
+            return outcome
+        return FetchResult(text=outcome, validators=Validators(), size=len(outcome))
@@ -0,0 +1,140 @@
+import asyncio
+from datetime import datetime
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+
+from core.models.models import DayRaces, Race
+from core.parsers.archive_page import scan_archive
+from core.parsers.events import NewRacesFeed
+from core.parsers.parsers import ArchiveParser
+
+ARCHIVE_HTML = (Path(__file__).parent / "fixtures" / "kartchrono" / "archive.html").read_text()
+
+
+def _legacy_parse(html):
+    archive_data = BeautifulSoup(html, "html.parser").find(class_="archiveData")
+    day_races, race_date, races = [], None, []
+    for element in archive_data.children:
+        if hasattr(element, "get") and element.get("class"):
+            if "archiveDateHeader" in element.get("class", []):
+                if race_date:
+                    day_races.append(DayRaces(date=race_date, races=races))
+                    races = []
+                try:
+                    race_date = datetime.strptime(element.get_text().strip(), "%d.%m.%Y")
+                except ValueError:
+                    continue
+            elif "archiveDataRow" in element.get("class", []):
+                link = element.find("a")
+                if link:
+                    first = link.find()
+                    second = first.find() if first else None
+                    number = (second or link).get_text().strip()
+                    races.append(Race(number=number, href=link.get("href", "")))
+    if race_date and races:
+        day_races.append(DayRaces(date=race_date, races=races))
+    return day_races
+
+
+def _archive(days):
+    rows = []
+    for date_text, hrefs in days:
+        rows.append(f'<div class="archiveDateHeader"> {date_text} </div>')
+        for href in hrefs:
+            rows.append(
+                f'<div class="archiveDataRow"><a href="{href}"><div><span>{href}</span></div></a></div>'
+            )
+    return f'<html><body><div class="archiveData">{"".join(rows)}</div></body></html>'
+
+
+def _parser(html_pages, **kwargs):
+    parser = ArchiveParser(**kwargs)
+    pages = iter(html_pages)
+
+    class Result:
+        def __init__(self, text):
+            self.text = text
+            self.validators = None
+            self.not_modified = False
+
+    async def fetch(url, validators=None):
+        return Result(next(pages))
+
+    parser.fetcher = type("Fetcher", (), {"fetch": staticmethod(fetch)})()
+    return parser
+
+
+def test_streaming_scan_matches_beautifulsoup_parser():
+    parser = ArchiveParser(feed=None)
+    assert parser._parse_html(ARCHIVE_HTML) == _legacy_parse(ARCHIVE_HTML)
+
+    edge = (
+        '<div class="archiveData">'
+        '<div class="archiveDateHeader"><b>01.09.2026</b></div>'
+        '<div class="archiveDataRow"><a href="r1"><img src="x">Заезд 1</a></div>'
+        '<div class="archiveDataRow"><a href="r2"><p>Заезд&nbsp;2</p><i>x</i></a></div>'
+        '<div class="archiveDataRow"><span>без ссылки</span></div>'
+        '<div class="archiveDateHeader">не дата</div>'
+        '<div class="archiveDataRow"><div><a href="r3"><div><br><span>3</span></div></a></div></div>'
+        "</div>"
+        '<div class="archiveDataRow"><a href="outside">x</a></div>'
+    )
+    assert parser._parse_html(edge) == _legacy_parse(edge)
+
+
+def test_incremental_refresh_parses_only_new_races_and_publishes_them():
+    old = _archive([("02.09.2026", ["r5", "r4"]), ("01.09.2026", ["r3", "r2", "r1"])])
+    new = _archive([
+        ("03.09.2026", ["r8"]),
+        ("02.09.2026", ["r7", "r6", "r5", "r4"]),
+        ("01.09.2026", ["r3", "r2", "r1"]),
+    ])
+    feed = NewRacesFeed()
+    published = []
+    feed.subscribe(published.append)
+    parser = _parser([old, new], feed=feed)
+
+    first = asyncio.run(parser.parse())
+    second = asyncio.run(parser.parse())
+
+    assert published == [[
+        DayRaces(date=datetime(2026, 9, 3), races=[Race(number="r8", href="r8")]),
+        DayRaces(date=datetime(2026, 9, 2), races=[
+            Race(number="r7", href="r7"), Race(number="r6", href="r6"),
+        ]),
+    ]]
+    assert second == _legacy_parse(new)
+    assert second[2] is first[1]
+    assert len(scan_archive(new, stop_hrefs={"r5", "r4"}).items) == 5
+
+
+def test_unchanged_top_keeps_the_same_list_and_full_parse_drops_old_days():
+    old = _archive([("02.09.2026", ["r5", "r4"]), ("01.09.2026", ["r3"])])
+    trimmed = _archive([("02.09.2026", ["r5", "r4"])])
+    parser = _parser([old, trimmed, trimmed], feed=None, full_parse_every=1)
+
+    first = asyncio.run(parser.parse())
+    assert asyncio.run(parser.parse()) is first
+    assert asyncio.run(parser.parse()) == _legacy_parse(trimmed)
+
+
+def test_feed_deduplicates_between_parsers_and_runs_async_listeners():
+    feed = NewRacesFeed()
+    received = []
+
+    async def listener(days):
+        received.append([race.href for day in days for race in day.races])
+
+    feed.subscribe(listener)
+    day = datetime(2026, 9, 1)
+
+    async def scenario():
+        assert feed.publish([DayRaces(date=day, races=[Race(number="1", href="r1")])]) == []
+        races = [Race(number="1", href="r1"), Race(number="2", href="r2")]
+        feed.publish([DayRaces(date=day, races=races)])
+        feed.publish([DayRaces(date=day, races=races)])
+        await asyncio.sleep(0)
+
+    asyncio.run(scenario())
+    assert received == [["r2"]]
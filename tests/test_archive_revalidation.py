@@ -0,0 +1,69 @@
+import asyncio
+from pathlib import Path
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from core.parsers.fetch import UpstreamFetcher, upstream_snapshot
+from core.parsers.governor import TokenBucket, UpstreamGovernor
+from core.parsers.parsers import ArchiveParser
+from tests.conftest import upstream_delta
+
+ARCHIVE_HTML = (Path(__file__).parent / "fixtures" / "kartchrono" / "archive.html").read_text()
+
+
+def _app(requests, with_validators):
+    async def archive(request):
+        requests.append(dict(request.headers))
+        if with_validators and request.headers.get("If-None-Match") == '"v1"':
+            return web.Response(status=304)
+        headers = {"ETag": '"v1"'} if with_validators else {}
+        return web.Response(text=ARCHIVE_HTML, content_type="text/html", headers=headers)
+
+    app = web.Application()
+    app.router.add_get("/archive/", archive)
+    return app
+
+
+def _run(with_validators):
+    requests = []
+    parses = []
+
+    async def scenario():
+        server = TestServer(_app(requests, with_validators))
+        await server.start_server()
+        try:
+            fetcher = UpstreamFetcher(governor=UpstreamGovernor(bucket=TokenBucket(rate=0)))
+            before = upstream_snapshot()
+            parser = ArchiveParser(fetcher=fetcher)
+            parser.url_string = str(server.make_url("/archive/"))
+            parse_html = parser._parse_html
+            parser._parse_html = lambda html: parses.append(1) or parse_html(html)
+            results = [await parser.parse() for _ in range(3)]
+            return results, upstream_delta(before, upstream_snapshot())
+        finally:
+            await server.close()
+
+    results, snapshot = asyncio.run(scenario())
+    return requests, parses, results, snapshot
+
+
+def test_unchanged_archive_is_revalidated_with_etag():
+    requests, parses, results, snapshot = _run(with_validators=True)
+
+    assert "If-None-Match" not in requests[0]
+    assert requests[1]["If-None-Match"] == '"v1"'
+    assert len(parses) == 1
+    assert results[0] is results[1] is results[2]
+    assert len(results[0]) == 30
+    assert snapshot["not_modified"] == 2
+    assert snapshot["bytes_downloaded"] == len(ARCHIVE_HTML.encode())
+
+
+def test_archive_without_validators_skips_parsing_by_content_hash():
+    requests, parses, results, snapshot = _run(with_validators=False)
+
+    assert len(requests) == 3
+    assert len(parses) == 1
+    assert results[0] is results[2]
+    assert snapshot["not_modified"] == 2
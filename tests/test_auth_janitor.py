@@ -0,0 +1,89 @@
+import asyncio
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
+import core.database.db as db
+from core.database.janitor import AuthJanitor
+
+
+def _at(**delta) -> str:
+    return (datetime.now(timezone.utc) + timedelta(**delta)).isoformat()
+
+
+def test_janitor_deletes_only_dead_auth_records_in_batches(client):
+    with sqlite3.connect(db.DB_FILE) as conn:
+        transactions = [
+            ("expired", _at(minutes=-1)),
+            ("expired-with-live-code", _at(minutes=-1)),
+            ("active", _at(minutes=5)),
+        ] + [(f"old-{i}", _at(days=-1)) for i in range(5)]
+        for state, expires_at in transactions:
+            conn.execute(
+                """
+                INSERT INTO mobile_telegram_login_transactions
+                    (state_hash, code_challenge_hash, created_at, expires_at, completed_at, user_id)
+                VALUES (?, 'c', ?, ?, ?, 42)
+                """,
+                (state, _at(minutes=-10), expires_at, _at(minutes=-9)),
+            )
+        ids = dict(conn.execute("SELECT state_hash, id FROM mobile_telegram_login_transactions"))
+        for code, transaction, expires_at, consumed_at in (
+            ("expired", "expired", _at(seconds=-1), None),
+            ("consumed", "active", _at(seconds=30), _at(seconds=-5)),
+            ("live", "expired-with-live-code", _at(seconds=30), None),
+        ):
+            conn.execute(
+                """
+                INSERT INTO mobile_telegram_authorization_codes
+                    (code_hash, user_id, transaction_id, created_at, expires_at, consumed_at)
+                VALUES (?, 42, ?, ?, ?, ?)
+                """,
+                (code, ids[transaction], _at(seconds=-30), expires_at, consumed_at),
+            )
+        for token, expires_at, revoked_at in (
+            ("expired", _at(days=-1), None),
+            ("revoked-long-ago", _at(days=20), _at(days=-10)),
+            ("revoked-recently", _at(days=20), _at(minutes=-1)),
+            ("active", _at(days=20), None),
+        ):
+            conn.execute(
+                "INSERT INTO mobile_refresh_sessions (token_hash, user_id, expires_at, revoked_at) "
+                "VALUES (?, 42, ?, ?)",
+                (token, expires_at, revoked_at),
+            )
+
+    deleted = asyncio.run(AuthJanitor(batch_size=2, pause=0).run_once())
+
+    assert deleted == {
+        "mobile_telegram_authorization_codes": 2,
+        "mobile_telegram_login_transactions": 6,
+        "mobile_refresh_sessions": 2,
+    }
+    with sqlite3.connect(db.DB_FILE) as conn:
+        assert sorted(r[0] for r in conn.execute("SELECT code_hash FROM mobile_telegram_authorization_codes")) == [
+            "live"
+        ]
+        assert sorted(r[0] for r in conn.execute("SELECT state_hash FROM mobile_telegram_login_transactions")) == [
+            "active", "expired-with-live-code",
+        ]
+        assert sorted(r[0] for r in conn.execute("SELECT token_hash FROM mobile_refresh_sessions")) == [
+            "active", "revoked-recently",
+        ]
+    # Повторный проход ничего не находит
+    assert asyncio.run(AuthJanitor(batch_size=2, pause=0).run_once()) == {
+        "mobile_telegram_authorization_codes": 0,
+        "mobile_telegram_login_transactions": 0,
+        "mobile_refresh_sessions": 0,
+    }
+
+
+def test_janitor_lease_is_held_by_one_worker_until_it_expires(client, monkeypatch):
+    assert db.acquire_lease("auth_janitor", "worker-a", ttl=60)
+    assert not db.acquire_lease("auth_janitor", "worker-b", ttl=60)
+    # Владелец продлевает аренду
+    assert db.acquire_lease("auth_janitor", "worker-a", ttl=60)
+
+    later = db.time.time() + 61
+    monkeypatch.setattr(db.time, "time", lambda: later)
+    assert db.acquire_lease("auth_janitor", "worker-b", ttl=60)
+    assert not db.acquire_lease("auth_janitor", "worker-a", ttl=60)
@@ -0,0 +1,107 @@
+import asyncio
+import sqlite3
+import time
+from datetime import datetime
+
+from telegram import User
+
+from bot.persistence import SQLitePersistence, decode_user_data, encode_user_data
+from core.models.models import Cart, DayRaces, Race
+
+
+def _user_data():
+    races = [Race(number="3", href="race/3"), Race(number="4", href="race/4")]
+    return {
+        "user_options": [
+            User(id=42, first_name="Alice", is_bot=False, last_name="A", username="alice")
+        ],
+        "selected_user": 42,
+        "selected_user_name": "Alice A",
+        "today_dr": DayRaces(date=datetime(2026, 8, 10), races=races),
+        "today_exists": True,
+        "other_dates": [DayRaces(date=datetime(2026, 8, 9), races=races[:1])],
+        "current_races": races,
+        "races_page": 0,
+        "current_carts": [Cart(id="", number="7", best_lap="0:45.500", position="1")],
+        "current_race_html": "<html>" + "x" * 10_000 + "</html>",
+    }
+
+
+def test_user_data_round_trip_keeps_flow_keys_and_drops_html():
+    payload = encode_user_data(_user_data())
+    restored = decode_user_data(payload)
+
+    assert "current_race_html" not in restored
+    assert len(payload) < 600
+    assert restored["current_races"] == _user_data()["current_races"]
+    assert restored["current_carts"] == _user_data()["current_carts"]
+    assert restored["today_dr"] == _user_data()["today_dr"]
+    assert restored["other_dates"] == _user_data()["other_dates"]
+    assert restored["user_options"][0].id == 42
+    assert restored["user_options"][0].full_name == "Alice A"
+    assert restored["user_options"][0].username == "alice"
+
+
+def test_state_survives_restart(tmp_path):
+    path = tmp_path / "bot_state.db"
+
+    async def write():
+        persistence = SQLitePersistence(path, conversation_timeout=600)
+        await persistence.update_user_data(42, _user_data())
+        await persistence.update_conversation("add_race", (-100, 42), 2)
+        await persistence.flush()
+
+    async def read():
+        persistence = SQLitePersistence(path, conversation_timeout=600)
+        user_data = await persistence.get_user_data()
+        conversations = await persistence.get_conversations("add_race")
+        await persistence.flush()
+        return user_data, conversations
+
+    asyncio.run(write())
+    user_data, conversations = asyncio.run(read())
+
+    assert user_data[42]["selected_user"] == 42
+    assert conversations == {(-100, 42): 2}
+
+
+def test_finished_conversation_and_cleared_user_data_are_deleted(tmp_path):
+    path = tmp_path / "bot_state.db"
+
+    async def scenario():
+        persistence = SQLitePersistence(path)
+        await persistence.update_user_data(42, _user_data())
+        await persistence.update_conversation("add_race", (1, 42), 1)
+        await persistence.update_user_data(42, {})
+        await persistence.update_conversation("add_race", (1, 42), None)
+        await persistence.flush()
+
+    asyncio.run(scenario())
+
+    with sqlite3.connect(path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM bot_user_data").fetchone() == (0,)
+        assert conn.execute("SELECT COUNT(*) FROM bot_conversations").fetchone() == (0,)
+
+
+def test_abandoned_conversations_are_reaped_on_load(tmp_path):
+    path = tmp_path / "bot_state.db"
+
+    async def write():
+        persistence = SQLitePersistence(path, conversation_timeout=60)
+        await persistence.update_user_data(42, _user_data())
+        await persistence.update_conversation("add_race", (1, 42), 3)
+        await persistence.flush()
+
+    asyncio.run(write())
+    stale = time.time() - 120
+    with sqlite3.connect(path) as conn:
+        conn.execute("UPDATE bot_user_data SET updated_at = ?", (stale,))
+        conn.execute("UPDATE bot_conversations SET updated_at = ?", (stale,))
+
+    async def read():
+        persistence = SQLitePersistence(path, conversation_timeout=60)
+        result = await persistence.get_user_data(), await persistence.get_conversations("add_race")
+        await persistence.flush()
+        return result
+
+    assert asyncio.run(read()) == ({}, {})
@@ -0,0 +1,81 @@
+import logging
+
+import pytest
+
+import core.config.config as config
+import core.database.db as db
+
+
+@pytest.fixture
+def profiler(client, monkeypatch):
+    monkeypatch.setattr(db.profiler, "threshold", 0.0)
+    db.profiler.reset()
+    yield db.profiler
+    db.profiler.reset()
+
+
+def _save(user_id, race_number):
+    db.save_competitor(
+        user_id, "10.08.2026", str(race_number), "race.php?id=1",
+        {
+            "id": "c", "num": "7", "name": "Driver", "pos": 1, "laps": 10,
+            "theor_lap": 45000, "best_lap": "0:45.100", "binary_laps": "",
+            "theor_lap_formatted": "0:45.000", "display_name": "Driver",
+            "gap_to_leader": "", "lap_times": [],
+        },
+    )
+
+
+def test_slow_calls_are_logged_with_query_plan(profiler, caplog):
+    _save(1, 1)
+    _save(1, 2)
+
+    with caplog.at_level(logging.WARNING, logger="core.database.profiling"):
+        rows = db.get_user_competitors(1)
+
+    assert len(rows) == 2
+    record = next(r for r in profiler.top(50) if r["function"] == "get_user_competitors")
+    assert record["rows"] == 2
+    assert "FROM user_competitors" in record["statements"][-1]
+    plan = record["plans"][-1]["plan"]
+    assert any("user_competitors" in step for step in plan)
+    assert "Медленный вызов get_user_competitors" in caplog.text
+
+    summary = profiler.summary()
+    assert summary["save_competitor"]["calls"] == 2
+    # save_competitor возвращает True — это не строка результата
+    assert summary["save_competitor"]["rows"] == 0
+    assert summary["get_user_competitors"]["rows"] == 2
+
+
+def test_fast_calls_are_not_recorded(client):
+    db.profiler.reset()
+
+    db.get_all_users()
+
+    assert db.profiler.top() == []
+    assert db.profiler.summary()["get_all_users"]["calls"] == 1
+
+
+def test_admin_endpoint_requires_token(client, profiler, monkeypatch):
+    db.get_all_users()
+
+    monkeypatch.setattr(config, "ADMIN_TOKEN", "")
+    assert client.get("/api/admin/db/slow").status_code == 404
+
+    monkeypatch.setattr(config, "ADMIN_TOKEN", "secret")
+    assert client.get("/api/admin/db/slow").status_code == 401
+    assert client.get(
+        "/api/admin/db/slow", headers={"Authorization": "Bearer wrong"}
+    ).status_code == 401
+
+    response = client.get(
+        "/api/admin/db/slow?limit=5", headers={"Authorization": "Bearer secret"}
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert body["slowest"][0]["function"] == "get_all_users"
+    assert body["functions"]["get_all_users"]["calls"] == 1
+
+    client.delete("/api/admin/db/slow", headers={"Authorization": "Bearer secret"})
+    assert profiler.top() == []
@@ -0,0 +1,133 @@
+import asyncio
+from datetime import datetime
+
+import aiohttp
+import pytest
+
+from core.models.models import DayRaces, Race, RacePage, UpstreamError
+from core.parsers.cache import RaceCache
+from core.parsers.fetch import (
+    CircuitBreaker,
+    RetryBudget,
+    _RetryableError,
+    upstream_snapshot,
+)
+from core.parsers.parsers import ArchiveParser, RaceParser
+from tests.conftest import ScriptedFetcher, upstream_delta
+
+
+def test_transient_failures_are_retried_until_success():
+    fetcher = ScriptedFetcher(
+        [_RetryableError("HTTP 503"), aiohttp.ClientConnectionError("reset"), "<html>"],
+        max_retries=3,
+    )
+
+    before = upstream_snapshot()
+
+    assert asyncio.run(fetcher.fetch_text("archive/")) == "<html>"
+    snapshot = upstream_snapshot()
+    delta = upstream_delta(before, snapshot)
+    assert delta["attempts"] == 3
+    assert delta["retries"] == 2
+    assert delta["successes"] == 1
+    assert delta["requests"] == 1
+    assert fetcher.state()["breaker"]["state"] == "closed"
+
+
+def test_hung_attempt_is_cut_by_attempt_timeout_and_total_deadline():
+    fetcher = ScriptedFetcher(
+        ["hang", "hang", "hang"], attempt_timeout=0.05, total_timeout=0.12, max_retries=5
+    )
+    before = upstream_snapshot()
+
+    with pytest.raises(UpstreamError, match="время ожидания"):
+        asyncio.run(fetcher.fetch_text("archive/"))
+    assert upstream_delta(before, upstream_snapshot())["timeouts"] == fetcher.calls
+    assert fetcher.calls <= 3
+
+
+def test_client_errors_are_not_retried():
+    error = aiohttp.ClientResponseError(None, (), status=404, message="Not Found")
+    fetcher = ScriptedFetcher([error])
+
+    with pytest.raises(UpstreamError, match="404"):
+        asyncio.run(fetcher.fetch_text("race.php?id=1"))
+    assert fetcher.calls == 1
+    assert fetcher.breaker.failures == 0
+
+
+def test_retry_budget_limits_retries_during_outages():
+    budget = RetryBudget(ratio=0.5, max_tokens=1)
+    fetcher = ScriptedFetcher([_RetryableError("HTTP 502")] * 10, max_retries=3, budget=budget)
+    fetcher.breaker.failure_threshold = 100
+    before = upstream_snapshot()
+
+    async def scenario():
+        for _ in range(2):
+            with pytest.raises(UpstreamError):
+                await fetcher.fetch_text("archive/")
+
+    asyncio.run(scenario())
+    delta = upstream_delta(before, upstream_snapshot())
+    assert delta["retries"] == 1
+    assert delta["budget_exhausted"] == 2
+    assert delta["failures"] == 2
+
+
+def test_open_breaker_fails_fast_and_probes_after_reset(monkeypatch):
+    import core.parsers.fetch as fetch_module
+
+    now = [0.0]
+    monkeypatch.setattr(fetch_module, "monotonic", lambda: now[0])
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=30)
+    fetcher = ScriptedFetcher(
+        [_RetryableError("HTTP 503"), _RetryableError("HTTP 503"), "<html>"],
+        max_retries=0,
+        breaker=breaker,
+    )
+    before = upstream_snapshot()
+
+    async def scenario():
+        for _ in range(2):
+            with pytest.raises(UpstreamError):
+                await fetcher.fetch_text("archive/")
+        assert breaker.state == "open"
+        with pytest.raises(UpstreamError, match="временно недоступен"):
+            await fetcher.fetch_text("archive/")
+        assert fetcher.calls == 2
+
+        now[0] = 31.0
+        return await fetcher.fetch_text("archive/")
+
+    assert asyncio.run(scenario()) == "<html>"
+    assert breaker.state == "closed"
+    assert upstream_delta(before, upstream_snapshot())["rejected"] == 1
+    assert fetcher.state()["breaker"]["opened_total"] == 1
+
+
+def test_parsers_fall_back_to_stale_data_when_site_is_down(monkeypatch):
+    import core.parsers.cache as cache_module
+
+    now = [0.0]
+    monkeypatch.setattr(cache_module, "monotonic", lambda: now[0])
+    cache = RaceCache(max_entries=4, ttl_seconds=10)
+    stale_page = RacePage(carts=[])
+    cache.put("race.php?id=1", stale_page)
+    now[0] = 20.0
+
+    down = ScriptedFetcher([_RetryableError("HTTP 503")] * 4, max_retries=1)
+    assert asyncio.run(RaceParser(cache=cache, fetcher=down).parse_page("race.php?id=1")) is stale_page
+
+    with pytest.raises(UpstreamError):
+        asyncio.run(RaceParser(cache=cache, fetcher=down).parse_page("race.php?id=2"))
+
+
+def test_archive_parser_returns_last_archive_when_site_is_down(monkeypatch):
+    fetcher = ScriptedFetcher(["<html>", _RetryableError("HTTP 503")], max_retries=0)
+    parser = ArchiveParser(fetcher=fetcher, feed=None)
+    days = [DayRaces(date=datetime(2026, 8, 28), races=[Race(number="1", href="race/1")])]
+    monkeypatch.setattr(parser, "_parse_html", lambda html: days)
+
+    assert asyncio.run(parser.parse()) == days
+    assert asyncio.run(parser.parse()) == days
+    assert fetcher.calls == 2
@@ -0,0 +1,43 @@
+import random
+import sqlite3
+
+from core.parsers.parsers import FullRaceInfoParser
+from core.timing import format_ms
+from scripts.generate_load_data import (
+    encode_binary_laps,
+    fill_database,
+    generate_competitor_rows,
+    generate_laps,
+)
+
+
+def test_binary_laps_round_trip_through_parser():
+    laps = generate_laps(random.Random(3), 45_000, 14)
+
+    decoded = FullRaceInfoParser(cache=None)._decode_binary_laps(encode_binary_laps(laps))
+
+    assert [
+        (lap.lap_number, lap.lap_time, lap.sector1, lap.sector2, lap.sector3, lap.sector4)
+        for lap in decoded
+    ] == [tuple(format_ms(v) if i else v for i, v in enumerate(lap)) for lap in laps]
+
+
+def test_rows_are_deterministic_per_seed():
+    first = list(generate_competitor_rows(3, 5, 4, seed=11))
+
+    assert first == list(generate_competitor_rows(3, 5, 4, seed=11))
+    assert first != list(generate_competitor_rows(3, 5, 4, seed=12))
+
+
+def test_fill_database_inserts_competitors_and_profiles(tmp_path):
+    path = tmp_path / "load.db"
+
+    inserted = fill_database(path, users=4, races=6, laps=3, batch_size=5, verbose=False)
+
+    with sqlite3.connect(path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM user_competitors").fetchone() == (24,)
+        assert conn.execute("SELECT COUNT(*) FROM user_profiles").fetchone() == (4,)
+        assert conn.execute(
+            "SELECT COUNT(*) FROM user_competitors WHERE best_lap_ms IS NULL"
+        ).fetchone() == (0,)
+    assert inserted == 24
@@ -0,0 +1,81 @@
+import asyncio
+from datetime import date
+
+import pytest
+from aiohttp.test_utils import TestServer
+
+from core.models.models import UpstreamError
+from core.parsers.fetch import UpstreamFetcher, upstream_snapshot
+from core.parsers.governor import TokenBucket, UpstreamGovernor
+from core.parsers.parsers import ArchiveParser, FullRaceInfoParser, RaceParser
+from scripts.kartchrono_standin import STANDIN_KEY, StandinOptions, create_app
+from tests.conftest import upstream_delta
+
+
+def _fetcher(**kwargs):
+    return UpstreamFetcher(governor=UpstreamGovernor(bucket=TokenBucket(rate=0)), **kwargs)
+
+
+def _run(options, scenario):
+    async def main():
+        app = create_app(options)
+        server = TestServer(app)
+        await server.start_server()
+        try:
+            base_url = str(server.make_url("/archive/"))
+            return await scenario(base_url), app[STANDIN_KEY]
+        finally:
+            await server.close()
+
+    return asyncio.run(main())
+
+
+def test_parsers_read_synthetic_archive_and_race_pages():
+    options = StandinOptions(today=date(2026, 8, 10), days=3, races_per_day=4, competitors=6, laps=5)
+
+    async def scenario(base_url):
+        fetcher = _fetcher()
+        days = await ArchiveParser(fetcher=fetcher, feed=None, base_url=base_url).parse()
+        href = days[0].races[0].href
+        page = await RaceParser(cache=None, fetcher=fetcher, base_url=base_url).parse_page(href)
+        competitors = await FullRaceInfoParser(cache=None, base_url=base_url).parse(href, page=page)
+        return days, page.carts, competitors
+
+    (days, carts, competitors), standin = _run(options, scenario)
+
+    assert [day.date.date() for day in days] == [
+        date(2026, 8, 10), date(2026, 8, 9), date(2026, 8, 8)
+    ]
+    assert [race.number for race in days[0].races] == ["Заезд 4", "Заезд 3", "Заезд 2", "Заезд 1"]
+    assert len(carts) == len(competitors) == 6
+    assert [len(c.lap_times) for c in competitors] == [5] * 6
+    assert competitors[0].best_lap == carts[0].best_lap
+    assert standin.requests == 2
+
+
+def test_archive_is_revalidated_with_etag():
+    async def scenario(base_url):
+        fetcher = _fetcher()
+        before = upstream_snapshot()
+        parser = ArchiveParser(fetcher=fetcher, feed=None, base_url=base_url)
+        first = await parser.parse()
+        second = await parser.parse()
+        return first is second, upstream_delta(before, upstream_snapshot())["not_modified"]
+
+    (same, not_modified), _ = _run(StandinOptions(days=2), scenario)
+
+    assert same
+    assert not_modified == 1
+
+
+def test_injected_errors_surface_as_upstream_errors():
+    options = StandinOptions(error_rate=1.0)
+
+    async def scenario(base_url):
+        fetcher = _fetcher(max_retries=1, backoff_base=0, backoff_max=0)
+        with pytest.raises(UpstreamError):
+            await RaceParser(cache=None, fetcher=fetcher, base_url=base_url).parse("race.php?id=1")
+
+    _, standin = _run(options, scenario)
+
+    assert standin.errors == standin.requests == 2
@@ -0,0 +1,192 @@
+import asyncio
+import time
+from pathlib import Path
+
+from aiohttp.test_utils import TestClient as AiohttpTestClient, TestServer
+
+from core.metrics import BlockingWatchdog, LoopLagMonitor, Registry, timed
+from core.metrics.loop import EVENT_LOOP_BLOCKED
+from core.cache import SharedCache
+from core.metrics.server import create_metrics_app
+from core.metrics.workers import WorkerMetrics
+from core.parsers.fetch import UPSTREAM_BYTES, UPSTREAM_REQUESTS, _RetryableError
+from core.parsers.parsers import ArchiveParser
+from tests.conftest import ScriptedFetcher
+
+ARCHIVE_HTML = (Path(__file__).parent / "fixtures" / "kartchrono" / "archive.html").read_text()
+
+
+def test_registry_renders_prometheus_text_format():
+    registry = Registry()
+    requests = registry.counter("app_requests_total", "Requests", ["route"])
+    in_flight = registry.gauge("app_in_flight", "In flight")
+    latency = registry.histogram("app_latency_seconds", "Latency", ["route"], buckets=(0.1, 1.0))
+    registry.add_collector(lambda: [("app_cache_entries", "gauge", "Entries", [({"cache": "race"}, 3)])])
+
+    requests.labels('/a"b').inc()
+    requests.labels('/a"b').inc(2)
+    in_flight.set(1.5)
+    for value in (0.05, 0.1, 0.5, 7):
+        latency.labels("/a").observe(value)
+
+    lines = registry.render().splitlines()
+
+    assert "# TYPE app_requests_total counter" in lines
+    assert 'app_requests_total{route="/a\\"b"} 3' in lines
+    assert "app_in_flight 1.5" in lines
+    assert 'app_latency_seconds_bucket{route="/a",le="0.1"} 2' in lines
+    assert 'app_latency_seconds_bucket{route="/a",le="1"} 3' in lines
+    assert 'app_latency_seconds_bucket{route="/a",le="+Inf"} 4' in lines
+    assert 'app_latency_seconds_count{route="/a"} 4' in lines
+    assert 'app_latency_seconds_sum{route="/a"} 7.65' in lines
+    assert 'app_cache_entries{cache="race"} 3' in lines
+
+
+def test_registry_returns_existing_metric_by_name():
+    registry = Registry()
+
+    assert registry.counter("x_total", "X") is registry.counter("x_total", "X")
+
+
+def test_timed_records_calls_including_failures():
+    registry = Registry()
+    histogram = registry.histogram("calls_seconds", "Calls", ["function"])
+
+    @timed(histogram, "work")
+    def work(fail=False):
+        if fail:
+            raise ValueError
+        return 1
+
+    work()
+    try:
+        work(fail=True)
+    except ValueError:
+        pass
+
+    assert histogram.labels("work").count == 2
+
+
+def test_api_exposes_route_templates_and_db_timings(client):
+    client.get("/api/health")
+    client.get("/api/leaderboard")
+    client.get("/api/stats/42")
+    client.get("/api/no-such-route")
+
+    response = client.get("/api/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = response.text
+    assert 'carting_http_request_seconds_count{route="/api/health",method="GET",status="200"}' in body
+    assert 'route="/api/stats/{user_id}",method="GET",status="200"' in body
+    assert 'route="unmatched",method="GET",status="404"' in body
+    assert 'carting_db_query_seconds_count{function="get_best_competitors"}' in body
+    assert 'carting_cache_hit_ratio{cache="race"}' in body
+    assert "carting_upstream_breaker_open 0" in body
+
+
+def test_worker_metrics_merge_live_workers_under_worker_label(tmp_path):
+    cache = SharedCache(tmp_path / "cache.db")
+    workers = []
+    for name, value in (("w1", 2), ("w2", 5)):
+        source = Registry()
+        source.counter("jobs_total", "Jobs", ["kind"]).labels("a").inc(value)
+        source.histogram("job_seconds", "Job time", buckets=(1.0,)).observe(0.5)
+        workers.append(WorkerMetrics(cache, source=source, interval=60, worker=name))
+    workers[1].publish()
+
+    lines = workers[0].render().splitlines()
+
+    assert lines.count("# TYPE jobs_total counter") == 1
+    assert 'jobs_total{worker="w1",kind="a"} 2' in lines
+    assert 'jobs_total{worker="w2",kind="a"} 5' in lines
+    assert 'job_seconds_count{worker="w2"} 1' in lines
+    # Снимок умершего воркера выпадает из выгрузки по сроку
+    cache.put("worker_metrics", "w2", workers[1].source.collect(), ttl=-1)
+    assert "w2" not in workers[0].render()
+
+
+def test_workers_take_the_lowest_free_slot_and_reuse_it_after_restart(tmp_path):
+    cache = SharedCache(tmp_path / "cache.db")
+    first = WorkerMetrics(cache, source=Registry(), interval=60, owner="host:100")
+    second = WorkerMetrics(cache, source=Registry(), interval=60, owner="host:101")
+    first.publish()
+    second.publish()
+    first.publish()
+
+    assert (first.worker, second.worker) == ("0", "1")
+
+    # Воркер перезапущен с новым pid: номер тот же, новых серий нет
+    first._release()
+    restarted = WorkerMetrics(cache, source=Registry(), interval=60, owner="host:102")
+    restarted.publish()
+    assert restarted.worker == "0"
+    assert set(cache.entries("worker_metrics")) == {"0", "1"}
+
+
+def test_upstream_fetches_are_labelled_by_parser_class():
+    ok = UPSTREAM_REQUESTS.labels("ArchiveParser", "ok")
+    downloaded = UPSTREAM_BYTES.labels("ArchiveParser")
+    before = ok.value, downloaded.value
+    fetcher = ScriptedFetcher([_RetryableError("HTTP 503"), ARCHIVE_HTML], max_retries=1)
+
+    asyncio.run(ArchiveParser(fetcher=fetcher, feed=None).parse())
+
+    assert ok.value == before[0] + 1
+    assert downloaded.value == before[1] + len(ARCHIVE_HTML)
+
+
+def test_loop_lag_monitor_sees_blocking_calls():
+    monitor = LoopLagMonitor(interval=0.01)
+
+    async def scenario():
+        monitor.start()
+        await asyncio.sleep(0.02)
+        time.sleep(0.1)
+        await asyncio.sleep(0.03)
+        await monitor.stop()
+
+    asyncio.run(scenario())
+
+    assert monitor.max_lag >= 0.05
+
+
+def _blocking_parse():
+    time.sleep(0.2)
+
+
+def test_blocking_watchdog_reports_the_blocking_site():
+    watchdog = BlockingWatchdog(threshold=0.05, interval=0.01)
+    site = "tests/test_metrics.py:_blocking_parse"
+    before = EVENT_LOOP_BLOCKED.labels(site).value
+
+    async def scenario():
+        watchdog.start()
+        await asyncio.sleep(0.05)
+        _blocking_parse()
+        await asyncio.sleep(0.05)
+        await watchdog.stop()
+
+    asyncio.run(scenario())
+
+    [block] = watchdog.recent()
+    assert block["site"] == site
+    assert block["duration_ms"] >= 100
+    assert any("time.sleep(0.2)" in line for line in block["stack"])
+    assert EVENT_LOOP_BLOCKED.labels(site).value == before + 1
+
+
+def test_bot_metrics_listener_serves_registry():
+    registry = Registry()
+    registry.counter("bot_updates_total", "Updates").inc()
+
+    async def scenario():
+        async with AiohttpTestClient(TestServer(create_metrics_app(registry))) as http:
+            response = await http.get("/metrics")
+            return response.status, await response.text()
+
+    status, body = asyncio.run(scenario())
+
+    assert status == 200
+    assert "bot_updates_total 1" in body
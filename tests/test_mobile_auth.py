@@ -1162,6 +1162,54 @@ def test_refresh_rotation_invalidates_predecessor_and_replacement_is_usable(pair
     assert rotate_refresh_session(replacement) is not None
 
 
+def test_refresh_rotation_updates_session_in_place_and_reports_reuse(pairing_db, caplog):
+    token = create_refresh_session(42)
+    first = rotate_refresh_session(token)[1]
+    second = rotate_refresh_session(first)[1]
+
+    with caplog.at_level(logging.WARNING, logger="core.database.db"):
+        assert rotate_refresh_session(first) is None
+        assert rotate_refresh_session(second.rsplit(".", 1)[0] + ".forged-secret") is None
+
+    assert caplog.text.count("Повторно предъявлен заменённый refresh-токен") == 1
+    with sqlite3.connect(pairing_db) as conn:
+        rows = conn.execute(
+            "SELECT current_token_hash, generation, expires_at FROM mobile_refresh_sessions"
+        ).fetchall()
+    assert len(rows) == 1
+    assert rows[0][:2] == (hashlib.sha256(second.encode()).hexdigest(), 2)
+    assert rotate_refresh_session(second) is not None
+    # expires_at moves in steps, not on every refresh
+    with sqlite3.connect(pairing_db) as conn:
+        assert conn.execute("SELECT expires_at FROM mobile_refresh_sessions").fetchone()[0] == rows[0][2]
+
+
+def test_legacy_refresh_session_joins_a_family_on_rotation(pairing_db):
+    token = "legacy-refresh-token-without-family"
+    with sqlite3.connect(pairing_db) as conn:
+        conn.execute(
+            """
+            INSERT INTO mobile_refresh_sessions (token_hash, user_id, expires_at, revoked_at)
+            VALUES (?, ?, ?, NULL)
+            """,
+            (
+                hashlib.sha256(token.encode()).hexdigest(),
+                42,
+                (datetime.now(timezone.utc) + timedelta(days=1)).isoformat(),
+            ),
+        )
+
+    user_id, replacement = rotate_refresh_session(token)
+
+    assert user_id == 42
+    assert replacement.split(".")[1] == "1"
+    assert rotate_refresh_session(token) is None
+    with sqlite3.connect(pairing_db) as conn:
+        assert conn.execute(
+            "SELECT COUNT(*), MAX(current_token_hash IS NOT NULL) FROM mobile_refresh_sessions"
+        ).fetchone() == (1, 1)
+
+
 def test_expired_refresh_session_cannot_be_rotated(pairing_db):
     token = "expired-refresh-token"
     with sqlite3.connect(pairing_db) as conn:
@@ -1237,6 +1285,43 @@ def test_bearer_dependency_rejects_missing_credentials():
     assert error.value.status_code == 401
 
 
+def test_access_token_cache_skips_repeat_decodes_but_never_caches_rejections(monkeypatch):
+    auth_tokens.clear_access_token_cache()
+    decode = jwt.decode
+    calls = []
+    monkeypatch.setattr(jwt, 'decode', lambda *args, **kwargs: calls.append(1) or decode(*args, **kwargs))
+    token = issue_access_token(42)
+
+    assert [decode_access_token(token) for _ in range(3)] == [42, 42, 42]
+    assert len(calls) == 1
+    for _ in range(2):
+        with pytest.raises(jwt.PyJWTError):
+            decode_access_token('malformed')
+    assert len(calls) == 3
+
+
+def test_cached_access_token_still_expires_and_follows_secret_rotation(monkeypatch):
+    auth_tokens.clear_access_token_cache()
+    now = datetime.now(timezone.utc)
+    expired = jwt.encode(
+        {'sub': '42', 'type': 'access', 'iat': now - timedelta(minutes=16), 'exp': now - timedelta(seconds=1)},
+        AUTH_SECRET,
+        algorithm='HS256',
+    )
+    # A cache entry that outlived the token's exp must not let it through
+    auth_tokens._remember_access_token(
+        auth_tokens._access_token_cache_key(expired), 42, (now - timedelta(seconds=1)).timestamp()
+    )
+    with pytest.raises(jwt.ExpiredSignatureError):
+        decode_access_token(expired)
+
+    token = issue_access_token(42)
+    assert decode_access_token(token) == 42
+    monkeypatch.setattr(auth_tokens, 'AUTH_SECRET', 'rotated-secret')
+    with pytest.raises(jwt.InvalidSignatureError):
+        decode_access_token(token)
+
+
 def test_refresh_rejects_reused_session(client):
     token = create_refresh_session(42)
     assert client.post(
@@ -113,3 +113,36 @@ def test_legacy_stats_routes_keep_accepting_explicit_user_id(
     assert response.status_code == 200
     assert client.get("/api/stats/42").status_code == 200
     assert client.get("/api/stats/42").json()[0]["num"] == "7"
+
+
+def test_mobile_stats_batch_reports_saved_and_duplicates_per_item(
+    client, access_token, competitor_payload
+):
+    def item(race_number, num="7"):
+        return {
+            "date": "10.08.2026",
+            "race_number": race_number,
+            "race_href": f"/race/{race_number}",
+            "competitor": {**competitor_payload, "num": num},
+        }
+
+    client.post("/api/mobile/stats", json=item("1"), headers=_auth(access_token(42)))
+
+    response = client.post(
+        "/api/mobile/stats/batch",
+        json={"items": [item("1"), item("2"), item("2"), item("2", num="8")]},
+        headers=_auth(access_token(42)),
+    )
+
+    assert response.status_code == 200
+    body = response.json()
+    assert [r["saved"] for r in body["results"]] == [False, True, False, True]
+    assert [(r["race_number"], r["num"]) for r in body["results"]] == [
+        ("1", "7"), ("2", "7"), ("2", "7"), ("2", "8"),
+    ]
+    assert (body["saved"], body["duplicates"]) == (2, 2)
+    assert len(client.get("/api/stats/42").json()) == 3
+    assert client.post("/api/mobile/stats/batch", json={"items": [item("3")]}).status_code == 401
+    assert client.post(
+        "/api/mobile/stats/batch", json={"items": []}, headers=_auth(access_token(42))
+    ).status_code == 422
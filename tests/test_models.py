@@ -0,0 +1,67 @@
+import base64
+import dataclasses
+import struct
+from pathlib import Path
+
+import pytest
+
+from core.models.models import Cart, LapData, LapTable
+from core.parsers.parsers import FullRaceInfoParser, build_race_page
+
+FIXTURES = Path(__file__).parent / "fixtures" / "kartchrono"
+
+
+def _format(ms):
+    return f"{ms // 60000}:{ms % 60000 // 1000:02d}.{ms % 1000:03d}"
+
+
+def _legacy_laps(binary_laps):
+    data = base64.b64decode(binary_laps)
+    laps = []
+    for offset in range(0, len(data) - 51, 52):
+        lap_num, = struct.unpack_from("<i", data, offset + 8)
+        s1, s2, s3, lap_time = struct.unpack_from("<4i", data, offset + 20)
+        s4, = struct.unpack_from("<i", data, offset + 48)
+        fmt = lambda ms: _format(ms) if ms > 0 else None
+        if lap_num == 0:
+            laps.append(LapData(0, "", None, fmt(s2), fmt(s3), fmt(s4)))
+        else:
+            final = lap_time if 0 < lap_time < 600000 else s1 + s2 + s3 + s4
+            laps.append(LapData(lap_num, fmt(final), fmt(s1), fmt(s2), fmt(s3), fmt(s4)))
+    laps.sort(key=lambda lap: lap.lap_number)
+    return laps
+
+
+def test_lap_table_formats_like_the_row_based_decoder():
+    page = build_race_page((FIXTURES / "race_large.html").read_text())
+
+    for competitor in page.competitors:
+        assert isinstance(competitor.lap_times, LapTable)
+        assert list(competitor.lap_times) == _legacy_laps(competitor.binary_laps)
+        assert competitor.lap_times == _legacy_laps(competitor.binary_laps)
+        assert competitor.lap_times[-1] == competitor.lap_times[len(competitor.lap_times) - 1]
+        assert competitor.lap_times[:2] == list(competitor.lap_times)[:2]
+
+
+def test_truncated_and_invalid_binary_laps():
+    parser = FullRaceInfoParser(cache=None)
+    record = bytearray(52)
+    struct.pack_into("<i", record, 8, 1)
+    struct.pack_into("<4i", record, 20, 10000, 11000, 12000, 0)
+    struct.pack_into("<i", record, 48, 13000)
+    encoded = base64.b64encode(bytes(record) + b"\0" * 30).decode()
+
+    table = parser._decode_binary_laps(encoded)
+
+    assert list(table) == [LapData(1, "0:46.000", "0:10.000", "0:11.000", "0:12.000", "0:13.000")]
+    assert len(parser._decode_binary_laps("not base64!")) == 0
+    with pytest.raises(IndexError):
+        table[1]
+
+
+def test_cached_models_are_immutable():
+    cart = Cart(id="", number="7", best_lap="0:45.000", position="1")
+
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        cart.best_lap = "0:40.000"
+    assert not hasattr(cart, "__dict__")
@@ -0,0 +1,70 @@
+import asyncio
+from pathlib import Path
+
+import pytest
+
+from core.models.models import ParsingError
+from core.parsers.executor import ParseExecutor
+from core.parsers.parsers import FullRaceInfoParser, RaceParser, build_race_page
+from tests.conftest import ScriptedFetcher
+
+FIXTURES = Path(__file__).parent / "fixtures" / "kartchrono"
+RACE_HTML = (FIXTURES / "race.html").read_text()
+RACE_LARGE_HTML = (FIXTURES / "race_large.html").read_text()
+
+
+def test_thread_executor_batches_pages_and_isolates_failures():
+    executor = ParseExecutor("thread", workers=2, batch_size=4, batch_delay=0.05)
+    pages = [RACE_HTML, RACE_LARGE_HTML, "<html>не заезд</html>", RACE_HTML, RACE_HTML, RACE_LARGE_HTML]
+
+    async def scenario():
+        return await asyncio.gather(
+            *(executor.build_race_page(html) for html in pages), return_exceptions=True
+        )
+
+    try:
+        results = asyncio.run(scenario())
+    finally:
+        executor.shutdown()
+
+    assert executor.batches == 2
+    assert executor.pages == 6
+    assert isinstance(results[2], ParsingError)
+    for html, result in zip(pages, results):
+        if html is not pages[2]:
+            assert result == build_race_page(html)
+
+
+def test_small_pages_are_parsed_inline():
+    executor = ParseExecutor("process", min_bytes=len(RACE_HTML) + 1)
+
+    page = asyncio.run(executor.build_race_page(RACE_HTML))
+
+    assert page == build_race_page(RACE_HTML)
+    assert executor.batches == 0
+    assert executor._pool is None
+
+
+def test_process_executor_serves_both_parsers():
+    executor = ParseExecutor("process", workers=1, batch_delay=0.01)
+    fetcher = ScriptedFetcher([RACE_LARGE_HTML, RACE_LARGE_HTML])
+
+    async def scenario():
+        race_parser = RaceParser(cache=None, fetcher=fetcher, executor=executor)
+        full_parser = FullRaceInfoParser(cache=None, fetcher=fetcher, executor=executor)
+        return await asyncio.gather(race_parser.parse("race.php?id=1"), full_parser.parse("race.php?id=1"))
+
+    try:
+        carts, competitors = asyncio.run(scenario())
+    finally:
+        executor.shutdown()
+
+    expected = build_race_page(RACE_LARGE_HTML)
+    assert executor.batches == 1
+    assert carts == expected.carts
+    assert competitors == expected.competitors
+
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        ParseExecutor("gevent")
@@ -0,0 +1,140 @@
+import asyncio
+
+import pytest
+
+from core.parsers.cache import RaceCache
+
+
+def test_concurrent_loads_of_one_race_are_merged():
+    cache = RaceCache(max_entries=4, ttl_seconds=60)
+    calls = 0
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return ["cart"], "<html>"
+
+    async def scenario():
+        return await asyncio.gather(
+            cache.get_or_load("race/1", loader),
+            cache.get_or_load("race/1", loader),
+        )
+
+    results = asyncio.run(scenario())
+
+    assert calls == 1
+    assert results[0] == results[1] == (["cart"], "<html>")
+    assert cache.get("race/1") == (["cart"], "<html>")
+
+
+def test_cancelled_prefetch_still_fills_the_cache():
+    cache = RaceCache(max_entries=4, ttl_seconds=60)
+
+    async def loader():
+        await asyncio.sleep(0.02)
+        return "page"
+
+    async def scenario():
+        prefetch = asyncio.create_task(cache.get_or_load("race/1", loader))
+        await asyncio.sleep(0)
+        prefetch.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await prefetch
+        return await cache.get_or_load("race/1", loader)
+
+    assert asyncio.run(scenario()) == "page"
+    assert cache.misses == 2
+
+
+def test_failed_load_is_not_cached():
+    cache = RaceCache(max_entries=4, ttl_seconds=60)
+
+    async def loader():
+        raise RuntimeError("upstream down")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(cache.get_or_load("race/1", loader))
+    assert cache.get("race/1") is None
+
+
+def test_entries_expire_and_are_evicted_in_lru_order(monkeypatch):
+    import core.parsers.cache as cache_module
+
+    now = [100.0]
+    monkeypatch.setattr(cache_module, "monotonic", lambda: now[0])
+    cache = RaceCache(max_entries=2, ttl_seconds=10)
+
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    now[0] = 111.0
+    assert cache.get("a") is None
+    assert cache.get("c") is None
+
+
+
+def _archive(today_races):
+    from datetime import datetime
+
+    from core.models.models import DayRaces, Race
+
+    return [
+        DayRaces(date=datetime(2024, 5, 2), races=[Race(n, h) for n, h in today_races]),
+        DayRaces(date=datetime(2024, 5, 1), races=[Race("Заезд 2", "race/2"), Race("Заезд 1", "race/1")]),
+    ]
+
+
+def test_only_the_highest_numbered_race_of_today_may_still_run():
+    from datetime import date
+
+    from core.parsers.cache import race_finished
+
+    # Порядок на странице не важен: решает номер заезда
+    days = _archive([("Заезд 3", "race/3"), ("Заезд 4", "race/4")])
+
+    assert race_finished(days, "race/3", date(2024, 5, 2)) is True
+    assert race_finished(days, "race/4", date(2024, 5, 2)) is False
+    assert race_finished(days, "race/4", date(2024, 5, 3)) is True
+    assert race_finished(days, "race/1", date(2024, 5, 2)) is True
+    assert race_finished(days, "race/9", date(2024, 5, 2)) is None
+
+
+def test_ttl_is_decided_by_the_shared_archive(tmp_path, monkeypatch):
+    from datetime import date
+
+    import core.parsers.cache as cache_module
+    from core.cache import SharedCache
+
+    class Today(date):
+        @classmethod
+        def today(cls):
+            return date(2024, 5, 2)
+
+    monkeypatch.setattr(cache_module, "date", Today)
+    shared = SharedCache(tmp_path / "cache.db")
+
+    async def loader():
+        return "page"
+
+    async def load_all(cache):
+        for href in ("race/3", "race/4", "race/9"):
+            await cache.get_or_load(href, loader)
+
+    # Процесс без архива: всё в памяти на короткий срок, в общий кэш ничего
+    blind = RaceCache(ttl_seconds=600, shared=shared, live_ttl_seconds=15, archive_key="archive/")
+    asyncio.run(load_all(blind))
+    assert shared.entries("race") == {}
+
+    shared.put("archive", "archive/", (_archive([("Заезд 4", "race/4"), ("Заезд 3", "race/3")]), None), ttl=60)
+    cache = RaceCache(ttl_seconds=600, shared=shared, live_ttl_seconds=15, archive_key="archive/")
+    asyncio.run(load_all(cache))
+    entries = shared.entries("race")
+
+    assert set(entries) == {"race/3", "race/4"}
+    assert entries["race/3"].ttl_left > 500
+    assert entries["race/4"].ttl_left <= 15
@@ -0,0 +1,140 @@
+import asyncio
+import json
+import re
+from pathlib import Path
+
+import pytest
+from bs4 import BeautifulSoup
+
+from core.models.models import Cart, ParsingError
+from core.parsers.parsers import FullRaceInfoParser, RaceParser, build_race_page
+from core.parsers.race_page import extract_js_competitors, scan_race_page
+
+FIXTURES = Path(__file__).parent / "fixtures" / "kartchrono"
+
+
+def _legacy_carts(html: str):
+    results_table = BeautifulSoup(html, "html.parser").find(id="resultsTable")
+    carts = []
+    for row in results_table.find_all(class_="dataRow"):
+        fields = [row.find(id=name) for name in ("num", "best_lap_time", "pos")]
+        number, best_lap, position = (
+            element.get_text().strip() if element else "" for element in fields
+        )
+        carts.append(Cart(id="", number=number, best_lap=best_lap, position=position))
+    return carts
+
+
+def _legacy_competitors(html: str, carts):
+    match = re.search(r"var\s+jsCompetitors\s*=\s*(\{.*?\});", html, re.DOTALL)
+    parser = FullRaceInfoParser(cache=None)
+    return parser._parse_competitors_json(json.loads(match.group(1)), carts)
+
+
+@pytest.mark.parametrize("fixture", ["race.html", "race_large.html"])
+def test_single_pass_matches_beautifulsoup_and_regex_parsers(fixture):
+    html = (FIXTURES / fixture).read_text()
+
+    page = build_race_page(html)
+
+    assert page.carts == _legacy_carts(html)
+    assert page.competitors == _legacy_competitors(html, page.carts)
+    assert page.competitors_error is None
+
+
+def test_scanner_handles_nested_markup_entities_and_unclosed_tags():
+    html = """
+    <div id="resultsTable">
+      <div class="dataRow first">
+        <span id="pos"> 1 </span>
+        <div id="num"><b>1</b>2<br>&nbsp;</div>
+        <p id="best_lap_time">0:45.<i>100</i>
+      </div>
+      <div class="dataRow"><span id="num">7</span></div>
+    </div>
+    <div class="dataRow"><span id="num">99</span></div>
+    <script>var other = {};</script>
+    """
+
+    scan = scan_race_page(html)
+
+    assert scan.carts == _legacy_carts(html)
+    assert scan.carts == [
+        Cart(id="", number="12", best_lap="0:45.100", position="1"),
+        Cart(id="", number="7", best_lap="", position=""),
+    ]
+    assert scan.competitors_script is None
+
+
+def test_missing_results_table_is_a_parsing_error():
+    with pytest.raises(ParsingError, match="таблица"):
+        build_race_page("<html><body><script>var jsCompetitors = {};</script></body></html>")
+
+
+def test_page_without_js_competitors_still_lists_carts():
+    page = build_race_page(
+        '<div id="resultsTable"><div class="dataRow"><i id="num">5</i></div></div>'
+    )
+
+    assert [cart.number for cart in page.carts] == ["5"]
+    with pytest.raises(ParsingError, match="jsCompetitors"):
+        asyncio.run(FullRaceInfoParser(cache=None).parse("race/1", page=page))
+
+
+def test_race_and_full_parsers_share_one_cached_page(monkeypatch):
+    html = (FIXTURES / "race.html").read_text()
+    fetches = []
+
+    async def fetch_page(self, href):
+        fetches.append(href)
+        return build_race_page(html)
+
+    monkeypatch.setattr(RaceParser, "_fetch_page", fetch_page)
+    monkeypatch.setattr(FullRaceInfoParser, "_fetch_page", fetch_page)
+    from core.parsers.cache import RaceCache
+
+    cache = RaceCache(max_entries=4, ttl_seconds=60)
+
+    async def scenario():
+        carts = await RaceParser(cache=cache).parse("race/1")
+        competitors = await FullRaceInfoParser(cache=cache).parse("race/1", carts)
+        return carts, competitors
+
+    carts, competitors = asyncio.run(scenario())
+
+    assert fetches == ["race/1"]
+    assert competitors[0].best_lap == carts[0].best_lap
+
+
+def test_js_competitors_with_nested_terminators_in_strings():
+    script = (
+        'var jsCompetitors = {"1": {"num": 7, "name": "Команда };", '
+        '"meta": {"note": "a}; b"}}};\nvar jsSelected = {};'
+    )
+
+    assert extract_js_competitors(script) == {
+        "1": {"num": 7, "name": "Команда };", "meta": {"note": "a}; b"}}
+    }
+    page = build_race_page(
+        '<div id="resultsTable"><div class="dataRow"><i id="num">7</i></div></div>'
+        f"<script>{script}</script>"
+    )
+    assert page.competitors[0].name == "Команда };"
+
+
+def test_js_competitors_extraction_edge_cases():
+    assert extract_js_competitors("var jsSelected = {};") is None
+    assert extract_js_competitors("if (jsCompetitors == null) {}") is None
+    assert extract_js_competitors("var jsCompetitors={}") == {}
+    with pytest.raises(json.JSONDecodeError):
+        extract_js_competitors('var jsCompetitors = {"1": {"num": };')
+
+
+def test_broken_js_competitors_is_reported_on_full_parse_only():
+    page = build_race_page(
+        '<div id="resultsTable"><div class="dataRow"><i id="num">5</i></div></div>'
+        '<script>var jsCompetitors = {"1": ;</script>'
+    )
+
+    assert [cart.number for cart in page.carts] == ["5"]
+    assert page.competitors_error.startswith("Ошибка парсинга JSON")
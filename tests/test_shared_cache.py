@@ -0,0 +1,83 @@
+import asyncio
+from pathlib import Path
+
+import core.cache.leaderboard as leaderboard
+import core.database.db as db
+from core.cache import SharedCache
+from core.parsers.cache import RaceCache
+from core.parsers.fetch import _RetryableError
+from core.parsers.parsers import ArchiveParser
+from tests.conftest import ScriptedFetcher
+
+ARCHIVE_HTML = (Path(__file__).parent / "fixtures" / "kartchrono" / "archive.html").read_text()
+
+
+def _competitor(name="Driver"):
+    return {
+        "id": "c", "num": "7", "name": name, "pos": 1, "laps": 10,
+        "theor_lap": 45000, "best_lap": "0:45.100", "binary_laps": "",
+        "theor_lap_formatted": "0:45.000", "display_name": name,
+        "gap_to_leader": "", "lap_times": [],
+    }
+
+
+def test_race_loaded_by_one_process_is_reused_by_another(tmp_path):
+    shared = SharedCache(tmp_path / "cache.db")
+    # Два кэша в памяти на одном файле — как два воркера API
+    first = RaceCache(ttl_seconds=60, shared=shared)
+    second = RaceCache(ttl_seconds=60, shared=shared)
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        return ["cart"], "<html>"
+
+    async def scenario():
+        a = await first.get_or_load("race/1", loader)
+        b = await second.get_or_load("race/1", loader)
+        return a, b
+
+    a, b = asyncio.run(scenario())
+
+    assert calls == [1]
+    assert a == b == (["cart"], "<html>")
+    assert second.get("race/1") == (["cart"], "<html>")
+
+
+def test_archive_is_fetched_once_per_shared_ttl_and_kept_when_upstream_fails(tmp_path):
+    shared = SharedCache(tmp_path / "cache.db")
+    first_fetcher = ScriptedFetcher([ARCHIVE_HTML])
+    second_fetcher = ScriptedFetcher([], max_retries=0)
+    first = ArchiveParser(fetcher=first_fetcher, feed=None, shared=shared, shared_ttl=60)
+    second = ArchiveParser(fetcher=second_fetcher, feed=None, shared=shared, shared_ttl=60)
+
+    days = asyncio.run(first.parse())
+    assert asyncio.run(second.parse()) == days
+    assert first_fetcher.calls == 1
+    assert second_fetcher.calls == 0
+
+    # Запись устарела, а сайт недоступен: третий процесс получает устаревший архив
+    shared.put("archive", first.url_string, shared.get("archive", first.url_string).value, ttl=-1)
+    third_fetcher = ScriptedFetcher([_RetryableError("HTTP 503")], max_retries=0)
+    third = ArchiveParser(fetcher=third_fetcher, feed=None, shared=shared, shared_ttl=60)
+    assert asyncio.run(third.parse()) == days
+    assert third_fetcher.calls == 1
+
+
+def test_leaderboard_cache_follows_data_version(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(leaderboard, "shared_cache", SharedCache(tmp_path / "cache.db"))
+    db.upsert_user_profile(1, "Пилот")
+    db.save_competitor(1, "10.08.2026", "1", "race.php?id=1", _competitor())
+
+    first = leaderboard.best_competitors()
+    version = db.get_data_version("leaderboard")
+    # Повтор того же профиля ничего не меняет — кэш остаётся в силе
+    db.upsert_user_profile(1, "Пилот")
+    assert db.get_data_version("leaderboard") == version
+    assert leaderboard.best_competitors() == first
+
+    db.upsert_user_profile(1, "Гонщик")
+    assert db.get_data_version("leaderboard") > version
+    db.save_competitor(1, "10.08.2026", "2", "race.php?id=2", _competitor())
+    assert leaderboard.best_competitors() == db.get_best_competitors()
+    assert leaderboard.best_competitors() != first
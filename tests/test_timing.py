@@ -0,0 +1,82 @@
+import random
+from array import array
+
+import pytest
+
+from core.timing import (
+    NO_TIME_MS,
+    format_ms,
+    format_ms_many,
+    format_ms_or_none,
+    parse_time_ms,
+    parse_time_ms_many,
+)
+
+
+def _legacy_format_time(time_ms):
+    if time_ms <= 0:
+        return "00:00.000"
+    minutes = time_ms // 60000
+    seconds = (time_ms % 60000) // 1000
+    milliseconds = time_ms % 1000
+    return f"{minutes}:{seconds:02d}.{milliseconds:03d}"
+
+
+def _legacy_time_string_to_ms(time_str):
+    if not time_str or time_str == "-":
+        return 999999999
+    try:
+        time_str = time_str.strip()
+        if ':' in time_str and '.' in time_str:
+            minutes, rest = time_str.split(':', 1)
+            seconds, ms = rest.split('.', 1)
+            return int(minutes) * 60000 + int(seconds) * 1000 + int(ms)
+        return 999999999
+    except Exception:
+        return 999999999
+
+
+def _samples(seed=20260819, count=20000):
+    rng = random.Random(seed)
+    values = list(range(-2, 2002)) + [59_999, 60_000, 119_999, 120_000, 3_599_999, 3_600_000]
+    values += [rng.randint(30_000, 130_000) for _ in range(count)]
+    values += [rng.randint(-10**6, 10**10) for _ in range(count // 10)]
+    return values
+
+
+def test_formatting_matches_the_previous_implementation():
+    values = _samples()
+
+    assert [format_ms(v) for v in values] == [_legacy_format_time(v) for v in values]
+    expected = [_legacy_format_time(v) if v > 0 else None for v in values]
+    assert [format_ms_or_none(v) for v in values] == expected
+    assert format_ms_many(values) == expected
+    assert format_ms_many(array("q", values)) == expected
+
+
+def _random_time_string(rng):
+    alphabet = "0123456789:.- +_²٣ \t"
+    kind = rng.random()
+    if kind < 0.5:
+        return _legacy_format_time(rng.randint(1, 200_000))
+    if kind < 0.7:
+        text = _legacy_format_time(rng.randint(1, 200_000))
+        position = rng.randrange(len(text) + 1)
+        return text[:position] + rng.choice(alphabet) + text[position:]
+    return "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 12)))
+
+
+def test_parsing_matches_the_previous_implementation():
+    rng = random.Random(7)
+    texts = [_random_time_string(rng) for _ in range(50000)]
+    texts += [None, "", "-", " - ", "0:45.100", " 1:02.003 ", "12:34.5", "1:2.3", "1:02.003.4"]
+
+    expected = [_legacy_time_string_to_ms(text) for text in texts]
+    assert [parse_time_ms(text) for text in texts] == expected
+    assert parse_time_ms_many(texts) == expected
+
+
+@pytest.mark.parametrize("ms", [1, 45_123, 61_001, 119_999, 3_725_004])
+def test_round_trip(ms):
+    assert parse_time_ms(format_ms(ms)) == ms
+    assert parse_time_ms("bad") == NO_TIME_MS
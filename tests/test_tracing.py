@@ -0,0 +1,116 @@
+import asyncio
+import json
+from pathlib import Path
+
+from aiohttp.test_utils import TestServer
+
+import api.main as api_main
+from api.routes import races
+from core.parsers.parsers import FullRaceInfoParser, RaceParser
+from core.tracing import JsonlExporter, OtlpHttpExporter, SpanExporter, Tracer, span, start_span
+from scripts.otlp_standin import STANDIN_KEY, create_app
+from tests.conftest import ScriptedFetcher
+
+RACE_HTML = (Path(__file__).parent / "fixtures" / "kartchrono" / "race.html").read_text()
+
+
+class CollectingExporter(SpanExporter):
+    def __init__(self):
+        self.traces = []
+
+    def export(self, spans):
+        self.traces.append(spans)
+
+
+def test_spans_nest_and_follow_tasks_only_inside_a_trace(tmp_path):
+    tracer = Tracer(JsonlExporter(str(tmp_path / "traces.jsonl")))
+
+    with span("outside") as outside:
+        outside.set("ignored", True)
+    assert start_span("outside") is None
+
+    async def child_task():
+        with span("task.work"):
+            await asyncio.sleep(0)
+
+    async def main():
+        with tracer.trace("root") as root:
+            with span("stage", size=3) as stage:
+                await asyncio.gather(child_task(), child_task())
+            leaf = start_span("leaf")
+            leaf.finish()
+        return root, stage
+
+    root, stage = asyncio.run(main())
+    tracer.flush()
+
+    records = [json.loads(line) for line in (tmp_path / "traces.jsonl").read_text().splitlines()]
+    by_name = {}
+    for record in records:
+        by_name.setdefault(record["name"], []).append(record)
+    assert {record["trace_id"] for record in records} == {root.trace_id}
+    assert by_name["root"][0]["parent_id"] is None
+    assert by_name["stage"][0]["parent_id"] == root.span_id
+    assert by_name["stage"][0]["attributes"] == {"size": 3}
+    assert [r["parent_id"] for r in by_name["task.work"]] == [stage.span_id] * 2
+    assert by_name["leaf"][0]["parent_id"] == root.span_id
+    assert "outside" not in by_name
+
+
+def test_races_full_is_traced_only_when_the_header_asks(client, monkeypatch):
+    exporter = CollectingExporter()
+    monkeypatch.setattr(api_main.tracer, "exporter", exporter)
+    fetcher = ScriptedFetcher([RACE_HTML, RACE_HTML])
+    monkeypatch.setattr(races, "_race_parser", RaceParser(cache=None, fetcher=fetcher))
+    monkeypatch.setattr(races, "_full_parser", FullRaceInfoParser(cache=None, fetcher=fetcher))
+
+    plain = client.get("/api/races/full", params={"href": "race.php?id=1"})
+    traced = client.get(
+        "/api/races/full", params={"href": "race.php?id=1"}, headers={"X-Trace": "1"}
+    )
+    api_main.tracer.flush()
+
+    assert plain.status_code == traced.status_code == 200
+    assert plain.json() == traced.json()
+    assert "x-trace-id" not in plain.headers
+    assert len(exporter.traces) == 1
+
+    spans = {s.name: s for s in exporter.traces[0]}
+    root = spans["GET /api/races/full"]
+    assert traced.headers["x-trace-id"] == root.trace_id
+    assert root.attributes["http.status_code"] == 200
+    for name in (
+        "upstream.fetch", "upstream.queue", "upstream.attempt",
+        "parse.scan", "parse.extract_js", "parse.decode_laps", "serialize",
+    ):
+        assert name in spans, name
+    assert spans["upstream.attempt"].parent_id == spans["upstream.fetch"].span_id
+    assert spans["serialize"].attributes["bytes"] == len(traced.content)
+
+
+def test_otlp_export_continues_traceparent_and_reaches_the_standin(client, monkeypatch):
+    async def main():
+        app = create_app(quiet=True)
+        server = TestServer(app)
+        await server.start_server()
+        try:
+            exporter = OtlpHttpExporter(str(server.make_url("/")), "carting-api")
+            monkeypatch.setattr(api_main.tracer, "exporter", exporter)
+            trace_id, parent_id = "4bf92f3577b34da6a3ce929d0e0e4736", "00f067aa0ba902b7"
+            response = await asyncio.to_thread(
+                client.get, "/api/health",
+                headers={"traceparent": f"00-{trace_id}-{parent_id}-01"},
+            )
+            await asyncio.to_thread(api_main.tracer.flush)
+            return response, trace_id, parent_id, app[STANDIN_KEY]
+        finally:
+            await server.close()
+
+    response, trace_id, parent_id, standin = asyncio.run(main())
+
+    assert response.headers["x-trace-id"] == trace_id
+    [received] = standin.traces[trace_id]
+    assert received["service"] == "carting-api"
+    assert received["name"] == "GET /api/health"
+    assert received["parent_id"] == parent_id
+    assert received["attributes"]["http.status_code"] == 200
@@ -0,0 +1,83 @@
+import asyncio
+from datetime import datetime, timezone
+
+from telegram import Chat, Message, Update, User
+
+from bot.update_processor import PerChatUpdateProcessor
+
+
+def _update(update_id: int, chat_id: int, user_id: int) -> Update:
+    return Update(
+        update_id=update_id,
+        message=Message(
+            message_id=update_id,
+            date=datetime.now(timezone.utc),
+            chat=Chat(id=chat_id, type="group"),
+            from_user=User(id=user_id, first_name="User", is_bot=False),
+        ),
+    )
+
+
+def test_updates_of_one_chat_are_processed_in_order():
+    processor = PerChatUpdateProcessor(8)
+    events = []
+
+    async def handle(name: str, delay: float):
+        events.append(f"start {name}")
+        await asyncio.sleep(delay)
+        events.append(f"end {name}")
+
+    async def scenario():
+        await asyncio.gather(
+            processor.process_update(_update(1, -100, 42), handle("first", 0.05)),
+            processor.process_update(_update(2, -100, 42), handle("second", 0)),
+        )
+
+    asyncio.run(scenario())
+
+    assert events == ["start first", "end first", "start second", "end second"]
+    assert processor._locks == {}
+
+
+def test_slow_chat_does_not_block_other_chats():
+    processor = PerChatUpdateProcessor(8)
+    events = []
+
+    async def handle(name: str, delay: float):
+        await asyncio.sleep(delay)
+        events.append(name)
+
+    async def scenario():
+        await asyncio.gather(
+            processor.process_update(_update(1, -100, 42), handle("slow", 0.1)),
+            processor.process_update(_update(2, -200, 7), handle("fast", 0)),
+        )
+
+    asyncio.run(scenario())
+
+    assert events == ["fast", "slow"]
+
+
+def test_worker_limit_is_applied_after_per_chat_ordering():
+    processor = PerChatUpdateProcessor(2)
+    running = 0
+    peak = 0
+
+    async def handle():
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+
+    async def scenario():
+        await asyncio.gather(
+            *[
+                processor.process_update(_update(i, -i, i), handle())
+                for i in range(1, 7)
+            ]
+        )
+
+    asyncio.run(scenario())
+
+    assert peak == 2
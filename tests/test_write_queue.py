@@ -0,0 +1,128 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from core.database.writer import WRITE_COMMITS, WriteQueue
+
+
+def _queue(path, **kwargs):
+    def connect():
+        conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    conn = connect()
+    conn.execute("CREATE TABLE IF NOT EXISTS items (id INTEGER PRIMARY KEY)")
+    conn.close()
+    return WriteQueue(connect, **kwargs)
+
+
+def _ids(path):
+    conn = sqlite3.connect(path)
+    try:
+        return sorted(row[0] for row in conn.execute("SELECT id FROM items"))
+    finally:
+        conn.close()
+
+
+def test_concurrent_writes_share_commits_and_failures_stay_isolated(tmp_path):
+    path = tmp_path / "writes.db"
+    queue = _queue(path)
+    commits = WRITE_COMMITS.labels("ok")
+    before = commits.value
+    errors = []
+
+    def write(i):
+        try:
+            with queue.transaction() as conn:
+                conn.execute("INSERT INTO items (id) VALUES (?)", (i,))
+                # Запись держит очередь, остальные успевают встать за ней
+                time.sleep(0.005)
+                if i % 5 == 0:
+                    raise ValueError(i)
+        except ValueError as e:
+            errors.append(e.args[0])
+
+    threads = [threading.Thread(target=write, args=(i,)) for i in range(1, 21)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    queue.close()
+
+    assert sorted(errors) == [5, 10, 15, 20]
+    assert _ids(path) == [i for i in range(1, 21) if i % 5]
+    assert 1 <= commits.value - before < 20
+
+
+def test_single_write_is_visible_as_soon_as_it_returns(tmp_path):
+    path = tmp_path / "writes.db"
+    queue = _queue(path)
+
+    with queue.transaction() as conn:
+        conn.execute("INSERT INTO items (id) VALUES (1)")
+    assert _ids(path) == [1]
+
+    with pytest.raises(sqlite3.IntegrityError):
+        with queue.transaction() as conn:
+            conn.execute("INSERT INTO items (id) VALUES (2)")
+            conn.execute("INSERT INTO items (id) VALUES (1)")
+    # Многошаговая запись откатывается целиком
+    assert _ids(path) == [1]
+
+    windowed = _queue(path, window=0.02)
+    started = time.monotonic()
+    with windowed.transaction() as conn:
+        conn.execute("INSERT INTO items (id) VALUES (3)")
+    assert time.monotonic() - started >= 0.015
+    assert _ids(path) == [1, 3]
+    queue.close()
+    windowed.close()
+
+
+def test_nested_write_in_the_same_thread_fails_instead_of_deadlocking(tmp_path):
+    path = tmp_path / "writes.db"
+    queue = _queue(path)
+
+    with queue.transaction() as conn:
+        conn.execute("INSERT INTO items (id) VALUES (1)")
+        with pytest.raises(RuntimeError):
+            with queue.transaction():
+                pass
+    with queue.transaction() as conn:
+        conn.execute("INSERT INTO items (id) VALUES (2)")
+    queue.close()
+
+    assert _ids(path) == [1, 2]
+
+
+def test_group_fails_when_sqlite_rolled_back_the_whole_transaction(tmp_path):
+    path = tmp_path / "writes.db"
+    queue = _queue(path, window=0.2)
+    errors = []
+
+    def first():
+        try:
+            with queue.transaction() as conn:
+                conn.execute("INSERT INTO items (id) VALUES (1)")
+        except sqlite3.OperationalError as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=first)
+    thread.start()
+    time.sleep(0.05)
+    # Как при SQLITE_FULL: SQLite сам откатил транзакцию, точки сохранения нет
+    with pytest.raises(ValueError):
+        with queue.transaction() as conn:
+            conn.execute("INSERT INTO items (id) VALUES (2)")
+            conn.execute("ROLLBACK")
+            raise ValueError("disk full")
+    thread.join()
+
+    assert len(errors) == 1
+    with queue.transaction() as conn:
+        conn.execute("INSERT INTO items (id) VALUES (3)")
+    queue.close()
+    assert _ids(path) == [3]